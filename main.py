@@ -1,15 +1,24 @@
 """Main entry point for SMIT
+
+Run with `--profile` or `--profile memory` to profile the
+application phases, results are written to `Folder['log']`.
 """
+import argparse
 from SMIT.application import Application
 from SMIT.gui.main_window import AppGui
 
 class SMIT:
     """Main entry point
+
+    Attributes:
+        profile (str | None = None): Profiling mode, see `SMIT.profiling.Profiler`.
     """
-    def __init__(self) -> None:
-        self.user = Application()
+    def __init__(self, profile: str | None = None) -> None:
+        self.profile = profile
+        self.user = Application(profile=profile)
         self.root = AppGui(self.user)
         self.root.mainloop()
+        self._finish()
 
         if self.user.dummy is True:
             self.dummy_reload()
@@ -20,8 +29,25 @@ def dummy_reload(self) -> None:
         """Reload the root window with dummy settings.
         """
         self.user.logger.info(' ---- Reload with dummy configuration ---- ')
-        self.user = Application(True)
+        self.user = Application(True, profile=self.profile)
         self.root = AppGui(self.user)
         self.root.mainloop()
+        self._finish()
+
+    def _finish(self) -> None:
+        """Stop the scrape worker, close the journal, export metrics and profiling results after the Gui closed.
+        """
+        self.user.scrape_worker.stop()
+        self.user.journal.close()
+        self.user.metrics.export()
+        for file in self.user.profiler.dump(self.user.Folder['log'], self.user.storage):
+            self.user.logger.info(f'Profiling results written to {file}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Smart Meter Interface Tool')
+    parser.add_argument('--profile', nargs='?', const='cpu', choices=('cpu', 'memory'),
+                        help='Profile startup, scrape, ingest and plot phases (default: cpu)')
+    args = parser.parse_args()
 
-SMIT()
+    SMIT(args.profile)
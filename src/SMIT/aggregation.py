@@ -0,0 +1,286 @@
+"""Precomputed consumption statistics
+
+---
+`AggregateCache`
+----------------
+
+- Hold weekly, monthly and yearly sums per meter.
+- Hold weekday averages per meter.
+- Combine day and night meter to a total dataset.
+- Update aggregates incrementally on ingest.
+
+Typical usage:
+
+    app = Application()
+    app.aggregates.method()
+"""
+from datetime import date
+import pandas as pd
+# Type hints
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from SMIT.application import Application
+
+
+class AggregateCache():
+    """Materialized aggregates for consumption data.
+
+    ---
+
+    Each ingested day is added to the buckets of its week,
+    month, year and weekday. For every bucket the sum and the
+    number of days are stored, means are derived on read.
+    Days which are ingested again (e.g. re-scraped days) only
+    apply the difference to the old value. The total dataset
+    holds the sum of day and night meter for days where
+    both meters have a reading.
+
+    All read methods are dictionary lookups.
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+    """
+    periods = ('week', 'month', 'year', 'weekday')
+
+    def __init__(self, app: 'Application') -> None:
+
+        self.user = app
+        self.logger = app.logger
+        # Key: dataset name, value: {date: consumption}
+        self._daily = dict()
+        # Key: dataset name, value: {(period, bucket): [sum, days]}
+        self._buckets = dict()
+        # Key: dataset name, value: most recent date
+        self._latest = dict()
+        msg  = f'Class {self.__class__.__name__} of the '
+        msg += f'module {self.__class__.__module__} '
+        msg +=  'successfully initialized.'
+        self.logger.debug(msg)
+
+    @staticmethod
+    def _bucket_keys(day: date) -> list[tuple]:
+        """Bucket keys for one day.
+
+        Args:
+            day (datetime.date): Day of the reading.
+
+        Returns:
+            list: One `(period, bucket)` tuple per period.
+        """
+        iso = day.isocalendar()
+        return [('week', (iso.year, iso.week)),
+                ('month', (day.year, day.month)),
+                ('year', day.year),
+                ('weekday', day.weekday())]
+
+    def _apply(self, dataset: str, day: date, value: float) -> None:
+        """Add or replace the reading of one day.
+
+        Args:
+            dataset (string): Meter number or 'total'.
+            day (datetime.date): Day of the reading.
+            value (float): Consumption for the day.
+        """
+        daily = self._daily.setdefault(dataset, dict())
+        buckets = self._buckets.setdefault(dataset, dict())
+        old = daily.get(day)
+        daily[day] = value
+        if dataset not in self._latest or day > self._latest[dataset]:
+            self._latest[dataset] = day
+
+        for key in self._bucket_keys(day):
+            bucket = buckets.setdefault(key, [0.0, 0])
+            if old is None:
+                bucket[0] += value
+                bucket[1] += 1
+            else:
+                bucket[0] += value - old
+
+    def _remove(self, dataset: str, day: date) -> None:
+        """Remove the reading of one day.
+
+        Args:
+            dataset (string): Meter number or 'total'.
+            day (datetime.date): Day of the reading.
+        """
+        daily = self._daily.get(dataset, dict())
+        if day not in daily:
+            return
+        value = daily.pop(day)
+        buckets = self._buckets[dataset]
+        for key in self._bucket_keys(day):
+            bucket = buckets[key]
+            bucket[0] -= value
+            bucket[1] -= 1
+            if bucket[1] == 0:
+                del buckets[key]
+
+        if self._latest.get(dataset) == day:
+            if daily:
+                self._latest[dataset] = max(daily)
+            else:
+                del self._latest[dataset]
+
+    def ingest(self, meter: str, dataframe: pd.DataFrame) -> None:
+        """Update aggregates with readings of one meter.
+
+        Only days which are new or have a changed value are
+        processed. Days which are no longer in the dataframe,
+        e.g. after a corrected export, are removed. The total
+        dataset is updated for the changed and removed days.
+
+        Args:
+            meter (string): Day/Night meter device number.
+            dataframe (pd.DataFrame): Output of
+                `SMIT.filehandling.OsInterface.create_dataframe`.
+        """
+        meter = str(meter)
+        readings = dataframe[['date', 'verbrauch']].dropna()
+        known = self._daily.get(meter, dict())
+        changed = {day: value
+                   for day, value in zip(readings['date'], readings['verbrauch'])
+                   if known.get(day) != value}
+
+        removed = set(known) - set(readings['date'])
+
+        for day, value in changed.items():
+            self._apply(meter, day, value)
+        for day in removed:
+            self._remove(meter, day)
+
+        # Keep total dataset in sync
+        day_meter = str(self.user.Meter['day_meter'])
+        night_meter = str(self.user.Meter['night_meter'])
+        if meter in (day_meter, night_meter):
+            day_readings = self._daily.get(day_meter, dict())
+            night_readings = self._daily.get(night_meter, dict())
+            for day in changed:
+                if day in day_readings and day in night_readings:
+                    self._apply('total', day, day_readings[day] + night_readings[day])
+            for day in removed:
+                self._remove('total', day)
+
+        self.logger.debug(f'Aggregates for meter: {meter} updated with {len(changed)} days, '
+                          f'{len(removed)} days removed')
+
+    def latest(self, dataset: str) -> date | None:
+        """Most recent day in a dataset.
+
+        Args:
+            dataset (string): Meter number or 'total'.
+
+        Returns:
+            datetime.date | None: `None` if nothing was ingested.
+        """
+        return self._latest.get(str(dataset))
+
+    def total(self, dataset: str, period: str, bucket) -> float | None:
+        """Consumption sum of one bucket.
+
+        Args:
+            dataset (string): Meter number or 'total'.
+            period (string): One of `AggregateCache.periods`.
+            bucket: (iso year, iso week) for 'week', (year, month) for 'month',
+                year for 'year' and weekday number (Monday = 0) for 'weekday'.
+
+        Returns:
+            float | None: `None` if the bucket holds no days.
+        """
+        entry = self._buckets.get(str(dataset), dict()).get((period, bucket))
+        return entry[0] if entry else None
+
+    def mean(self, dataset: str, period: str, bucket) -> float | None:
+        """Mean consumption per day of one bucket.
+
+        Args:
+            dataset (string): Meter number or 'total'.
+            period (string): One of `AggregateCache.periods`.
+            bucket: See `SMIT.aggregation.AggregateCache.total`.
+
+        Returns:
+            float | None: `None` if the bucket holds no days.
+        """
+        entry = self._buckets.get(str(dataset), dict()).get((period, bucket))
+        return entry[0] / entry[1] if entry else None
+
+    def weekday_mean(self, dataset: str, weekday: int) -> float | None:
+        """Mean consumption for a weekday over the whole history.
+
+        Args:
+            dataset (string): Meter number or 'total'.
+            weekday (int): Monday = 0, Sunday = 6.
+
+        Returns:
+            float | None: `None` if no day was ingested.
+        """
+        return self.mean(dataset, 'weekday', weekday)
+
+    def yoy_delta(self, dataset: str, period: str, bucket) -> float | None:
+        """Relative change of a bucket against the previous year.
+
+        Compare means per day, so partially filled buckets
+        (e.g. the running month) stay comparable.
+
+        Args:
+            dataset (string): Meter number or 'total'.
+            period (string): 'week', 'month' or 'year'.
+            bucket: See `SMIT.aggregation.AggregateCache.total`.
+
+        Returns:
+            float | None: 0.1 for +10 %. `None` if one year is missing.
+        """
+        previous = (bucket[0] - 1, bucket[1]) if isinstance(bucket, tuple) else bucket - 1
+        current_mean = self.mean(dataset, period, bucket)
+        previous_mean = self.mean(dataset, period, previous)
+
+        if current_mean is None or not previous_mean:
+            return None
+        return current_mean / previous_mean - 1
+
+    def summary(self, dataset: str = 'total') -> dict:
+        """Aggregates for the buckets of the most recent day.
+
+        Args:
+            dataset (string): Meter number or 'total'.
+
+        Returns:
+            dict: Keys: [`week_sum`, `month_sum`, `year_sum`, `week_mean`,
+                `month_mean`, `year_mean`, `month_yoy`, `year_yoy`].
+                Empty if nothing was ingested.
+        """
+        day = self.latest(dataset)
+        if day is None:
+            return dict()
+
+        summary = dict()
+        for period, bucket in self._bucket_keys(day)[:3]:
+            summary[f'{period}_sum'] = self.total(dataset, period, bucket)
+            summary[f'{period}_mean'] = self.mean(dataset, period, bucket)
+        summary['month_yoy'] = self.yoy_delta(dataset, 'month', (day.year, day.month))
+        summary['year_yoy'] = self.yoy_delta(dataset, 'year', day.year)
+
+        return summary
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
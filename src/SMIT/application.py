@@ -15,16 +15,44 @@
     dummy_app = Application(True)
 """
 import os
+import atexit
+import getpass
+import gzip
 import logging
+import logging.handlers
 import pathlib as pl
+import queue
 import shutil
-# 3rd party libraries
-import tomlkit
+import stat
+import tempfile
+import time
+import rsa
 # Import Custom Modules
 from SMIT.scrapedata import Webscraper
+from SMIT.worker import ScrapeWorker
+from SMIT.watcher import DownloadWatcher
+from SMIT.pipeline import Pipeline
 from SMIT.filepersistence import Persistence
-from SMIT.rsahandling import RsaTools
+from SMIT.journal import ScrapeJournal
+from SMIT.rsahandling import RsaTools, wait_for_key_generation
 from SMIT.filehandling import OsInterface, TomlTools
+from SMIT.aggregation import AggregateCache
+from SMIT.timeseries import SeriesStore
+from SMIT.settings import load_settings, load_user_data
+from SMIT.metrics import Metrics, observe
+from SMIT.profiling import Profiler
+from SMIT.storage import create_storage
+
+# Rotate log file at 1 MB, keep 5 compressed backups
+LOG_MAX_BYTES = 1_048_576
+LOG_BACKUP_COUNT = 5
+
+# Default root of the dummy environment, overwritten by `SMIT_DUMMY_ROOT`
+DUMMY_ROOT = './.dummy'
+# Format version of the cached dummy key pair, raise when the key files change
+DUMMY_KEY_VERSION = 1
+# Dummy key pair shared by all dummy environments of a user, skips key generation
+DUMMY_KEY_CACHE = pl.Path(tempfile.gettempdir()) / f'smit_dummy_keys_v{DUMMY_KEY_VERSION}_{getpass.getuser()}'
 
 
 class Application:
@@ -46,17 +74,29 @@ class Application:
     - Run application with local data. 
     - No scraping functionality.
     - No call of tkinter module -> No GUI is loaded.
-    - On each instantiation delete and newly create `./.dummy` folder.
+    - On each instantiation delete and newly create the dummy root folder.
     - Static data source: `./opt/dummy_user`.
-    - Root directory: `./dummy`. 
+    - Root directory: `dummy_root`, environment variable `SMIT_DUMMY_ROOT`
+      or `./.dummy`. Use one root per process for parallel runs.
 
     Attributes:
         dummy (bool = False): Flag for activating dummy run.
+        profile (str | None = None): 'cpu' or 'memory' to profile the run phases,
+            see `SMIT.profiling.Profiler`.
+        dummy_root (pathlib.Path | None = None): Root folder of the dummy environment.
     """
-    def __init__(self, dummy: bool = False) -> None:
+    def __init__(self,
+                 dummy: bool = False,
+                 profile: str | None = None,
+                 dummy_root: pl.Path | None = None) -> None:
+
+        startup = time.perf_counter()
+        self.profiler = Profiler(profile)
+        self.profiler.start('startup')
 
         # Attribute needed for scrape and move routine
         self.dummy = dummy
+        self.dummy_root = pl.Path(dummy_root or os.environ.get('SMIT_DUMMY_ROOT', DUMMY_ROOT)).absolute()
 
         # Logging, Path hardcoded because of init order
         logfilepath = './log/app.log'
@@ -76,9 +116,18 @@ def __init__(self, dummy: bool = False) -> None:
             self._setup_dummy_user()
 
         self._add_TOML_to_attributes(self.user_data)
-        self._add_TOML_to_attributes(self.user_settings)
+        self._add_settings_to_attributes(self.user_settings)
+        self.logger.setLevel(self.Options['log_level'])
         self._initialize_folder_structure()
+        if self.dummy is True:
+            self._link_dummy_keys()
         self._add_modules_to_attributes()
+        if self.dummy is True:
+            # Dummy key files are recreated on each run and read directly by tests
+            self.rsa.await_rsa_keys()
+            self._cache_dummy_keys()
+        observe('app.startup', time.perf_counter() - startup)
+        self.profiler.stop('startup')
 
         self.logger.info(f'Application with user {self.Login["username"]} instantiated.')
 
@@ -90,31 +139,50 @@ def _add_modules_to_attributes(self) -> None:
         and assigns the module instances to the application instance.
         Make modules callable via keys in modules dict.
         """
+        # Storage first, other modules access files on init
+        self.storage = create_storage(self)
         for key, value in self._load_modules().items():
             setattr(self, key, value)
 
         self.logger.info('All modules added to user instance')
 
     def _add_TOML_to_attributes(self, file_path: pl.Path) -> None:
-        """Read config file and assign parameters to application instance.
+        """Read user data file and assign tables to application instance.
 
-        Call `tomlkit` library and read parameters from a `.toml` file.  
-        Loop trough the file and assign all parameters to the application instance.
+        Call `SMIT.settings.load_user_data` and assign all tables 
+        to the application instance as mutable dictionaries.  
+        The Gui changes these entries and writes them back
+        with `SMIT.filehandling.TomlTools`.
 
         Parameters
         ----------
         file_path : pathlib.Path
             Path to `.toml` config file.
         """
-        # load file
-        with open(file_path, 'rb') as file:
-            data = tomlkit.load(file)
-        # assign parameters
-        for key, value in data.items():
+        for key, value in load_user_data(file_path).items():
             setattr(self, key, value)
 
         self.logger.debug(f'Attributes from {file_path} added to application instance.')
 
+    def _add_settings_to_attributes(self, file_path: pl.Path) -> None:
+        """Read settings file and assign tables to application instance.
+
+        Call `SMIT.settings.load_settings` to get a validated,
+        read-only snapshot of the settings. The snapshot is stored
+        as `settings` attribute and each table is assigned to the
+        application instance.
+
+        Parameters
+        ----------
+        file_path : pathlib.Path
+            Path to `.toml` settings file.
+        """
+        self.settings = load_settings(file_path)
+        for key in self.settings.__slots__:
+            setattr(self, key, getattr(self.settings, key))
+
+        self.logger.debug(f'Settings from {file_path} added to application instance.')
+
     def _initialize_folder_structure(self) -> None:
         """Create folder structure.
 
@@ -160,11 +228,19 @@ def _load_modules(self) -> dict:
             are intantiated modules objects.
         """
         modules = dict([
+            ('storage', self.storage),
             ('rsa', RsaTools(self)),
             ('toml_tools', TomlTools(self)),
             ('os_tools', OsInterface(self)),
             ('persistence', Persistence(self)),
-            ('scrape', Webscraper(self))
+            ('journal', ScrapeJournal(self)),
+            ('scrape', Webscraper(self)),
+            ('scrape_worker', ScrapeWorker(self)),
+            ('watcher', DownloadWatcher(self)),
+            ('aggregates', AggregateCache(self)),
+            ('series', SeriesStore(self)),
+            ('metrics', Metrics(self)),
+            ('pipeline', Pipeline(self))
         ])
 
         self.logger.debug('All Modules instantiated')
@@ -177,6 +253,14 @@ def _setup_logger(self, filepath) -> None:
         The default log folder is `./log` and the logfile is called `app.log`.  
         Set logging levels for the log file is done via `file_handler.setLevel()`.  
         Set logging levels for terminal output is done via `console_handler.setLevel()`.    
+
+        The logger only puts records into a queue. A `QueueListener`
+        thread formats them and does the file and terminal output.
+        The log file is rotated at `LOG_MAX_BYTES`, old files are
+        compressed with gzip.  
+        After loading the settings the logger level is set to
+        `Options['log_level']`. With 'INFO' debug records are
+        dropped before any formatting is done.
         
         Logging Levels:
         ---------------
@@ -193,21 +277,34 @@ def _setup_logger(self, filepath) -> None:
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.DEBUG)
 
-        formatter = logging.Formatter('%(asctime)s :: %(levelname)-8s :: [%(module)s:%(lineno)d] :: %(message)s')
-
-        file_handler = logging.FileHandler(filepath)
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
-
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(formatter)
-
         # Attach logger handlers just once
         if not self.logger.hasHandlers():
-            
-            self.logger.addHandler(file_handler)
-            self.logger.addHandler(console_handler)
+
+            formatter = logging.Formatter('%(asctime)s :: %(levelname)-8s :: [%(module)s:%(lineno)d] :: %(message)s')
+
+            file_handler = logging.handlers.RotatingFileHandler(filepath,
+                                                                maxBytes=LOG_MAX_BYTES,
+                                                                backupCount=LOG_BACKUP_COUNT,
+                                                                encoding='utf-8')
+            file_handler.namer = lambda name: name + '.gz'
+            file_handler.rotator = _compress_log
+            file_handler.setLevel(logging.DEBUG)
+            file_handler.setFormatter(formatter)
+
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(logging.INFO)
+            console_handler.setFormatter(formatter)
+
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(log_queue,
+                                                      file_handler,
+                                                      console_handler,
+                                                      respect_handler_level=True)
+            listener.start()
+            # Flush remaining records on interpreter exit
+            atexit.register(listener.stop)
+
+            self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
         
     def _setup_dummy_user(self):
         """Create environment for testing purposes.
@@ -216,46 +313,145 @@ def _setup_dummy_user(self):
         or GUI dialogs. It is intended to use for demonstration
         and for unit testing.
         
-        - On each call delete `.dummy` folder.
+        - On each call delete the `dummy_root` folder.
         - Recreate folder and populate it with clean data.
         - Source for dummy data is `./opt/dummy_user`.
-        - Set config path to `./.dummy/config`
+        - Csv files are hardlinked, `.toml` files are copied
+          because the Gui writes credentials to them.
+        - Paths in the settings file point to `dummy_root`.
+        - Set config path to `dummy_root/config`
         """
-        # Reset .dummy folder
-        dummy_data_folder = pl.Path('./.dummy').absolute()
-        if dummy_data_folder.exists():
-            shutil.rmtree(dummy_data_folder)
+        # Reset dummy folder, key files of a previous instance may still be written
+        wait_for_key_generation()
+        if self.dummy_root.exists():
+            shutil.rmtree(self.dummy_root)
 
         # Set paths for copying dummy files
         source_dummy_csv = pl.Path('./opt/dummy_user/').absolute()
-        dest_dummy_csv = pl.Path('./.dummy/csv_raw/daily').absolute()
-        dest_dummy_settings = pl.Path('./.dummy/config').absolute()
+        dest_dummy_csv = self.dummy_root / 'csv_raw' / 'daily'
+        dest_dummy_settings = self.dummy_root / 'config'
 
         # Create folders which are needed before user init 
         # Rest will be created with Application.__init__
         dest_dummy_csv.mkdir(parents=True, exist_ok=True)
         dest_dummy_settings.mkdir(parents=True, exist_ok=True)
 
-        # Copy csv files
+        # Link csv files, they are only moved and read
         for filename in source_dummy_csv.glob('*.csv'):
-            dest = dest_dummy_csv / filename.name
-            shutil.copy2(filename, dest)
-        # Copy settings files
+            _link_or_copy(filename, dest_dummy_csv / filename.name)
+        # Copy settings files with paths relative to the dummy root
         for filename in source_dummy_csv.glob('*.toml'):
-            dest = dest_dummy_settings / filename.name
-            shutil.copy2(filename, dest)
+            content = filename.read_text(encoding='utf-8')
+            content = content.replace("'./.dummy/", f"'{self.dummy_root.as_posix()}/")
+            (dest_dummy_settings / filename.name).write_text(content, encoding='utf-8')
 
         # Set paths to dummy configuration
-        self.user_data = pl.Path('./.dummy/config/dummy_data.toml')
-        self.user_settings = pl.Path('./.dummy/config/dummy_settings.toml')
+        self.user_data = dest_dummy_settings / 'dummy_data.toml'
+        self.user_settings = dest_dummy_settings / 'dummy_settings.toml'
 
         # Logging
-        self.logger.info('Dummy user initiated')
+        self.logger.info(f'Dummy user initiated in {self.dummy_root}')
+
+    def _link_dummy_keys(self) -> None:
+        """Link the cached dummy key pair into the dummy environment.
+
+        Without a cached key pair `SMIT.rsahandling.RsaTools`
+        generates new keys, which are cached afterwards by
+        `SMIT.application.Application._cache_dummy_keys`.
+        """
+        keys = [pl.Path(self.Path['private_key']), pl.Path(self.Path['public_key'])]
+        cached = [DUMMY_KEY_CACHE / key.name for key in keys]
+        if not all(file.exists() for file in cached):
+            return
+        if not _valid_key_pair(*cached):
+            self.logger.warning(f'Invalid dummy key cache {DUMMY_KEY_CACHE} removed')
+            shutil.rmtree(DUMMY_KEY_CACHE, ignore_errors=True)
+            return
+
+        for src, dest in zip(cached, keys):
+            _link_or_copy(src, dest)
+        self.logger.debug(f'Dummy key pair linked from {DUMMY_KEY_CACHE}')
+
+    def _cache_dummy_keys(self) -> None:
+        """Store the dummy key pair for later dummy environments.
+
+        The pair is written to a temporary folder which is renamed
+        to `DUMMY_KEY_CACHE`, so parallel runs never see half a pair.
+        """
+        if DUMMY_KEY_CACHE.exists():
+            return
+
+        staging = pl.Path(tempfile.mkdtemp(prefix='.smit_dummy_keys.', dir=DUMMY_KEY_CACHE.parent))
+        for key in ('private_key', 'public_key'):
+            # With the memory backend the keys only exist in storage
+            (staging / pl.Path(self.Path[key]).name).write_bytes(self.storage.read_bytes(self.Path[key]))
+        try:
+            staging.rename(DUMMY_KEY_CACHE)
+        except OSError:
+            # Cached by a parallel run
+            shutil.rmtree(staging, ignore_errors=True)
 
     def __repr__(self) -> str:
         return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
 
 
+def _valid_key_pair(private: pl.Path, public: pl.Path) -> bool:
+    """Check a cached dummy key pair before it is used.
+
+    The files must hold matching RSA keys. On POSIX systems
+    they must also belong to the current user and must not
+    be writable by others.
+
+    Args:
+        private (pathlib.Path): Private key file.
+        public (pathlib.Path): Public key file.
+
+    Returns:
+        bool: True if the key pair can be used.
+    """
+    try:
+        # No user ids and group or other permissions on Windows
+        if hasattr(os, 'getuid'):
+            for file in (private.parent, private, public):
+                info = file.stat()
+                if info.st_uid != os.getuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+                    return False
+        private_key = rsa.PrivateKey.load_pkcs1(private.read_bytes())
+        public_key = rsa.PublicKey.load_pkcs1(public.read_bytes())
+    except (OSError, ValueError):
+        return False
+
+    return (private_key.n, private_key.e) == (public_key.n, public_key.e)
+
+
+def _link_or_copy(src: pl.Path, dest: pl.Path) -> None:
+    """Hardlink a file, copy it if linking is not possible.
+
+    Args:
+        src (pathlib.Path): Existing file.
+        dest (pathlib.Path): New file.
+    """
+    try:
+        os.link(src, dest)
+    except OSError:
+        # Different file system or no hardlink support
+        shutil.copy2(src, dest)
+
+
+def _compress_log(source: str, dest: str) -> None:
+    """Rotator for the log file handler.
+
+    Compress the full log file with gzip and remove it.
+
+    Args:
+        source (string): Path to the log file to rotate.
+        dest (string): Path to the compressed backup.
+    """
+    with open(source, 'rb') as log_file, gzip.open(dest, 'wb') as backup:
+        shutil.copyfileobj(log_file, backup)
+    os.remove(source)
+
+
 # Pdoc config get underscore methods
 __pdoc__ = {name: True
             for name, classes in globals().items()
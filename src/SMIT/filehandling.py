@@ -6,8 +6,10 @@
 
 - Move files to work directory.
 - Rename files to preserve originally scraped data.
-- Scrape and move workflow.
+- Scrape and move workflow, one run at a time across processes.
 - Generate Python data frame.
+- Fingerprint raw data files.
+- All file access through `SMIT.storage`.
 
 Typical usage:
 
@@ -20,6 +22,7 @@
 
 - Save and load `.toml` files
 - Manipulate `.toml` files
+- Batch edits in a config session with a single atomic write
     
     
 Typical usage:
@@ -27,12 +30,19 @@
     app = Application()
     app.toml_tools.method()
 """
+import copy
 import datetime as dt
+import hashlib
 import pathlib as pl
+import threading
+from contextlib import contextmanager
 import pandas as pd
 import tomlkit
+# Instrumentation
+from SMIT.metrics import timed
+from SMIT.locking import FileLock
 # Type hints
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator
 if TYPE_CHECKING:
     from SMIT.application import Application
 
@@ -53,6 +63,11 @@ def __init__(self, app: 'Application') -> None:
         
         self.user = app
         self.logger = app.logger
+        # Fingerprints of processed datasets, key: meter number
+        self.fingerprints = dict()
+        # Last created dataframe, key: meter number, value: (fingerprint, dataframe)
+        self._dataframes = dict()
+        self._ingest_lock = threading.Lock()
         msg  = f'Class {self.__class__.__name__} of the '
         msg += f'module {self.__class__.__module__} '
         msg +=  'successfully initialized.'
@@ -71,11 +86,12 @@ def _pathlib_move(self, src: pl.Path, dest: pl.Path, appendix: str) -> None:
         """
         path = pl.Path(src)
         new_filename = dest / str(str(dt.date.today().strftime('%Y%m%d') + '_' + str(appendix)) + '.csv')
-        path.rename(new_filename)
+        self.user.storage.move(path, new_filename)
 
         self.logger.debug(f'File: {src} moved to: {new_filename}')
 
-    def _move_files_to_workdir(self, meter_number: str) -> None:
+    @timed('ingest.move_files')
+    def _move_files_to_workdir(self, meter_number: str) -> int:
         """Move files from download dir to work dir.
 
         - Iterate over all `.csv` files in webdriver download folder.  
@@ -85,15 +101,19 @@ def _move_files_to_workdir(self, meter_number: str) -> None:
 
         Args:
             meter_number (string): Day/Night meter device number.
+
+        Returns:
+            int: Bytes of the moved files.
         """
         # set path variables
         path_to_raw = pl.Path(self.user.Folder['raw_daysum']).absolute()
         workdir = pl.Path(self.user.Folder['work_daysum']).absolute()
 
+        moved = 0
         # select files in raw folder
-        for filename in path_to_raw.glob('*.csv'):
-            filename_cdate = filename.stat().st_ctime
-            cdate = dt.datetime.fromtimestamp(filename_cdate).strftime('%Y-%m-%d')
+        for filename in self.user.storage.glob(path_to_raw, '*.csv'):
+            stat = self.user.storage.stat(filename)
+            cdate = dt.datetime.fromtimestamp(stat.ctime_ns / 1e9).strftime('%Y-%m-%d')
 
             # just process downloaded files from today
             if cdate == dt.date.today().strftime('%Y-%m-%d'):
@@ -101,8 +121,12 @@ def _move_files_to_workdir(self, meter_number: str) -> None:
                 # filter for input files
                 if meter_number in str(filename):
                     self._pathlib_move(filename, workdir, meter_number)
+                    moved += stat.size
                     self.logger.debug(f'Moved file for meter: {meter_number} to workdir')
 
+        return moved
+
+    @timed('ingest.create_dataframe')
     def create_dataframe(self, workdir: pl.Path, metertype: str) -> pd.DataFrame:
         """Read `.csv` files and create pandas dataframe.
 
@@ -112,6 +136,13 @@ def create_dataframe(self, workdir: pl.Path, metertype: str) -> pd.DataFrame:
         - Set column dtype formats.
         - Sort values by date.
         - Drop duplicates.
+        - Update `SMIT.aggregation.AggregateCache` with new readings.
+        - Update `SMIT.timeseries.SeriesStore` with sorted readings.
+
+        Note:
+            If the fingerprint of the meter files did not change
+            since the last call, the cached dataframe is returned
+            and no file is read.
 
         Args:
             workdir (pathlib.Path): Path to directory for file import.
@@ -123,20 +154,16 @@ def create_dataframe(self, workdir: pl.Path, metertype: str) -> pd.DataFrame:
         path = pl.Path(workdir)
         df_return = pd.DataFrame()
 
-        filelist = [filename for filename in path.glob('*.csv') if str(metertype) in filename.name]
+        fingerprint = self.data_fingerprint(path, metertype)
+        cached = self._dataframes.get(str(metertype))
+        if cached is not None and cached[0] == fingerprint:
+            self.logger.info(f'Data for meter: {metertype} unchanged, skip ingest')
+            return cached[1].copy()
 
-        df_return = pd.concat(
-            (pd.read_csv(
-                file,
-                sep=';',
-                decimal=',',
-                header=0,
-                parse_dates=['date'],
-                converters={'date': lambda t: dt.datetime.strptime(t, '%Y-%m-%dT%H:%M:%S.%f%z').date()},
-                names=['date', 'zaehlerstand', '1', '2', 'verbrauch', '3', '4'],
-                usecols=lambda x: x in ['date', 'zaehlerstand', 'verbrauch'])
-                for file in filelist)
-        )
+        filelist = [filename for filename in self.user.storage.glob(path, '*.csv')
+                    if str(metertype) in filename.name]
+
+        df_return = pd.concat(self._read_daysum_file(file) for file in filelist)
 
         df_return['zaehlerstand'] = df_return['zaehlerstand'].astype(float)
         df_return['verbrauch'] = df_return['verbrauch'].astype(float)
@@ -145,23 +172,168 @@ def create_dataframe(self, workdir: pl.Path, metertype: str) -> pd.DataFrame:
         df_return.drop_duplicates(subset='date', keep='last', inplace=True)
         df_return['rol_med_30'] = df_return['verbrauch'].rolling(30).median().round(decimals=2)
         df_return['rol_med_7'] = df_return['verbrauch'].rolling(7).median().round(decimals=2)
+
+        # Meters are ingested in parallel by the pipeline, the shared totals one at a time
+        with self._ingest_lock:
+            self._dataframes[str(metertype)] = (fingerprint, df_return.copy())
+            self.user.aggregates.ingest(metertype, df_return)
+            self.user.series.update(metertype, df_return)
+            self.register_fingerprints({str(metertype): fingerprint})
         
         self.logger.debug(f'Created pandas dataframe for meter: {metertype}')
         
         return df_return
 
+    def _read_daysum_file(self, file: pl.Path) -> pd.DataFrame:
+        """Parse one daily `.csv` export.
+
+        Args:
+            file (pathlib.Path): Path to `.csv` file.
+
+        Returns:
+            pandas.DataFrame: With columns [`date`, `zaehlerstand`, `verbrauch`].
+        """
+        with self.user.storage.open_read(file) as handle:
+            return pd.read_csv(
+                handle,
+                sep=';',
+                decimal=',',
+                header=0,
+                parse_dates=['date'],
+                converters={'date': lambda t: dt.datetime.strptime(t, '%Y-%m-%dT%H:%M:%S.%f%z').date()},
+                names=['date', 'zaehlerstand', '1', '2', 'verbrauch', '3', '4'],
+                usecols=lambda x: x in ['date', 'zaehlerstand', 'verbrauch'])
+
+    def data_fingerprint(self, workdir: pl.Path, metertype: str) -> str:
+        """Compute a cheap fingerprint for the files of one meter.
+
+        - Select all `.csv` files in `workdir` with `metertype` in filename.
+        - Hash filename, size and modification time of each file.
+
+        Note:
+            The file content is not read. Any new, removed
+            or rewritten file changes the fingerprint.
+
+        Args:
+            workdir (pathlib.Path): Path to directory with data files.
+            metertype (string): Day/Night meter device number.
+
+        Returns:
+            string: Hex digest of the file manifest.
+        """
+        path = pl.Path(workdir)
+        manifest = hashlib.sha1()
+
+        for filename in self.user.storage.glob(path, '*.csv'):
+            if str(metertype) in filename.name:
+                stat = self.user.storage.stat(filename)
+                manifest.update(f'{filename.name}:{stat.size}:{stat.mtime_ns};'.encode('utf8'))
+
+        self.logger.debug(f'Fingerprint for meter: {metertype} computed')
+
+        return manifest.hexdigest()
+
+    def daysum_fingerprints(self) -> dict:
+        """Fingerprints of the daily data for day and night meter.
+
+        Call `SMIT.filehandling.OsInterface.data_fingerprint` 
+        for both meters in the work directory.
+
+        Returns:
+            dict: Meter number as key, fingerprint as value.
+        """
+        workdir = self.user.Folder['work_daysum']
+
+        return {str(self.user.Meter[meter]): self.data_fingerprint(workdir, self.user.Meter[meter])
+                for meter in ('day_meter', 'night_meter')}
+
+    def plot_fingerprint(self, slice_end: str) -> dict:
+        """Fingerprint of the rendered plots.
+
+        The last week plot changes with the date even
+        without new data, the slice end is part of it.
+
+        Args:
+            slice_end (string): Last day of the last week plot, format 'YYYY-MM-DD'.
+
+        Returns:
+            dict: Keys: [`data`, `slice_end`], `data` from
+                `SMIT.filehandling.OsInterface.daysum_fingerprints`.
+        """
+        return {'data': self.daysum_fingerprints(), 'slice_end': str(slice_end)}
+
+    def register_fingerprints(self, fingerprints: dict) -> None:
+        """Mark datasets as processed.
+
+        Args:
+            fingerprints (dict): Meter number as key, fingerprint as value.
+        """
+        self.fingerprints.update(fingerprints)
+
+        self.logger.debug(f'Fingerprints registered for meters: {list(fingerprints)}')
+
+    def changed_datasets(self) -> list:
+        """Compare current and processed fingerprints.
+
+        Meters which were never processed count as changed.  
+        Unchanged meters are reported in the log.
+
+        Returns:
+            list: Meter numbers with changed data files.
+        """
+        changed = list()
+        for meter, fingerprint in self.daysum_fingerprints().items():
+            if self.fingerprints.get(meter) == fingerprint:
+                self.logger.info(f'Data for meter: {meter} unchanged')
+            else:
+                changed.append(meter)
+
+        return changed
+
+    @timed('pipeline.scrape_and_move')
     def sng_scrape_and_move(self) -> None:
         """Download and move `.csv` files.
 
         - Determine if method was already called with today's date.
         - If not call `SMIT.scrapedata.Webscraper.get_daysum_files`.
-        - Use `SMIT.filehandling.OsInterface._move_files_to_workdir` 
-        to move files to work directory.
+        - `SMIT.watcher.DownloadWatcher` moves and ingests the files
+        while the scraper runs. With `Options['download_watcher']` 'off'
+        `SMIT.filehandling.OsInterface._move_files_to_workdir`
+        moves them after the scrape.
         
+        The run holds the lock `Path['scrape_lock']`. If another
+        process is already scraping, `Options['scrape_lock_mode']`
+        decides: 'join' waits up to `Options['scrape_lock_timeout']`
+        seconds for the running scrape and uses its result,
+        'skip' returns at once.
+
         Info:
             With dummy option active only 
             `SMIT.filehandling.OsInterface._move_files_to_workdir`
             will be called.
+
+        Raises:
+            ValueError: For an unknown `Options['scrape_lock_mode']`.
+        """
+        mode = self.user.Options['scrape_lock_mode']
+        if mode not in ('join', 'skip'):
+            raise ValueError(f"Unknown scrape lock mode: {mode}, use 'join' or 'skip'")
+
+        with self.user.profiler.phase('scrape'):
+            lock = FileLock(self.user.Path['scrape_lock'], self.logger)
+            if not lock.acquire(blocking=mode == 'join',
+                                timeout=self.user.Options['scrape_lock_timeout']):
+                self.logger.info(f'Scrape skipped, running scrape: {lock.owner()}')
+                return
+            try:
+                # Dates of a scrape finished while waiting
+                self.user.journal.reload()
+                self._scrape_and_move()
+            finally:
+                lock.release()
+
+    def _scrape_and_move(self) -> None:
+        """Workflow of `SMIT.filehandling.OsInterface.sng_scrape_and_move`.
         """
         if self.user.dummy is False:
             self.user.persistence.initialize_dates_log()
@@ -171,9 +343,19 @@ def sng_scrape_and_move(self) -> None:
             if dates['last_scrape'] == dt.date.today().strftime('%d-%m-%Y'):
                 self.logger.info('Most recent data already downloaded')
             else:
-                self.user.scrape.get_daysum_files(self.user.Options['headless_mode'])
-                self._move_files_to_workdir(self.user.Meter['day_meter'])
-                self._move_files_to_workdir(self.user.Meter['night_meter'])
+                try:
+                    # Downloads are moved and ingested as they land
+                    with self.user.watcher:
+                        if self.user.Options['scrape_worker'] == 'process' and self.user.Options['storage'] != 'memory':
+                            self.user.scrape_worker.scrape(self.user.Options['headless_mode'])
+                        else:
+                            # In-memory journal is not shared with a worker process
+                            self.user.scrape.get_daysum_files(self.user.Options['headless_mode'])
+                    if self.user.Options['download_watcher'] == 'off':
+                        for meter in (self.user.Meter['day_meter'], self.user.Meter['night_meter']):
+                            self.user.journal.add_bytes(meter, self._move_files_to_workdir(meter))
+                finally:
+                    self.user.journal.flush()
         else:
             # Move files for dummy user
             self._move_files_to_workdir(self.user.Meter['day_meter'])
@@ -189,7 +371,9 @@ class TomlTools():
     ---
     
     Load and save `.toml` config files.  
-    Add and delete entries from config files.
+    Add and delete entries from config files.  
+    Parsed files are cached as long as their modification time
+    does not change.
 
     Attributes:
         app (class): Accepts `SMIT.application.Application` type attribute.    
@@ -199,6 +383,8 @@ def __init__(self, app: 'Application') -> None:
         self.user = app
         self.user_data = pl.Path(self.user.Path['user_data'])
         self.logger = app.logger
+        # Parsed files, key: absolute path, value: (mtime, TOMLDocument)
+        self._documents = dict()
         msg  = f'Class {self.__class__.__name__} of the '
         msg += f'module {self.__class__.__module__} '
         msg +=  'successfully initialized.'
@@ -207,14 +393,25 @@ def __init__(self, app: 'Application') -> None:
     def load_toml_file(self, filename: pl.Path) -> tomlkit.TOMLDocument:
         """Read `.toml` file and return Python TOML object.
 
+        If the file was parsed before and its modification time
+        is unchanged, a copy of the cached document is returned.
+
         Args:
             filename (patlib.Path): Path object for the configuration file.
 
         Returns:
             tomlkit.TOMLDocument: Editable configuration object.
         """
-        with open(filename, mode='rt', encoding='utf-8') as file:
-            data = tomlkit.load(file)
+        path = pl.Path(filename).absolute()
+        mtime = self.user.storage.stat(path).mtime_ns
+        cached = self._documents.get(path)
+
+        if cached is not None and cached[0] == mtime:
+            self.logger.debug(f'Toml file {filename} read from cache')
+            return copy.deepcopy(cached[1])
+
+        data = tomlkit.parse(self.user.storage.read_text(path))
+        self._documents[path] = (mtime, copy.deepcopy(data))
 
         self.logger.debug(f'Toml file {filename} read')
         return data
@@ -222,15 +419,69 @@ def load_toml_file(self, filename: pl.Path) -> tomlkit.TOMLDocument:
     def save_toml_file(self, filename: pl.Path, toml_object: tomlkit.TOMLDocument) -> None:
         """Accepts TOML object and writes file to filesystem.
 
+        The document is written with `SMIT.storage`, on the
+        filesystem via a temporary file which then replaces the
+        config file. An interrupted write never leaves a
+        truncated config file.
+
         Args:
             filename (pathlib.Path): Destination for config file.
             toml_object (tomlkit.TOMLDocument): Configuration object to save.
         """
-        with open(filename, mode='wt', encoding='utf-8') as file:
-            tomlkit.dump(toml_object, file)
+        path = pl.Path(filename).absolute()
+
+        self.user.storage.write_text(path, tomlkit.dumps(toml_object))
+        self._documents[path] = (self.user.storage.stat(path).mtime_ns, copy.deepcopy(toml_object))
 
         self.logger.debug(f'Toml file: {filename} written')
 
+    @contextmanager
+    def config_session(self, toml_path: pl.Path) -> Iterator[tomlkit.TOMLDocument]:
+        """Batch several edits of a config file.
+
+        Load the document once, apply all edits in the
+        `with` block and write the file once on exit.
+        If nothing changed or an exception is raised,
+        the file is not written.
+
+        Typical usage:
+
+            with app.toml_tools.config_session(path) as config:
+                app.toml_tools.set_entry(config, 'Login', 'username', 'name')
+                del config['Login']['password']
+
+        Args:
+            toml_path (pathlib.Path): Path object for the configuration file.
+
+        Yields:
+            tomlkit.TOMLDocument: Editable configuration object.
+        """
+        config = self.load_toml_file(toml_path)
+        original = config.as_string()
+
+        yield config
+
+        if config.as_string() == original:
+            self.logger.debug(f'Config session for {toml_path} without changes')
+        else:
+            self.save_toml_file(toml_path, config)
+
+    @staticmethod
+    def set_entry(config: tomlkit.TOMLDocument,
+                  section: str,
+                  config_attribute: str,
+                  entry: str) -> None:
+        """Add or overwrite an entry in a loaded config.
+
+        Args:
+            config (tomlkit.TOMLDocument): Loaded configuration object.
+            section (string): Table name in config file.
+            config_attribute (string): Attribute in config file to update.
+            entry (string): String to store in config file.
+        """
+        config[section][config_attribute] = entry
+        config[section][config_attribute].comment('Data collected via Gui')
+
     def add_entry_to_config(self, toml_path: pl.Path,
                             section: str,
                             config_attribute: str,
@@ -239,6 +490,7 @@ def add_entry_to_config(self, toml_path: pl.Path,
 
         Use for input from Tkinter Gui.  
         If an entry exists it will be overwritten.  
+        For several entries use `SMIT.filehandling.TomlTools.config_session`.
 
         Args:
             toml_path (pathlib.Path): Path object for the configuration file.
@@ -246,10 +498,8 @@ def add_entry_to_config(self, toml_path: pl.Path,
             config_attribute (string): Attribute in config file to update.
             entry (string): String to store in config file.
         """
-        config = self.load_toml_file(toml_path)
-        config[section][config_attribute] = entry
-        config[section][config_attribute].comment('Data collected via Gui')
-        self.save_toml_file(toml_path, config)
+        with self.config_session(toml_path) as config:
+            self.set_entry(config, section, config_attribute, entry)
         self.logger.debug(f'{config_attribute} added to {toml_path}')
 
     def delete_entry_from_config(self,
@@ -266,9 +516,8 @@ def delete_entry_from_config(self,
             section (string): Table name in config file.
             config_attribute (string): Attribute in config file to update.
         """
-        config = self.load_toml_file(toml_path)
-        del config[section][config_attribute]
-        self.save_toml_file(toml_path, config)
+        with self.config_session(toml_path) as config:
+            del config[section][config_attribute]
         self.logger.debug(f'{config_attribute} deleted from {toml_path}')
 
     def __repr__(self) -> str:
@@ -5,17 +5,17 @@
 ------------
 
 - Initialize variable for scrape dates logging.
-- Load serialized dates log variable.
-- Store dates log variable as pickle object.
+- Load dates log variable.
+- Store dates log variable in the scrape journal.
+- Store and load snapshot of rendered plots.
+- All file access through `SMIT.storage`.
 
 Typical usage:
 
     app = Application()
     app.persistence.method()
 """
-import pickle
-from pathlib import Path
-from datetime import date, timedelta
+import json
 # Type hints
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -32,6 +32,9 @@ class Persistence():
     scraping run are stored between programm runs. On first run
     set the start date to the date stored in `user_settings.toml`. 
 
+    The dates are held by `SMIT.journal.ScrapeJournal`, which
+    loads them once per run and writes changes behind.
+
     Attributes:
         app (class): Accepts `SMIT.application.Application` type attribute.
     """
@@ -50,23 +53,14 @@ def initialize_dates_log(self) -> None:
         If no persisted date exists, 
         create dict for dates and use start date from user settings.
         """
-        # Initial run
-        if not Path(self.user.Path['persist_dates']).exists():
-            with open(self.user.Path['persist_dates'], 'wb') as pk:
-                dates = dict()
-                # Date format: dd-mm-yyyy
-                dates['start'] = self.user.Init['csv_startDate']
-                dates['end'] = (date.today() - timedelta(days=1)).strftime('%d-%m-%Y')
-                dates['last_scrape'] = 'never'
-                pickle.dump(dates, pk)
-            pk.close()
+        self.user.journal.initialize_state()
 
         self.logger.debug('Dates log initialized')
 
     def load_dates_log(self) -> dict:
-        """Deserialize `dates.pkl`.
+        """Load the dates logging object.
 
-        Load the date logging object from disc.  
+        Copy of the state held by the scrape journal.  
         Make dates logging variable accessible for webscraper.
 
         Returns:
@@ -75,26 +69,66 @@ def load_dates_log(self) -> dict:
                 - [`end`]: End date (yesterday) for scraping.  
                 - [`last_scrape`]: Store date between application runs. 
         """
-        with open(self.user.Path['persist_dates'], 'rb') as pk:
-            dates = pickle.load(pk)
+        dates = self.user.journal.state
 
         self.logger.debug('Dates log loaded')
 
         return dates
 
     def save_dates_log(self, dates: dict):
-        """Serialize dates object.
+        """Store dates object.
 
         Store dates logging variable between application runs.
+        Written to disk with the next `SMIT.journal.ScrapeJournal.flush`.
 
         Args:
             dates (dict): Variable for scrape date management.
         """
-        with open(self.user.Path['persist_dates'], 'wb') as dpk:
-            pickle.dump(dates, dpk)
-        dpk.close()
+        self.user.journal.update_state(dates)
+
+        self.logger.debug('Dates log updated')
+
+    def save_plot_snapshot(self, fingerprint: dict, stats: dict, images: dict) -> None:
+        """Serialize plot snapshot metadata.
+
+        Store the fingerprint of the plotted data, the values
+        shown in the stats frame and the paths to the rendered 
+        plot images. Used for showing the last plots on startup.
+
+        Args:
+            fingerprint (dict): Fingerprints of the plotted data, key: meter number.
+            stats (dict): Values shown in the stats frame.
+            images (dict): Plot name as key, path to `.png` file as value.
+        """
+        snapshot = dict()
+        snapshot['fingerprint'] = fingerprint
+        snapshot['stats'] = stats
+        snapshot['images'] = {name: str(path) for name, path in images.items()}
+
+        self.user.storage.write_text(self.user.Path['plot_snapshot'], json.dumps(snapshot))
+
+        self.logger.debug('Plot snapshot written')
+
+    def load_plot_snapshot(self) -> dict | None:
+        """Deserialize plot snapshot metadata.
+
+        Returns:
+            dict | None: Keys: [`fingerprint`, `stats`, `images`].  
+                `None` if no snapshot exists or an image file is missing.
+        """
+        if not self.user.storage.exists(self.user.Path['plot_snapshot']):
+            self.logger.debug('No plot snapshot found')
+            return None
+
+        snapshot = json.loads(self.user.storage.read_text(self.user.Path['plot_snapshot']))
+
+        if not all(self.user.storage.exists(path) for path in snapshot['images'].values()):
+            self.logger.debug('Plot snapshot incomplete')
+            return None
+
+        self.logger.debug('Plot snapshot loaded')
 
-        self.logger.debug('Dates log written')
+        return snapshot
 
     def __repr__(self) -> str:
         return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
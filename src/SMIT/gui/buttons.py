@@ -75,10 +75,21 @@ def __init__(self, master):
 
     def _button_update_data(self) -> None:
         """Srape data, reload plots.
+
+        `SMIT.pipeline.Pipeline` scrapes, ingests and renders
+        the plots, without changed data files it returns the
+        stored snapshot. Plots are just reloaded if the shown
+        plots have another fingerprint.
         """
         self.master.logger.debug('Data update initialized')
-        self.master.user.os_tools.sng_scrape_and_move()
-        self.master.reload_plots()
+        snapshot = self.master.user.pipeline.run()
+
+        if hasattr(self.master, 'plot_frame') and self.master.plot_frame.fingerprint == snapshot['fingerprint']:
+            self.master.logger.info('Data fingerprints unchanged, skip plot reload')
+        else:
+            self.master.show_snapshot(snapshot)
+
+        self.master.user.metrics.export()
 
     def _button_close(self) -> None:
         """Close root window.
@@ -129,59 +140,43 @@ def _button_savecred(self) -> None:
         if save_credentials_activated:
 
             self.master.checkbox_frame.save_credentials_chkbx.deselect()
-
-            # Append credentials to user_data.toml
-            if not 'password' in self.master.user.Login:
-                self.master.user.toml_tools.add_entry_to_config(
-                    self.master.user_data_path,
-                    'Login',
-                    'password',
-                    pwd_str)
-                self.master.logger.info('New password added to config file')
+            toml_tools = self.master.user.toml_tools
+
+            # Collect all changes, write user_data.toml once
+            with toml_tools.config_session(self.master.user_data_path) as config:
+
+                if not 'password' in self.master.user.Login:
+                    toml_tools.set_entry(config, 'Login', 'password', pwd_str)
+                    self.master.logger.info('New password added to config file')
+                    
+                elif self.master.credentials_frame.entry_password.get() == self.master.user.rsa.decrypt_pwd(
+                    base64.b64decode(self.master.user.Login['password'])):
+                    self.master.logger.debug('Password not changed')
+
+                else:
+                    toml_tools.set_entry(config, 'Login', 'password', pwd_str)
+                    self.master.logger.info('New password added to config file')
                 
-            elif self.master.credentials_frame.entry_password.get() == self.master.user.rsa.decrypt_pwd(
-                base64.b64decode(self.master.user.Login['password'])):
-                self.master.logger.debug('Password not changed')
-
-            else:
-                self.master.user.toml_tools.add_entry_to_config(
-                    self.master.user_data_path,
-                    'Login',
-                    'password',
-                    pwd_str)
-                self.master.logger.info('New password added to config file')
-            
-            if self.master.user.Login['username'] == self.master.credentials_frame.entry_username.get():
-                self.master.logger.debug('User not changed')
-            else:
-                self.master.user.toml_tools.add_entry_to_config(
-                    self.master.user_data_path,
-                    'Login',
-                    'username',
-                    self.master.credentials_frame.entry_username.get())
-                self.master.logger.info('New username added to config')
-                
-            if self.master.user.Meter['day_meter'] == self.master.credentials_frame.entry_daymeter.get():
-                self.master.logger.debug('Day meter number not changed')
-            else:            
-                self.master.user.toml_tools.add_entry_to_config(
-                    self.master.user_data_path,
-                    'Meter',
-                    'day_meter',
-                    self.master.credentials_frame.entry_daymeter.get())
-                self.master.logger.info('New day meter number added to config')
-
-            if self.master.user.Meter['night_meter'] == self.master.credentials_frame.entry_nightmeter.get():
-                self.master.logger.debug('Night meter number not changed')
-            else:            
-                self.master.user.toml_tools.add_entry_to_config(
-                    self.master.user_data_path,
-                    'Meter',
-                    'night_meter',
-                    self.master.credentials_frame.entry_nightmeter.get())
-                self.master.logger.info('New night meter number added to config')
-
-
+                if self.master.user.Login['username'] == self.master.credentials_frame.entry_username.get():
+                    self.master.logger.debug('User not changed')
+                else:
+                    toml_tools.set_entry(config, 'Login', 'username',
+                                         self.master.credentials_frame.entry_username.get())
+                    self.master.logger.info('New username added to config')
+                    
+                if self.master.user.Meter['day_meter'] == self.master.credentials_frame.entry_daymeter.get():
+                    self.master.logger.debug('Day meter number not changed')
+                else:            
+                    toml_tools.set_entry(config, 'Meter', 'day_meter',
+                                         self.master.credentials_frame.entry_daymeter.get())
+                    self.master.logger.info('New day meter number added to config')
+
+                if self.master.user.Meter['night_meter'] == self.master.credentials_frame.entry_nightmeter.get():
+                    self.master.logger.debug('Night meter number not changed')
+                else:            
+                    toml_tools.set_entry(config, 'Meter', 'night_meter',
+                                         self.master.credentials_frame.entry_nightmeter.get())
+                    self.master.logger.info('New night meter number added to config')
 
             # Make credentials available in user instance
             self.master.user.Login['username'] = self.master.credentials_frame.entry_username.get()
@@ -0,0 +1,100 @@
+"""Build matplotlib figures for the plot frame.
+
+---
+
+- Draw consumption plots on plain matplotlib figures.
+- No Tk dependency, figures can be rendered headless
+  (e.g. in benchmarks) or wrapped in a Tk canvas.
+
+Typical usage:
+
+    figure = seaborn_bar_figure(dataframe, 'Day')
+    FigureCanvasTkAgg(figure, master)
+"""
+import pandas as pd
+import matplotlib.dates as md
+from matplotlib.figure import Figure
+import seaborn as sns
+
+
+def bar_figure(df: pd.DataFrame, title: str) -> Figure:
+    """Draw a matplotlib bar plot.
+
+    Args:
+        df (pd.DataFrame): Input data for plot
+        title (str): Title for plot
+
+    Returns:
+        Figure: Figure with one bar chart
+    """
+    # create a figure
+    figure = Figure(figsize=(9, 3), dpi=100)
+
+    # create axes
+    axes = figure.add_subplot()
+
+    # create the barchart
+    axes.bar(df['date'], df['verbrauch'])
+
+    # Format labels
+    axes.xaxis.set_major_locator(md.MonthLocator())
+    axes.xaxis.set_major_formatter(md.DateFormatter('%b'))
+    axes.set_ylabel('Consumption [Wh]', labelpad = 0, fontsize = 12)
+
+    axes.set_title(title)
+
+    return figure
+
+def seaborn_bar_figure(df: pd.DataFrame, title: str) -> Figure:
+    """Draw a seaborn bar plot on a matplotlib figure.
+
+    Args:
+        df (pd.DataFrame): Input data for plot
+        title (str): Title for plot
+
+    Returns:
+        Figure: Figure with one bar chart
+    """
+    figure = Figure(figsize =(9,3), dpi=100)
+
+    axes = figure.add_subplot()
+
+    sns.barplot(data=df,
+                x='date',
+                y='verbrauch',
+                color='#3a7ebf',
+                ax=axes)
+
+    axes.set_ylabel('Consumption [Wh]', labelpad = 0, fontsize = 12)
+    axes.xaxis.set_major_locator(md.MonthLocator())
+    axes.xaxis.set_major_formatter(md.DateFormatter('%b'))
+
+    axes.set_title(title)
+    axes.set_xlabel('')
+    return figure
+
+def slice_figure(df: pd.DataFrame, title: str) -> Figure:
+    """Use sliced dataframe for matplotlib bar plot.
+
+    Args:
+        df (pd.DataFrame): Input data for plot
+        title (str): Title for plot
+
+    Returns:
+        Figure: Figure with one labeled bar chart
+    """
+    figure = Figure(figsize =(9,3), dpi=100)
+
+    axes = figure.add_subplot()
+    axes.bar(df['date'], df['sum_verbrauch'])
+
+    myFmt = md.DateFormatter('%a')
+    axes.xaxis.set_major_formatter(myFmt)
+
+    axes.set_title(title)
+    axes.set_xlabel('')
+    axes.spines[['top', 'bottom', 'right', 'left']].set_visible(False)
+    axes.set_ylabel('Consumption [Wh]', labelpad = 0, fontsize = 12)
+    axes.bar_label(axes.containers[0])  # show values with bars
+
+    return figure
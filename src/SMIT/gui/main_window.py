@@ -5,6 +5,7 @@
 - Logger setup
 - Theme
 - Main window grid and properties
+- Startup from plot snapshot
 
 Typical usage:
 
@@ -21,6 +22,7 @@
 from SMIT.gui.checkboxes import CheckboxFrame
 from SMIT.gui.plots import PlotFrame
 from SMIT.gui.stats import StatsFrame
+from SMIT.gui.snapshot import SnapshotFrame
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -33,6 +35,7 @@ class AppGui(ctk.CTk):
     - Load dummy theme
     - Logger
     - Reload plot frame
+    - Show plot snapshot on startup, refresh if data changed
     - Window restart for dummy usage
 
     Attributes:
@@ -81,12 +84,14 @@ def __init__(self, app: 'Application') -> None:
             
             self.logger.info('Raw input folder empty. Update data')
         else:
+            snapshot = self.user.persistence.load_plot_snapshot()
 
-            self.plot_frame = PlotFrame(self)
-            self.plot_frame.grid(row=0, column=1, rowspan=4, sticky='ew')
-
-            self.stats_frame = StatsFrame(self)
-            self.stats_frame.grid(row=3, column=0, sticky='ew')
+            if snapshot is None:
+                self.reload_plots()
+            else:
+                # Show last rendered plots, check data once the window is up
+                self.show_snapshot(snapshot)
+                self.after(100, self._refresh_snapshot)
 
         self.logger.info(f'Gui root window with dummy: {self.user.dummy} loaded')
 
@@ -107,6 +112,46 @@ def reload_plots(self) -> None:
         
         self.logger.debug('Plots/Stats frame reloaded')
 
+    def show_snapshot(self, snapshot: dict) -> None:
+        """Show rendered plots with `SnapshotFrame`.
+
+        Args:
+            snapshot (dict): Written by `SMIT.gui.plots.PlotFrame` or `SMIT.pipeline.Pipeline`.
+        """
+        if hasattr(self, 'plot_frame'):
+            self.plot_frame.destroy()
+
+        if hasattr(self, 'stats_frame'):
+            self.stats_frame.destroy()
+
+        self.plot_frame = SnapshotFrame(self, snapshot)
+        self.plot_frame.grid(row=0, column=1, rowspan=4, sticky='ew')
+
+        self.stats_frame = StatsFrame(self)
+        self.stats_frame.grid(row=3, column=0, sticky='ew')
+
+        self.logger.debug('Plot snapshot shown')
+
+    def _refresh_snapshot(self) -> None:
+        """Replace snapshot with live plots if data changed.
+
+        Compare the fingerprint stored with the snapshot against the
+        fingerprints of the current data files and the slice end date.
+        Only on mismatch the dataframes are created and the plots are drawn.
+
+        Note:
+            Tkinter widgets have to be created in the main thread.
+            The refresh is scheduled with `after` so the window
+            is drawn before the check runs.
+        """
+        slice_end = self.user.pipeline.slice_dates()[1]
+        if self.user.os_tools.plot_fingerprint(slice_end) == self.plot_frame.fingerprint:
+            self.user.os_tools.register_fingerprints(self.plot_frame.fingerprint['data'])
+            self.logger.info('Plot snapshot up to date')
+        else:
+            self.logger.info('Data changed since last run, redraw plots')
+            self.reload_plots()
+
     def initiate_dummy(self) -> None:
         """Set dummy flag and close main window.
         """
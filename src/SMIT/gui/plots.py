@@ -3,20 +3,22 @@
 ---
 
 - Create pandas dataframes
-- Use matplotlib and seaborn to draw plots 
+- Wrap figures from `SMIT.gui.figures` in Tk canvases
+- Save rendered plots as snapshot for fast startup
 
 Typical usage:
 
     windowframe = PlotFrame()
 """
-import datetime as dt
+import io
+import pathlib as pl
 import pandas as pd
 import matplotlib
-import matplotlib.dates as md
-from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg)
-import seaborn as sns
 import customtkinter as ctk
+from SMIT.gui import figures
+# Instrumentation
+from SMIT.metrics import timed
 
 matplotlib.use('TkAgg')
 
@@ -27,33 +29,61 @@ class PlotFrame(ctk.CTkFrame):
     - Create day/night/slice dataframe
     - Create and arrange widgets for matplotlib canvases
     - Functions to draw matplotlib canvases
+    - Save snapshot of rendered plots
 
     Returns:
 
     """
+    @timed('plot.frame')
     def __init__(self, master):
         super().__init__(master)
 
         self.master = master
 
-        if self.master.user.dummy is True:
-            self.slice_start = '2023-03-24'
-            self.slice_end = '2023-03-31'
-        else:          
-            self.slice_start = str((dt.datetime.today() - dt.timedelta(days=7)))[:10]
-            self.slice_end = str((dt.datetime.today() - dt.timedelta(days=1)))[:10]
+        self.slice_start, self.slice_end = self.master.user.pipeline.slice_dates()
+
+        # Fingerprint before reading, later file changes trigger a refresh
+        self.fingerprint = self.master.user.os_tools.plot_fingerprint(self.slice_end)
+
+        profiler = self.master.user.profiler
 
         # Create dataframes
-        self.df_day = self._create_dataframes('day_meter')
-        self.df_night = self._create_dataframes('night_meter')
-        self.df_slice = self._slice_dataframe(self.slice_start, self.slice_end, self.df_day, self.df_night)
+        with profiler.phase('ingest'):
+            self.df_day = self._create_dataframes('day_meter')
+            self.df_night = self._create_dataframes('night_meter')
+            self.df_slice = self._slice_dataframe(self.slice_start, self.slice_end)
+            self.stats = self.master.user.pipeline.stats(self.df_slice)
         # Create plots
-        day = self._seaborn_bar_plot(self.df_day, 'Day').get_tk_widget()
-        day.grid(row=0)
-        night = self._seaborn_bar_plot(self.df_night, 'Night').get_tk_widget()
-        night.grid(row=1)
-        day_slice = self._mpl_slice_plot(self.df_slice, 'Last Week').get_tk_widget()
-        day_slice.grid(row=2)
+        with profiler.phase('plots'):
+            self.canvases = dict()
+            self.canvases['day'] = self._seaborn_bar_plot(self.df_day, 'Day')
+            self.canvases['night'] = self._seaborn_bar_plot(self.df_night, 'Night')
+            self.canvases['slice'] = self._mpl_slice_plot(self.df_slice, 'Last Week')
+            for row, canvas in enumerate(self.canvases.values()):
+                canvas.get_tk_widget().grid(row=row)
+
+            self._save_snapshot()
+
+    @timed('plot.save_snapshot')
+    def _save_snapshot(self) -> None:
+        """Store rendered plots and stats for the next startup.
+
+        Each canvas is written as `.png` file to the cache folder.
+        The fingerprint and stats values are stored with
+        `SMIT.filepersistence.Persistence.save_plot_snapshot`.
+        All files are written in one storage batch.
+        """
+        storage = self.master.user.storage
+        cache = pl.Path(self.master.user.Folder['cache'])
+        images = dict()
+        with storage.batch():
+            for name, canvas in self.canvases.items():
+                images[name] = cache / f'{name}.png'
+                buffer = io.BytesIO()
+                canvas.figure.savefig(buffer, format='png', dpi=canvas.figure.dpi)
+                storage.write_bytes(images[name], buffer.getvalue())
+
+            self.master.user.persistence.save_plot_snapshot(self.fingerprint, self.stats, images)
 
     def _create_dataframes(self, meter: str) -> pd.DataFrame:
         """Generate data frames for plots.
@@ -71,32 +101,23 @@ def _create_dataframes(self, meter: str) -> pd.DataFrame:
         
         return dataframe
     
-    def _slice_dataframe(self, st_date: str, end_date: str, day: pd.DataFrame, night: pd.DataFrame) -> pd.DataFrame:
+    @timed('plot.slice')
+    def _slice_dataframe(self, st_date: str, end_date: str) -> pd.DataFrame:
         """Create sliced dataframe for plots.
 
+        Select the range from the materialized day + night total
+        with `SMIT.timeseries.SeriesStore.get_range`.
+
         Attributes:
 
             st_date (str): Start date for data slice; Format: 'YYYY-MM-DD'  
             end_date (str): End date for data slice; Format: 'YYYY-MM-DD' 
-            day (pd.DataFrame): Data frame with measurements for day meter 
-            night (pd.DataFrame): Data frame with measurements for night meter 
 
         Returns:
             dataframe (`pd.DataFrame`): Sum of power readings for day/night meter
 
         """
-        df_day = day[['date', 'verbrauch']]
-        df_night = night[['date', 'verbrauch']]
-        
-        df_sum = pd.merge(df_day, df_night, on='date', suffixes=('_day', '_night'))
-        df_sum['sum_verbrauch'] = df_sum['verbrauch_day'] + df_sum['verbrauch_night']
-        df_sum = df_sum.round(0)
-
-        df_sum['median30'] = df_sum['sum_verbrauch'].rolling(30).median()
-        df_sum['median7'] = df_sum['sum_verbrauch'].rolling(7).median()
-
-        dataframe = df_sum[['date', 'sum_verbrauch', 'median30', 'median7']]
-        dataframe = dataframe[(dataframe['date'] >= st_date) & (dataframe['date'] <= end_date)]
+        dataframe = self.master.user.series.get_range(['total'], st_date, end_date)
 
         self.master.logger.debug(f'Sliced dataframe with start: {st_date} and end: {end_date} created')
 
@@ -112,31 +133,9 @@ def _mpl_bar_plot(self,df: pd.DataFrame,title: str) -> FigureCanvasTkAgg:
         Returns:
             FigureCanvasTkAgg: Input canvas for gui widget
         """
-        # create a figure
-        figure = Figure(figsize=(9, 3), dpi=100)
-
-        # create FigureCanvasTkAgg object
-        figure_canvas = FigureCanvasTkAgg(figure, self)
-
-        # create the toolbar
-        #NavigationToolbar2Tk(figure_canvas, self)
-
-        # create axes
-        axes = figure.add_subplot()
-
-        # create the barchart
-        axes.bar(df['date'], df['verbrauch'])
-
-        # Format labels
-        axes.xaxis.set_major_locator(md.MonthLocator())
-        axes.xaxis.set_major_formatter(md.DateFormatter('%b'))
-        axes.set_ylabel('Consumption [Wh]', labelpad = 0, fontsize = 12)
-
-        axes.set_title(title)
-        #axes.set_xlabel('')
-
-        return figure_canvas
+        return FigureCanvasTkAgg(figures.bar_figure(df, title), self)
 
+    @timed('plot.render_bar')
     def _seaborn_bar_plot(self, df, title) -> FigureCanvasTkAgg:
         """Draw a seaborn bar plot on a matplotlib canvas.
 
@@ -147,25 +146,9 @@ def _seaborn_bar_plot(self, df, title) -> FigureCanvasTkAgg:
         Returns:
             FigureCanvasTkAgg: Input canvas for gui widget
         """
-        figure = Figure(figsize =(9,3), dpi=100)
-        figure_canvas = FigureCanvasTkAgg(figure, self)
-
-        axes = figure.add_subplot()
-
-        sns.barplot(data=df,
-                    x='date',
-                    y='verbrauch',
-                    color='#3a7ebf',
-                    ax=axes)
-        
-        axes.set_ylabel('Consumption [Wh]', labelpad = 0, fontsize = 12)
-        axes.xaxis.set_major_locator(md.MonthLocator())
-        axes.xaxis.set_major_formatter(md.DateFormatter('%b'))
-
-        axes.set_title(title)
-        axes.set_xlabel('')
-        return figure_canvas
+        return FigureCanvasTkAgg(figures.seaborn_bar_figure(df, title), self)
     
+    @timed('plot.render_slice')
     def _mpl_slice_plot(self, df, title) -> FigureCanvasTkAgg:
         """Use sliced dataframe for matplotlib bar plot.
 
@@ -176,22 +159,7 @@ def _mpl_slice_plot(self, df, title) -> FigureCanvasTkAgg:
         Returns:
             FigureCanvasTkAgg: Input canvas for gui widget
         """
-        figure = Figure(figsize =(9,3), dpi=100)
-        figure_canvas = FigureCanvasTkAgg(figure, self)
-        
-        axes = figure.add_subplot()
-        axes.bar(df['date'], df['sum_verbrauch'])
-
-        myFmt = md.DateFormatter('%a')
-        axes.xaxis.set_major_formatter(myFmt)
-
-        axes.set_title(title)
-        axes.set_xlabel('')
-        axes.spines[['top', 'bottom', 'right', 'left']].set_visible(False)
-        axes.set_ylabel('Consumption [Wh]', labelpad = 0, fontsize = 12)
-        axes.bar_label(axes.containers[0])  # show values with bars
-
-        return figure_canvas
+        return FigureCanvasTkAgg(figures.slice_figure(df, title), self)
     
 # Pdoc config get underscore methods
 __pdoc__ = {name: True
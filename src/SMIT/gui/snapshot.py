@@ -0,0 +1,66 @@
+"""Show rendered plots from the last run.
+
+---
+
+- Load plot images from snapshot cache
+- Arrange images like the plot frame
+
+Typical usage:
+
+    windowframe = SnapshotFrame()
+"""
+from PIL import Image
+import customtkinter as ctk
+
+class SnapshotFrame(ctk.CTkFrame):
+    """Setup plot column from a persisted snapshot.
+
+    - Load `.png` files written by `SMIT.gui.plots.PlotFrame`
+    - Create and arrange label widgets for the images
+    - Provide fingerprint and stats of the snapshot
+
+    Attributes:
+
+        snapshot (dict): Loaded with `SMIT.filepersistence.Persistence.load_plot_snapshot`
+
+    Returns:
+
+    """
+    def __init__(self, master, snapshot: dict):
+        super().__init__(master)
+
+        self.master = master
+        self.fingerprint = snapshot['fingerprint']
+        self.stats = snapshot['stats']
+
+        # Keep image references, otherwise tkinter drops them
+        self.images = dict()
+        for row, (name, path) in enumerate(snapshot['images'].items()):
+            with self.master.user.storage.open_read(path) as file:
+                image = Image.open(file)
+                image.load()
+            self.images[name] = ctk.CTkImage(light_image=image,
+                                             dark_image=image,
+                                             size=image.size)
+            label = ctk.CTkLabel(self, image=self.images[name], text='')
+            label.grid(row=row)
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
@@ -19,6 +19,9 @@ class StatsFrame(ctk.CTkFrame):
     - Show rolling median value for:   
         - last seven days
         - last 30 days
+    - Show precomputed aggregates for:
+        - consumption of the running month
+        - change against the same month last year
 
     Returns:
 
@@ -27,8 +30,10 @@ def __init__(self, master):
         super().__init__(master)
 
         # Text variables for entries
-        self.stat_week = tk.StringVar(value=master.plot_frame.df_slice.iloc[-1,-1])
-        self.stat_month = tk.StringVar(value=master.plot_frame.df_slice.iloc[-1,-2])
+        self.stat_week = tk.StringVar(value=master.plot_frame.stats['week'])
+        self.stat_month = tk.StringVar(value=master.plot_frame.stats['month'])
+        self.stat_month_sum = tk.StringVar(value=self._format(master.plot_frame.stats.get('month_sum'), '.0f'))
+        self.stat_month_yoy = tk.StringVar(value=self._format(master.plot_frame.stats.get('month_yoy'), '+.1%'))
 
 
         self.title = ctk.CTkLabel(
@@ -46,6 +51,16 @@ def __init__(self, master):
             text='Last month [Wh/day]: '
         )
         self.month_lbl.grid(row=2, column=0, padx=20, pady=5)
+        self.month_sum_lbl = ctk.CTkLabel(
+            self,
+            text='This month [Wh]: '
+        )
+        self.month_sum_lbl.grid(row=3, column=0, padx=20, pady=5)
+        self.month_yoy_lbl = ctk.CTkLabel(
+            self,
+            text='Month vs. last year: '
+        )
+        self.month_yoy_lbl.grid(row=4, column=0, padx=20, pady=5)
 
         # Entries
         self.entry_week = ctk.CTkEntry(
@@ -60,6 +75,31 @@ def __init__(self, master):
             width=75)
         self.entry_month.grid(row=2, column=1, padx=(20, 20), pady=5)
 
+        self.entry_month_sum = ctk.CTkEntry(
+            self,
+            textvariable=self.stat_month_sum,
+            width=75)
+        self.entry_month_sum.grid(row=3, column=1, padx=(20, 20), pady=5)
+
+        self.entry_month_yoy = ctk.CTkEntry(
+            self,
+            textvariable=self.stat_month_yoy,
+            width=75)
+        self.entry_month_yoy.grid(row=4, column=1, padx=(20, 20), pady=5)
+
+    @staticmethod
+    def _format(value: float | None, spec: str) -> str:
+        """Format a stats value for an entry widget.
+
+        Args:
+            value (float | None): Value from the stats dict.
+            spec (str): Format specification.
+
+        Returns:
+            str: Formatted value, '-' if no value exists.
+        """
+        return '-' if value is None else format(value, spec)
+
 # Pdoc config get underscore methods
 __pdoc__ = {name: True
             for name, classes in globals().items()
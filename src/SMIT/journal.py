@@ -0,0 +1,498 @@
+"""Scrape state journal
+
+---
+`ScrapeJournal`
+---------------
+
+- Hold scrape dates (`start`, `end`, `last_scrape`) in memory.
+- Record scrape attempts per meter and date range with
+  outcome, duration and downloaded bytes.
+- Write changes behind to a SQLite database.
+- Plan the next scrape range per meter.
+- Report scrape throughput.
+- Record the latency of each scraper step over runs.
+- Report latency percentiles and histograms per step.
+
+The database replaces the pickled `dates.pkl`. An existing
+`dates.pkl` is imported on first use.
+
+Typical usage:
+
+    app = Application()
+    start, end = app.journal.plan(meter)
+    app.journal.record(meter, start, end, 'ok', duration)
+    app.journal.flush()
+"""
+import atexit
+import datetime as dt
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import weakref
+import numpy as np
+# Bucket bounds
+from SMIT.metrics import BUCKETS
+# Type hints
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from SMIT.application import Application
+
+# Date format of the scrape dates, same as the portal web form
+DATE_FORMAT = '%d-%m-%Y'
+# Days before the last scraped day which are scraped again, the portal updates late
+RESCRAPE_DAYS = 4
+# Number of buffered attempts and steps which triggers a write
+FLUSH_THRESHOLD = 50
+# Most recent latencies per step used for the step statistics
+STEP_SAMPLES = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    meter TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    bytes INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS attempts_meter ON attempts (meter, outcome, end);
+CREATE TABLE IF NOT EXISTS steps (
+    step TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    seconds REAL NOT NULL,
+    outcome TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS steps_step ON steps (step, started_at);
+"""
+
+# Journals flushed on interpreter exit, closed or collected journals drop out
+_OPEN_JOURNALS = weakref.WeakSet()
+
+
+def _flush_open_journals() -> None:
+    """Write remaining changes of all open journals on interpreter exit."""
+    for journal in list(_OPEN_JOURNALS):
+        journal._flush_at_exit() # pylint: disable=protected-access
+
+
+atexit.register(_flush_open_journals)
+
+
+class ScrapeJournal():
+    """SQLite journal for scrape dates and attempts.
+
+    ---
+
+    The state and the most recent successful range per meter are
+    loaded once and kept in memory. Changes are buffered and written
+    in one transaction by `flush`, which is called at the end of a
+    scrape run, when `FLUSH_THRESHOLD` attempts are buffered and on
+    interpreter exit. With `Options['storage']` set to 'memory' an
+    in-memory database is used.
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+        path (str | None = None): Database file, defaults to `Path['scrape_journal']`.
+    """
+    def __init__(self, app: 'Application', path: str | None = None) -> None:
+
+        self.user = app
+        self.logger = app.logger
+        if path is not None:
+            self.path = str(path)
+        elif self.user.Options['storage'] == 'memory':
+            self.path = ':memory:'
+        else:
+            self.path = str(self.user.Path['scrape_journal'])
+        self._connection = None
+        # Device and inode of the database file when it was opened
+        self._file_id = None
+        self._lock = threading.RLock()
+        self._state = None
+        # Key: meter number, value: end date of the last successful attempt
+        self._last_success = dict()
+        self._pending_state = False
+        self._pending_attempts = list()
+        self._pending_steps = list()
+        _OPEN_JOURNALS.add(self)
+        msg  = f'Class {self.__class__.__name__} of the '
+        msg += f'module {self.__class__.__module__} '
+        msg +=  'successfully initialized.'
+        self.logger.debug(msg)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database and load the state on first use.
+
+        Returns:
+            sqlite3.Connection: Open connection.
+        """
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self._file_id = self._database_id()
+            self._load()
+            if not self._state:
+                self._import_dates_pickle()
+
+            self.logger.debug(f'Scrape journal {self.path} opened')
+
+        return self._connection
+
+    def _load(self) -> None:
+        """Read state and last successful ranges from the database."""
+        self._state = dict(self._connection.execute('SELECT key, value FROM state'))
+        self._last_success = {meter: dt.date.fromisoformat(end) for meter, end in self._connection.execute(
+            "SELECT meter, MAX(end) FROM attempts WHERE outcome = 'ok' GROUP BY meter")}
+
+    def reload(self) -> None:
+        """Write buffered changes and read the database again.
+
+        Picks up changes of other processes, e.g. after
+        waiting for their scrape run.
+        """
+        with self._lock:
+            self.flush()
+            if self._connection is not None:
+                self._load()
+
+        self.logger.debug(f'Scrape journal {self.path} reloaded')
+
+    def _import_dates_pickle(self) -> None:
+        """Take over the state of a `dates.pkl` from older versions."""
+        dates_file = self.user.Path['persist_dates']
+        if self.user.storage.exists(dates_file):
+            self._state = pickle.loads(self.user.storage.read_bytes(dates_file))
+            self._pending_state = True
+            self.logger.info(f'Scrape dates imported from {dates_file}')
+
+    @property
+    def state(self) -> dict:
+        """Copy of the scrape dates, empty before initialization."""
+        with self._lock:
+            self._connect()
+            return dict(self._state)
+
+    def initialize_state(self) -> None:
+        """Set scrape dates for the initial run.
+
+        Start with the date from `Init['csv_startDate']`, does
+        nothing if a state exists.
+        """
+        with self._lock:
+            self._connect()
+            if not self._state:
+                self._state = {'start': self.user.Init['csv_startDate'],
+                               'end': (dt.date.today() - dt.timedelta(days=1)).strftime(DATE_FORMAT),
+                               'last_scrape': 'never'}
+                self._pending_state = True
+
+    def update_state(self, dates: dict) -> None:
+        """Replace the scrape dates, written on the next `flush`.
+
+        Args:
+            dates (dict): Keys: [`start`, `end`, `last_scrape`].
+        """
+        with self._lock:
+            self._connect()
+            self._state = dict(dates)
+            self._pending_state = True
+
+    def plan(self, meter: str) -> tuple[str, str]:
+        """Date range for the next scrape of a meter.
+
+        Start `RESCRAPE_DAYS` before the end of the last successful
+        attempt, failed attempts are scraped again. Without a
+        successful attempt start at the `start` scrape date.
+        End is yesterday.
+
+        Args:
+            meter (string): Day/Night meter device number.
+
+        Returns:
+            tuple: (start, end), format: 'dd-mm-yyyy'.
+        """
+        with self._lock:
+            self._connect()
+            if not self._state:
+                self.initialize_state()
+            end = dt.date.today() - dt.timedelta(days=1)
+            last = self._last_success.get(str(meter))
+            if last is None:
+                start = dt.datetime.strptime(self._state['start'], DATE_FORMAT).date()
+            else:
+                start = last - dt.timedelta(days=RESCRAPE_DAYS)
+
+        return min(start, end).strftime(DATE_FORMAT), end.strftime(DATE_FORMAT)
+
+    def is_current(self, meter: str) -> bool:
+        """Check if a meter was downloaded up to yesterday.
+
+        Checkpoint for retries, a meter downloaded in a failed
+        run is not downloaded again on the same day.
+
+        Args:
+            meter (string): Day/Night meter device number.
+
+        Returns:
+            bool: True if a successful attempt ends yesterday or later.
+        """
+        with self._lock:
+            self._connect()
+            last = self._last_success.get(str(meter))
+
+        return last is not None and last >= dt.date.today() - dt.timedelta(days=1)
+
+    def record(self, meter: str, start: str, end: str, outcome: str,
+               duration: float, size: int | None = None, error: str | None = None) -> None:
+        """Record one scrape attempt.
+
+        Args:
+            meter (string): Day/Night meter device number.
+            start (string): First scraped day, format: 'dd-mm-yyyy'.
+            end (string): Last scraped day, format: 'dd-mm-yyyy'.
+            outcome (string): 'ok' or 'failed'.
+            duration (float): Duration of the attempt in seconds.
+            size (int | None = None): Downloaded bytes, can be set later
+                with `SMIT.journal.ScrapeJournal.add_bytes`.
+            error (string | None = None): Error message of a failed attempt.
+        """
+        meter = str(meter)
+        end_date = dt.datetime.strptime(end, DATE_FORMAT).date()
+        attempt = {'meter': meter,
+                   'start': dt.datetime.strptime(start, DATE_FORMAT).date().isoformat(),
+                   'end': end_date.isoformat(),
+                   'started_at': time.time() - duration,
+                   'duration': duration,
+                   'outcome': outcome,
+                   'bytes': size,
+                   'error': error}
+
+        with self._lock:
+            self._connect()
+            self._pending_attempts.append(attempt)
+            if outcome == 'ok' and end_date > self._last_success.get(meter, dt.date.min):
+                self._last_success[meter] = end_date
+            if len(self._pending_attempts) >= FLUSH_THRESHOLD:
+                self.flush()
+
+        self.logger.debug(f'Scrape attempt for meter: {meter} from {start} to {end}: {outcome}')
+
+    def record_step(self, step: str, seconds: float, outcome: str = 'ok') -> None:
+        """Record the latency of one scraper step.
+
+        Args:
+            step (string): Step name, e.g. a key of `SMIT.scrapedata.XPATHS`.
+            seconds (float): Wait until the step was done.
+            outcome (string = 'ok'): 'ok' or 'timeout'.
+        """
+        with self._lock:
+            self._pending_steps.append((step, time.time() - seconds, seconds, outcome))
+            if len(self._pending_steps) >= FLUSH_THRESHOLD:
+                self.flush()
+
+    def step_latencies(self, samples: int = STEP_SAMPLES) -> dict:
+        """Most recent successful latencies per step.
+
+        Args:
+            samples (int = STEP_SAMPLES): Maximum latencies per step.
+
+        Returns:
+            dict: Step as key, list of seconds as value.
+        """
+        self.flush()
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT step, seconds FROM ('
+                '  SELECT step, seconds, ROW_NUMBER() OVER (PARTITION BY step ORDER BY started_at DESC) AS age'
+                "  FROM steps WHERE outcome = 'ok')"
+                ' WHERE age <= ?', (samples,)).fetchall()
+
+        latencies = dict()
+        for step, seconds in rows:
+            latencies.setdefault(step, list()).append(seconds)
+
+        return latencies
+
+    def step_stats(self, days: int = 30) -> dict:
+        """Latency statistics per scraper step.
+
+        Args:
+            days (int = 30): Only count steps of the last n days.
+
+        Returns:
+            dict: Step as key, dict with keys [`count`, `timeouts`, `p50`,
+                `p90`, `p99`, `max`, `buckets`] as value. Percentiles in
+                seconds of successful steps, `buckets` are cumulative counts
+                per upper bound of `SMIT.metrics.BUCKETS`.
+        """
+        self.flush()
+        since = time.time() - days * 86400
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT step, seconds, outcome FROM steps WHERE started_at >= ?', (since,)).fetchall()
+
+        samples = dict()
+        timeouts = dict()
+        for step, seconds, outcome in rows:
+            samples.setdefault(step, list())
+            if outcome == 'ok':
+                samples[step].append(seconds)
+            else:
+                timeouts[step] = timeouts.get(step, 0) + 1
+
+        stats = dict()
+        for step, seconds in samples.items():
+            values = np.array(seconds)
+            p50, p90, p99 = np.percentile(values, [50, 90, 99]) if len(values) else (np.nan,) * 3
+            stats[step] = {'count': len(values),
+                           'timeouts': timeouts.get(step, 0),
+                           'p50': float(p50),
+                           'p90': float(p90),
+                           'p99': float(p99),
+                           'max': float(values.max()) if len(values) else np.nan,
+                           'buckets': {'+Inf' if bound == float('inf') else str(bound): int((values <= bound).sum())
+                                       for bound in BUCKETS}}
+
+        return stats
+
+    def add_bytes(self, meter: str, size: int) -> None:
+        """Add downloaded bytes to the last buffered attempt of a meter.
+
+        Args:
+            meter (string): Day/Night meter device number.
+            size (int): Bytes of the moved files.
+        """
+        with self._lock:
+            for attempt in reversed(self._pending_attempts):
+                if attempt['meter'] == str(meter):
+                    attempt['bytes'] = (attempt['bytes'] or 0) + size
+                    return
+
+    def flush(self) -> None:
+        """Write buffered state and attempts in one transaction."""
+        with self._lock:
+            if not self._pending_state and not self._pending_attempts and not self._pending_steps:
+                return
+
+            connection = self._connect()
+            with connection:
+                if self._pending_state:
+                    connection.executemany('INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)',
+                                           self._state.items())
+                connection.executemany(
+                    'INSERT INTO attempts (meter, start, end, started_at, duration, outcome, bytes, error) '
+                    'VALUES (:meter, :start, :end, :started_at, :duration, :outcome, :bytes, :error)',
+                    self._pending_attempts)
+                connection.executemany('INSERT INTO steps (step, started_at, seconds, outcome) VALUES (?, ?, ?, ?)',
+                                       self._pending_steps)
+
+            written = len(self._pending_attempts)
+            self._pending_state = False
+            self._pending_attempts = list()
+            self._pending_steps = list()
+
+        self.logger.debug(f'Scrape journal written with {written} attempts')
+
+    def _database_id(self) -> tuple[int, int] | None:
+        """Device and inode of the database file.
+
+        Returns:
+            tuple | None: None for an in-memory or missing database.
+        """
+        if self.path == ':memory:':
+            return None
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return info.st_dev, info.st_ino
+
+    def _flush_at_exit(self) -> None:
+        """Write remaining changes, errors are only logged.
+
+        Nothing is written if the database file was deleted or
+        replaced since it was opened, e.g. with a removed dummy
+        folder, no new database is created in its place.
+        """
+        if self._connection is not None and self.path != ':memory:' \
+                and self._database_id() != self._file_id:
+            self.logger.warning(f'Scrape journal {self.path} was removed, changes not written')
+            return
+        if self._connection is None and not os.path.isdir(os.path.dirname(os.path.abspath(self.path))):
+            return
+        try:
+            self.flush()
+        except (sqlite3.Error, OSError) as error:
+            self.logger.warning(f'Scrape journal not written: {error}')
+
+    def throughput(self, days: int = 30) -> dict:
+        """Scrape statistics per meter.
+
+        Args:
+            days (int = 30): Only count attempts of the last n days.
+
+        Returns:
+            dict: Meter as key, dict with keys [`attempts`, `failures`,
+                `bytes`, `seconds`, `bytes_per_second`] as value.
+        """
+        self.flush()
+        since = time.time() - days * 86400
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT meter, COUNT(*), SUM(outcome = 'failed'), COALESCE(SUM(bytes), 0), SUM(duration) "
+                'FROM attempts WHERE started_at >= ? GROUP BY meter', (since,)).fetchall()
+
+        return {meter: {'attempts': attempts,
+                        'failures': failures,
+                        'bytes': size,
+                        'seconds': seconds,
+                        'bytes_per_second': size / seconds if seconds else 0.0}
+                for meter, attempts, failures, size, seconds in rows}
+
+    def close(self) -> None:
+        """Write buffered changes and close the database.
+
+        A closed journal is no longer flushed on interpreter exit.
+        """
+        with self._lock:
+            self.flush()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+        _OPEN_JOURNALS.discard(self)
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
@@ -0,0 +1,203 @@
+"""Cross-process file lock
+
+---
+`FileLock`
+----------
+
+- Advisory lock on a file, shared by all processes on the machine.
+- Owner PID, host and start time stored in the lock file.
+- Recover locks of crashed processes.
+- Wait for the running owner ("join") or give up at once ("skip").
+
+The lock is held by the operating system (`fcntl.flock`, `msvcrt.locking`
+on Windows), so it is released when the owning process dies. The PID in
+the file is only used for reporting and to detect stale locks.
+
+Typical usage:
+
+    lock = FileLock(pathlib.Path('./log/scrape.lock'), app.logger)
+    if lock.acquire(blocking=True, timeout=600):
+        try:
+            ...
+        finally:
+            lock.release()
+"""
+import json
+import logging
+import os
+import pathlib as pl
+import socket
+import time
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Seconds between lock attempts while waiting
+POLL_INTERVAL = 0.2
+
+
+def _try_lock(file) -> bool:
+    """Non-blocking exclusive lock of an open file.
+
+    Args:
+        file: Open file object.
+
+    Returns:
+        bool: True if the lock was acquired.
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(file) -> None:
+    """Release the lock of an open file.
+
+    Args:
+        file: Open file object.
+    """
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock():
+    """Exclusive lock for one pipeline across processes.
+
+    ---
+
+    Attributes:
+        path (pathlib.Path): Lock file, created if missing.
+        logger (logging.Logger): Logger of the application.
+    """
+    def __init__(self, path: pl.Path, logger: logging.Logger) -> None:
+
+        self.path = pl.Path(path)
+        self.logger = logger
+        self._file = None
+        # Owner info of a recovered stale lock
+        self.recovered = None
+
+    @property
+    def locked(self) -> bool:
+        """Lock is held by this instance."""
+        return self._file is not None
+
+    def owner(self) -> dict | None:
+        """Owner info written to the lock file.
+
+        Returns:
+            dict | None: Keys: [`pid`, `host`, `started`].
+                `None` if the file is empty or missing.
+        """
+        try:
+            content = self.path.read_text(encoding='utf-8')
+        except OSError:
+            # Missing, or locked by the owner on Windows
+            return None
+        try:
+            return json.loads(content) if content else None
+        except ValueError:
+            return None
+
+    def acquire(self, blocking: bool = False, timeout: float | None = None) -> bool:
+        """Take the lock.
+
+        If the lock file names an owner, but the lock is free,
+        the owner crashed. Its info is stored in `recovered`.
+
+        Args:
+            blocking (bool = False): Wait until the current owner releases the lock.
+            timeout (float | None = None): Maximum wait in seconds, `None` waits forever.
+
+        Returns:
+            bool: True if the lock was acquired.
+        """
+        if self.locked:
+            raise RuntimeError(f'Lock {self.path} already held by this instance')
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        file = open(self.path, 'a+', encoding='utf-8')
+        announced = False
+
+        while not _try_lock(file):
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                file.close()
+                return False
+            if not announced:
+                self.logger.info(f'Waiting for lock {self.path} held by {self.owner()}')
+                announced = True
+            time.sleep(POLL_INTERVAL)
+
+        self._file = file
+        previous = self.owner()
+        self.recovered = previous
+        if previous is not None:
+            self.logger.warning(f'Recovered stale lock {self.path} of {previous}')
+
+        file.seek(0)
+        file.truncate()
+        file.write(json.dumps({'pid': os.getpid(),
+                               'host': socket.gethostname(),
+                               'started': time.time()}))
+        file.flush()
+
+        self.logger.debug(f'Lock {self.path} acquired')
+        return True
+
+    def release(self) -> None:
+        """Clear owner info and release the lock."""
+        if not self.locked:
+            return
+
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.flush()
+        _unlock(self._file)
+        self._file.close()
+        self._file = None
+
+        self.logger.debug(f'Lock {self.path} released')
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire(blocking=True)
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
@@ -0,0 +1,295 @@
+"""Timing instrumentation for hot paths
+
+---
+`Metrics`
+---------
+
+- Time functions with the `timed` decorator.
+- Time code blocks with the `timer` context manager.
+- Collect per-stage histograms.
+- Export histograms as JSON or Prometheus textfile.
+
+Instrumentation is disabled by default. When disabled, `timed`
+and `timer` only check a flag and do not measure anything.
+
+Typical usage:
+
+    @timed('ingest.create_dataframe')
+    def create_dataframe(...):
+
+    with timer('plot.render'):
+        ...
+
+    app = Application()
+    app.metrics.export()
+"""
+import functools
+import json
+import pathlib as pl
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+# Type hints
+from typing import TYPE_CHECKING, Callable
+if TYPE_CHECKING:
+    from SMIT.application import Application
+
+# Upper bounds of the histogram buckets in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+
+class _Histogram():
+    """Duration histogram of one stage.
+    """
+    __slots__ = ('count', 'total', 'minimum', 'maximum', 'buckets')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float('inf')
+        self.maximum = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, seconds: float) -> None:
+        """Add one duration.
+
+        Args:
+            seconds (float): Measured duration.
+        """
+        self.count += 1
+        self.total += seconds
+        self.minimum = min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+
+    def as_dict(self) -> dict:
+        """JSON serializable representation.
+
+        Returns:
+            dict: Count, sum, min, max and cumulative bucket counts.
+        """
+        cumulative = 0
+        buckets = dict()
+        for bound, count in zip(BUCKETS, self.buckets):
+            cumulative += count
+            buckets['+Inf' if bound == float('inf') else str(bound)] = cumulative
+
+        return {'count': self.count,
+                'sum': self.total,
+                'min': self.minimum if self.count else None,
+                'max': self.maximum,
+                'buckets': buckets}
+
+
+class _Registry():
+    """Process wide store for stage histograms.
+    """
+    def __init__(self) -> None:
+        self.enabled = False
+        self.histograms = dict()
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Add a duration to the histogram of a stage.
+
+        Args:
+            stage (string): Name of the measured stage.
+            seconds (float): Measured duration.
+        """
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = _Histogram()
+            self.histograms[stage].observe(seconds)
+
+    def snapshot(self) -> dict:
+        """Copy of all histograms.
+
+        Returns:
+            dict: Stage as key, `_Histogram.as_dict` as value.
+        """
+        with self._lock:
+            return {stage: histogram.as_dict()
+                    for stage, histogram in sorted(self.histograms.items())}
+
+    def reset(self) -> None:
+        """Remove all histograms.
+        """
+        with self._lock:
+            self.histograms.clear()
+
+
+_REGISTRY = _Registry()
+_DISABLED = nullcontext()
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Record a duration measured elsewhere.
+
+    Args:
+        stage (string): Name of the measured stage.
+        seconds (float): Measured duration.
+    """
+    if _REGISTRY.enabled:
+        _REGISTRY.observe(stage, seconds)
+
+
+@contextmanager
+def _measure(stage: str):
+    """Measure the duration of a `with` block.
+
+    Args:
+        stage (string): Name of the measured stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _REGISTRY.observe(stage, time.perf_counter() - start)
+
+
+def timer(stage: str):
+    """Context manager for timing a code block.
+
+    Args:
+        stage (string): Name of the measured stage.
+
+    Returns:
+        Context manager, a shared no-op if instrumentation is disabled.
+    """
+    if not _REGISTRY.enabled:
+        return _DISABLED
+    return _measure(stage)
+
+
+def timed(stage: str) -> Callable:
+    """Decorator for timing a function or method.
+
+    Args:
+        stage (string): Name of the measured stage.
+
+    Returns:
+        Callable: Decorator.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _REGISTRY.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _REGISTRY.observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class Metrics():
+    """Control and export of timing instrumentation.
+
+    ---
+
+    Enable instrumentation with `Options['metrics']`.
+    The export format is chosen by the file suffix of
+    `Path['metrics_file']`: `.prom` writes the Prometheus
+    textfile format, everything else writes JSON.
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+    """
+    def __init__(self, app: 'Application') -> None:
+
+        self.user = app
+        self.logger = app.logger
+        self.enabled = self.user.Options['metrics']
+        msg  = f'Class {self.__class__.__name__} of the '
+        msg += f'module {self.__class__.__module__} '
+        msg +=  'successfully initialized.'
+        self.logger.debug(msg)
+
+    @property
+    def enabled(self) -> bool:
+        """Instrumentation state, shared by all instances."""
+        return _REGISTRY.enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        _REGISTRY.enabled = bool(value)
+
+    def snapshot(self) -> dict:
+        """Current histograms of all stages.
+
+        Returns:
+            dict: Stage as key, histogram values as value.
+        """
+        return _REGISTRY.snapshot()
+
+    def _prometheus(self, histograms: dict) -> str:
+        """Render histograms in Prometheus text format.
+
+        Args:
+            histograms (dict): Output of `SMIT.metrics.Metrics.snapshot`.
+
+        Returns:
+            string: Content for a node exporter textfile.
+        """
+        lines = ['# HELP smit_stage_seconds Duration of SMIT stages.',
+                 '# TYPE smit_stage_seconds histogram']
+        for stage, histogram in histograms.items():
+            for bound, count in histogram['buckets'].items():
+                lines.append(f'smit_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'smit_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]}')
+            lines.append(f'smit_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self, file_path: pl.Path | None = None) -> None:
+        """Write histograms to the metrics file.
+
+        The file is replaced atomically by `SMIT.storage`,
+        so a collector never reads a partial file. Nothing
+        is written if instrumentation is disabled.
+
+        Args:
+            file_path (pathlib.Path | None): Defaults to `Path['metrics_file']`.
+        """
+        if not self.enabled:
+            return
+
+        path = pl.Path(file_path or self.user.Path['metrics_file']).absolute()
+        histograms = self.snapshot()
+        if path.suffix == '.prom':
+            content = self._prometheus(histograms)
+        else:
+            content = json.dumps({'exported': time.time(), 'stages': histograms}, indent=2)
+
+        self.user.storage.write_text(path, content)
+
+        self.logger.debug(f'Metrics written to {path}')
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
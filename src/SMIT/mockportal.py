@@ -0,0 +1,347 @@
+"""Local stand-in for the Stromnetz Graz portal
+
+---
+`MockPortal`
+------------
+
+- Login form, dashboard and data page with the DOM structure
+  expected by `SMIT.scrapedata.XPATHS`.
+- Meter point dropdown, unit and period selector, date inputs.
+- `.csv` download generated by `SMIT.synthetic`.
+- Any number of synthetic accounts with two meters each.
+- Configurable latency with seeded jitter.
+- Request, login and download counters for load tests.
+
+Data of a meter is generated once from `data_start` to yesterday
+and cached, downloads are slices of it. Meter readings of
+overlapping downloads are identical.
+
+Typical usage:
+
+    with MockPortal(app.logger, accounts=20, latency=0.2) as portal:
+        app.scrape.download_meters(folder, True, portal.url, portal.accounts[0])
+
+    python -m SMIT.mockportal --accounts 20 --latency 0.2 --port 8080
+"""
+import argparse
+import datetime as dt
+import functools
+import html
+import logging
+import random
+import secrets
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs
+# Portal data
+from SMIT.replay import LocalServer, Response
+from SMIT.synthetic import export_filename, generate_exports
+
+# Number of meters with cached data
+CACHE_SIZE = 256
+
+_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8" /><title>Stromnetz Graz</title>
+<style>.hidden {{ display: none; }} a, div[onclick], span {{ cursor: pointer; }}</style>
+</head>
+<body><div><app-root><main><div>{content}</div></main></app-root></div>
+{script}
+</body></html>"""
+
+_LOGIN = """<app-login>
+<div><h1>Anmeldung</h1>{error}</div>
+<div><div><form method="post" action="/login">
+  <div><input name="email" type="text" /></div>
+  <div><input name="password" type="password" /></div>
+  <div><button type="submit">Anmelden</button></div>
+</form></div></div>
+</app-login>"""
+
+_DASHBOARD = """<app-dashboard>
+<div><h1>Willkommen</h1></div>
+<div><div><div><div><div onclick="window.location.href = 'overview'">Verbrauchsdaten</div></div></div></div></div>
+</app-dashboard>"""
+
+_OVERVIEW = """<app-overview>
+<reports-nav>
+  <app-header-nav><nav><div><div><div><div>
+    <div>Berichte</div>
+    <div><div>
+      <div>Tabelle</div>
+      <div>Grafik</div>
+      <div><div>
+        <div>Export</div>
+        <div><span id="download">CSV</span></div>
+      </div></div>
+    </div></div>
+  </div></div></div></div></nav></app-header-nav>
+  <app-meter-point-selector><div>
+    <div>Zählpunkt</div>
+    <div><div><div><ul><li>
+      <a id="meter">{day_meter}</a>
+      <ul id="meters" class="hidden">
+        <li><a data-meter="{day_meter}">Tagstrom {day_meter}</a></li>
+        <li><a data-meter="{night_meter}">Nachtstrom {night_meter}</a></li>
+      </ul>
+    </li></ul></div></div></div>
+  </div></app-meter-point-selector>
+</reports-nav>
+<div>
+  <div><h1>Verbrauchsdaten</h1></div>
+  <div>
+    <div>Einheit</div>
+    <div></div>
+    <div><app-unit-selector><div><div data-unit="kWh">kWh</div><div data-unit="Wh">Wh</div></div></app-unit-selector></div>
+  </div>
+  <app-period-selector>
+    <div><div>
+      <div>Tag</div><div>Woche</div><div>Monat</div><div>Jahr</div><div><div id="daily">Tageswerte</div></div>
+    </div></div>
+    <div id="period" class="hidden"><div><div><div>
+      <div>Zeitraum</div>
+      <div>
+        <div><input id="fromDayOverviewDate" type="date" /><button type="button">Kalender</button><input id="toDayOverviewDate" type="date" /></div>
+        <div><div></div><div><button id="confirm" type="button">Übernehmen</button></div></div>
+      </div>
+    </div></div></div></div>
+  </app-period-selector>
+</div>
+</app-overview>"""
+
+_OVERVIEW_SCRIPT = """<script>
+(function () {
+  var state = {meter: '%(day_meter)s', from: null, to: null};
+  function byId(id) { return document.getElementById(id); }
+  byId('meter').addEventListener('click', function () { byId('meters').classList.toggle('hidden'); });
+  document.querySelectorAll('#meters a').forEach(function (link) {
+    link.addEventListener('click', function () {
+      state.meter = link.dataset.meter;
+      byId('meter').textContent = state.meter;
+      byId('meters').classList.add('hidden');
+    });
+  });
+  byId('daily').addEventListener('click', function () { byId('period').classList.remove('hidden'); });
+  byId('confirm').addEventListener('click', function () {
+    state.from = byId('fromDayOverviewDate').value;
+    state.to = byId('toDayOverviewDate').value;
+  });
+  byId('download').addEventListener('click', function () {
+    window.location.href = 'download?meter=' + state.meter + '&from=' + (state.from || '') + '&to=' + (state.to || '');
+  });
+})();
+</script>"""
+
+
+class MockPortal(LocalServer):
+    """Local portal with synthetic accounts.
+
+    ---
+
+    Account `n` logs in with 'user{n}@example.com' and 'password{n}'
+    and owns the day meter `200000 + 2n` and the night meter
+    `200001 + 2n`. A login returns a session url, the session
+    selects the account for all following pages.
+
+    Attributes:
+        logger (logging.Logger): Logger of the application.
+        accounts (int = 1): Number of synthetic accounts.
+        latency (float = 0.0): Seconds before each response.
+        jitter (float = 0.0): Maximum random seconds added to `latency`.
+        data_start (datetime.date = 2020-01-01): First day with data.
+        seed (int = 0): Seed for data and jitter.
+        port (int = 0): TCP port, 0 selects a free port.
+    """
+    def __init__(self, logger: logging.Logger,
+                 accounts: int = 1,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 data_start: dt.date = dt.date(2020, 1, 1),
+                 seed: int = 0,
+                 port: int = 0) -> None:
+
+        super().__init__(logger, port)
+        self.latency = latency
+        self.jitter = jitter
+        self.data_start = data_start
+        self.seed = seed
+        self.accounts = [{'username': f'user{number}@example.com',
+                          'password': f'password{number}',
+                          'day_meter': str(200000 + 2 * number),
+                          'night_meter': str(200001 + 2 * number)}
+                         for number in range(accounts)]
+        self._by_username = {account['username']: account for account in self.accounts}
+        # Key: session token, value: account
+        self._sessions = dict()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'logins': 0, 'failed_logins': 0, 'downloads': 0, 'bytes': 0}
+        self._export = functools.lru_cache(maxsize=CACHE_SIZE)(self._generate)
+
+    @property
+    def stats(self) -> dict:
+        """Copy of the counters.
+
+        Keys: [`requests`, `logins`, `failed_logins`,
+        `downloads`, `bytes`, `sessions`].
+        """
+        with self._lock:
+            return {**self._stats, 'sessions': len(self._sessions)}
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += value
+
+    def _delay(self) -> None:
+        """Wait the configured latency."""
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+    def _generate(self, meter: str, end: dt.date) -> tuple[str, list[str]]:
+        """Synthetic daily readings of one meter.
+
+        Args:
+            meter (string): Meter number.
+            end (datetime.date): Last day.
+
+        Returns:
+            tuple: (header line, data lines).
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            path, = generate_exports({'day': folder}, [meter], self.data_start, end,
+                                     chunk_days=(end - self.data_start).days + 1,
+                                     seed=self.seed * 1_000_003 + int(meter))
+            header, *lines = path.read_text(encoding='utf-8').splitlines(keepends=True)
+
+        return header, lines
+
+    def _download(self, account: dict, query: dict) -> Response:
+        """Daily readings of one meter as `.csv` attachment.
+
+        Args:
+            account (dict): Logged in account.
+            query (dict): Keys: [`meter`, `from`, `to`], dates as 'yyyy-mm-dd'.
+
+        Returns:
+            Response: Attachment, 400 for an invalid request.
+        """
+        meter = query.get('meter', [''])[0]
+        if meter not in (account['day_meter'], account['night_meter']):
+            return Response(400, 'text/plain', b'Unknown meter point')
+        try:
+            first = dt.date.fromisoformat(query['from'][0])
+            last = dt.date.fromisoformat(query['to'][0])
+        except (KeyError, ValueError):
+            return Response(400, 'text/plain', b'Invalid period')
+
+        yesterday = dt.date.today() - dt.timedelta(days=1)
+        first, last = max(first, self.data_start), min(last, yesterday)
+        if first > last:
+            return Response(400, 'text/plain', b'Invalid period')
+
+        header, lines = self._export(meter, yesterday)
+        lower, upper = first.isoformat(), last.isoformat()
+        body = (header + ''.join(line for line in lines if lower <= line[:10] <= upper)).encode('utf-8')
+        self._count('downloads')
+        self._count('bytes', len(body))
+
+        return Response(200, 'text/csv; charset=utf-8', body,
+                        {'Content-Disposition':
+                         f'attachment; filename="{export_filename(meter, first, last, "day")}"'})
+
+    def _login(self, body: bytes) -> Response:
+        """Check credentials and open a session.
+
+        Args:
+            body (bytes): Form data with `email` and `password`.
+
+        Returns:
+            Response: Redirect to the dashboard, login page on failure.
+        """
+        form = parse_qs(body.decode('utf-8'))
+        account = self._by_username.get(form.get('email', [''])[0])
+        if account is None or form.get('password', [''])[0] != account['password']:
+            self._count('failed_logins')
+            return self._html(_LOGIN.format(error='<p>Ungültige Anmeldedaten</p>'))
+
+        token = secrets.token_hex(8)
+        with self._lock:
+            self._sessions[token] = account
+        self._count('logins')
+
+        return Response(303, 'text/plain', b'', {'Location': f'/s/{token}/dashboard'})
+
+    @staticmethod
+    def _html(content: str, script: str = '') -> Response:
+        return Response(200, 'text/html; charset=utf-8',
+                        _PAGE.format(content=content, script=script).encode('utf-8'))
+
+    def handle(self, method: str, path: str, query: dict, body: bytes) -> Response:
+        self._count('requests')
+        self._delay()
+
+        if path in ('/', '/login'):
+            if method == 'POST':
+                return self._login(body)
+            return self._html(_LOGIN.format(error=''))
+
+        parts = path.strip('/').split('/')
+        with self._lock:
+            account = self._sessions.get(parts[1]) if len(parts) == 3 and parts[0] == 's' else None
+        if account is None:
+            return Response(303, 'text/plain', b'', {'Location': '/login'})
+
+        meters = {name: html.escape(account[name]) for name in ('day_meter', 'night_meter')}
+        if parts[2] == 'dashboard':
+            return self._html(_DASHBOARD)
+        if parts[2] == 'overview':
+            return self._html(_OVERVIEW.format(**meters), _OVERVIEW_SCRIPT % meters)
+        if parts[2] == 'download':
+            return self._download(account, query)
+
+        return Response(404, 'text/plain', b'Not found')
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the Stromnetz Graz portal')
+    parser.add_argument('--accounts', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before each response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Maximum random extra latency')
+    parser.add_argument('--data-start', type=dt.date.fromisoformat, default=dt.date(2020, 1, 1))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    portal = MockPortal(logging.getLogger('mockportal'), args.accounts, args.latency,
+                        args.jitter, args.data_start, args.seed, args.port).start()
+    print(f'Portal running on {portal.url}, login: user0@example.com / password0')
+    try:
+        while True:
+            time.sleep(60)
+            print(portal.stats)
+    except KeyboardInterrupt:
+        portal.stop()
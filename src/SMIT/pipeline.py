@@ -0,0 +1,403 @@
+"""Asynchronous data pipeline
+
+---
+`Pipeline`
+----------
+
+- Run scrape, move, ingest, aggregate and render as connected stages.
+- Connect the stages with bounded `asyncio` queues.
+- Run blocking Selenium, pandas and matplotlib work in executors.
+- Ingest and render each meter as soon as its file is moved.
+- Log stage timings and backpressure.
+
+Stages:
+
+- `scrape`: `SMIT.filehandling.OsInterface.sng_scrape_and_move`.
+  `SMIT.watcher.DownloadWatcher` moves the files as they land and
+  hands each meter to the ingest queue while the scrape goes on.
+- `ingest`: `SMIT.filehandling.OsInterface.create_dataframe` per meter,
+  meters are ingested in parallel.
+- `aggregate`: Last week slice and summary of the total consumption,
+  once all meters are ingested.
+- `render`: Figures from `SMIT.gui.figures` as `.png` images, written
+  as plot snapshot for `SMIT.gui.snapshot.SnapshotFrame`.
+
+If no meter was downloaded and the plot fingerprint equals the
+stored plot snapshot, ingest, aggregate and render are skipped
+and the stored snapshot is returned.
+
+A full queue blocks the producing stage, the wait is logged
+as backpressure. Matplotlib is not thread safe, all figures
+are rendered in one thread.
+
+Typical usage:
+
+    app = Application()
+    snapshot = app.pipeline.run()
+"""
+import asyncio
+import datetime as dt
+import io
+import pathlib as pl
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from SMIT.gui import figures
+# Instrumentation
+from SMIT.metrics import observe
+# Type hints
+from typing import TYPE_CHECKING, Callable
+if TYPE_CHECKING:
+    from SMIT.application import Application
+
+# Items per queue before the producing stage waits
+QUEUE_SIZE = 2
+# Meters ingested at the same time
+INGEST_WORKERS = 2
+# Days in the last week plot
+SLICE_DAYS = 7
+# Slice of the dummy data
+DUMMY_SLICE = ('2023-03-24', '2023-03-31')
+
+# Profiler phase per stage, the scrape phase is profiled in `sng_scrape_and_move`
+PHASES = {'ingest': 'ingest', 'aggregate': 'ingest', 'render': 'plots'}
+
+# Plot name and title per meter
+METERS = {'day_meter': ('day', 'Day'),
+          'night_meter': ('night', 'Night')}
+
+
+class Pipeline():
+    """Orchestrate the update of data and plots.
+
+    ---
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+    """
+    def __init__(self, app: 'Application') -> None:
+
+        self.user = app
+        self.logger = app.logger
+        # Stage runs of the last run: (stage, label, start, end), seconds since the start
+        self.timings = list()
+        # Seconds waited for a full queue per stage of the last run
+        self.backpressure = defaultdict(float)
+        self._started = 0.0
+        # Handoffs from the watcher thread, cancelled if the run fails,
+        # appended by the watcher thread and read by the run, guarded by the lock
+        self._handoffs = list()
+        self._handoffs_lock = threading.Lock()
+        msg  = f'Class {self.__class__.__name__} of the '
+        msg += f'module {self.__class__.__module__} '
+        msg +=  'successfully initialized.'
+        self.logger.debug(msg)
+
+    def slice_dates(self) -> tuple[str, str]:
+        """Range of the last week plot.
+
+        Returns:
+            tuple: Start and end date, format 'YYYY-MM-DD'.
+        """
+        if self.user.dummy is True:
+            return DUMMY_SLICE
+        today = dt.date.today()
+
+        return str(today - dt.timedelta(days=SLICE_DAYS)), str(today - dt.timedelta(days=1))
+
+    def stats(self, df_slice: pd.DataFrame) -> dict:
+        """Values of the stats frame.
+
+        Args:
+            df_slice (pd.DataFrame): Last week of the total consumption.
+
+        Returns:
+            dict: Rolling medians of the last day and `SMIT.aggregation.AggregateCache.summary`.
+        """
+        stats = {'week': float(df_slice.iloc[-1,-1]),
+                 'month': float(df_slice.iloc[-1,-2])}
+        stats.update(self.user.aggregates.summary('total'))
+
+        return stats
+
+    def run(self, scrape: bool = True) -> dict:
+        """Update data and plots.
+
+        Args:
+            scrape (bool = True): Download new data, otherwise
+                only the files in the work directory are used.
+
+        Returns:
+            dict: Plot snapshot, keys: [`fingerprint`, `stats`, `images`].
+                The stored snapshot if the data did not change.
+        """
+        return asyncio.run(self._run(scrape))
+
+    async def _run(self, scrape: bool) -> dict:
+        """Start the stages and write the plot snapshot.
+
+        Args:
+            scrape (bool): Run the scrape stage.
+
+        Returns:
+            dict: Plot snapshot.
+        """
+        self.timings = list()
+        self.backpressure = defaultdict(float)
+        self._handoffs = list()
+        self._started = time.perf_counter()
+
+        ingest_queue = asyncio.Queue(QUEUE_SIZE)
+        render_queue = asyncio.Queue(QUEUE_SIZE)
+        meters = {str(self.user.Meter[key]): key for key in METERS}
+        locks = {meter: asyncio.Lock() for meter in meters}
+        # Stored snapshot, reused if the fingerprint did not change
+        result = {'previous': self.user.persistence.load_plot_snapshot()}
+        images = dict()
+        pools = {'scrape': ThreadPoolExecutor(1, thread_name_prefix='SMIT scrape'),
+                 'ingest': ThreadPoolExecutor(INGEST_WORKERS, thread_name_prefix='SMIT ingest'),
+                 'render': ThreadPoolExecutor(1, thread_name_prefix='SMIT render')}
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._scrape(scrape, ingest_queue, meters, result, pools['scrape']))
+                ingests = [group.create_task(self._ingest(ingest_queue, render_queue, meters, locks, pools['ingest']))
+                           for _ in range(INGEST_WORKERS)]
+                group.create_task(self._aggregate(ingests, render_queue, result, pools['ingest']))
+                group.create_task(self._render(render_queue, images, pools['render']))
+        finally:
+            # Release a watcher thread waiting for a queue of a failed run
+            self.user.watcher.consumer = None
+            with self._handoffs_lock:
+                handoffs = list(self._handoffs)
+            for handoff in handoffs:
+                handoff.cancel()
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+
+        if result.get('unchanged'):
+            self.logger.info('Data fingerprints unchanged, stored plot snapshot reused')
+            self._report()
+            return result['previous']
+
+        cache = pl.Path(self.user.Folder['cache'])
+        paths = dict()
+        with self.user.storage.batch():
+            for name in ('day', 'night', 'slice'):
+                paths[name] = cache / f'{name}.png'
+                self.user.storage.write_bytes(paths[name], images[name])
+            self.user.persistence.save_plot_snapshot(result['fingerprint'], result['stats'], paths)
+
+        self._report()
+
+        return {'fingerprint': result['fingerprint'],
+                'stats': result['stats'],
+                'images': {name: str(path) for name, path in paths.items()}}
+
+    async def _blocking(self, stage: str, label: str, pool: ThreadPoolExecutor,
+                        func: Callable, *args):
+        """Run blocking work in an executor and record its timing.
+
+        The work is profiled in its thread as phase of `PHASES`.
+
+        Args:
+            stage (string): Name of the stage.
+            label (string): Meter or plot processed by the stage.
+            pool (ThreadPoolExecutor): Executor of the stage.
+            func (Callable): Blocking function.
+
+        Returns:
+            Result of `func`.
+        """
+        if stage in PHASES:
+            func = self.user.profiler.profiled(PHASES[stage], func)
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+        finally:
+            end = time.perf_counter()
+            self.timings.append((stage, label, start - self._started, end - self._started))
+            observe(f'pipeline.{stage}', end - start)
+            self.logger.info(f'Pipeline stage {stage} ({label}) took {end - start:.3f}s')
+
+    async def _put(self, queue: asyncio.Queue, item, stage: str) -> None:
+        """Put item into the queue of the next stage.
+
+        Args:
+            queue (asyncio.Queue): Queue of the next stage.
+            item: Item for the next stage.
+            stage (string): Name of the producing stage.
+        """
+        if not queue.full():
+            queue.put_nowait(item)
+            return
+
+        start = time.perf_counter()
+        await queue.put(item)
+        waited = time.perf_counter() - start
+        self.backpressure[stage] += waited
+        observe(f'pipeline.backpressure.{stage}', waited)
+        self.logger.info(f'Pipeline backpressure: {stage} waited {waited:.3f}s for a full queue')
+
+    async def _scrape(self, scrape: bool, queue: asyncio.Queue, meters: dict,
+                      result: dict, pool: ThreadPoolExecutor) -> None:
+        """Scrape stage, feeds the ingest queue.
+
+        Without a download and with the fingerprint of the
+        stored snapshot no meter is passed to the ingest stage.
+
+        Args:
+            scrape (bool): Download new data.
+            queue (asyncio.Queue): Ingest queue.
+            meters (dict): Meter number as key, meter key as value.
+            result (dict): Gets the plot fingerprint of the work directory
+                and `unchanged` if the stored snapshot is current.
+            pool (ThreadPoolExecutor): Scrape executor.
+        """
+        loop = asyncio.get_running_loop()
+        delivered = set()
+
+        def consumer(meter: str, kind: str) -> None:
+            # Called in the watcher thread, waits while the ingest queue is full
+            if kind == 'daysum' and meter in meters:
+                delivered.add(meter)
+                handoff = asyncio.run_coroutine_threadsafe(self._put(queue, meter, 'scrape'), loop)
+                with self._handoffs_lock:
+                    self._handoffs.append(handoff)
+                handoff.result()
+
+        if scrape:
+            self.user.watcher.consumer = consumer
+            try:
+                await self._blocking('scrape', 'meters', pool, self.user.os_tools.sng_scrape_and_move)
+            finally:
+                self.user.watcher.consumer = None
+
+        result['fingerprint'] = self.user.os_tools.plot_fingerprint(self.slice_dates()[1])
+        previous = result['previous']
+        result['unchanged'] = (not delivered and previous is not None
+                               and previous['fingerprint'] == result['fingerprint'])
+        if not result['unchanged']:
+            # Meters without a new download, e.g. today already scraped
+            for meter in meters:
+                if meter not in delivered:
+                    await self._put(queue, meter, 'scrape')
+        for _ in range(INGEST_WORKERS):
+            await queue.put(None)
+
+    async def _ingest(self, queue: asyncio.Queue, render_queue: asyncio.Queue,
+                      meters: dict, locks: dict, pool: ThreadPoolExecutor) -> None:
+        """Ingest stage, feeds the render queue.
+
+        A meter delivered twice is ingested one after the
+        other, the later ingest sees all files.
+
+        Args:
+            queue (asyncio.Queue): Ingest queue.
+            render_queue (asyncio.Queue): Render queue.
+            meters (dict): Meter number as key, meter key as value.
+            locks (dict): `asyncio.Lock` per meter.
+            pool (ThreadPoolExecutor): Ingest executor.
+        """
+        workdir = self.user.Folder['work_daysum']
+        while (meter := await queue.get()) is not None:
+            async with locks[meter]:
+                dataframe = await self._blocking('ingest', meter, pool,
+                                                 self.user.os_tools.create_dataframe, workdir, meter)
+            name, title = METERS[meters[meter]]
+            await self._put(render_queue, (name, title, figures.seaborn_bar_figure, dataframe), 'ingest')
+
+    def _aggregate_total(self) -> tuple[pd.DataFrame, dict]:
+        """Last week slice and stats of the total consumption.
+
+        Returns:
+            tuple: Slice and `SMIT.pipeline.Pipeline.stats`.
+        """
+        df_slice = self.user.series.get_range(['total'], *self.slice_dates())
+
+        return df_slice, self.stats(df_slice)
+
+    async def _aggregate(self, ingests: list, render_queue: asyncio.Queue,
+                         result: dict, pool: ThreadPoolExecutor) -> None:
+        """Aggregate stage, waits for all ingest workers.
+
+        Skipped if the stored snapshot is current.
+
+        Args:
+            ingests (list): Tasks of the ingest workers.
+            render_queue (asyncio.Queue): Render queue.
+            result (dict): Gets the stats.
+            pool (ThreadPoolExecutor): Ingest executor.
+        """
+        await asyncio.gather(*ingests)
+        if not result['unchanged']:
+            df_slice, result['stats'] = await self._blocking('aggregate', 'total', pool, self._aggregate_total)
+            await self._put(render_queue, ('slice', 'Last Week', figures.slice_figure, df_slice), 'aggregate')
+        await render_queue.put(None)
+
+    @staticmethod
+    def _png(draw: Callable, dataframe: pd.DataFrame, title: str) -> bytes:
+        """Draw a figure and render it as `.png` image.
+
+        Args:
+            draw (Callable): Figure function of `SMIT.gui.figures`.
+            dataframe (pd.DataFrame): Input data for plot.
+            title (string): Title for plot.
+
+        Returns:
+            bytes: Image content.
+        """
+        figure = draw(dataframe, title)
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format='png', dpi=figure.dpi)
+
+        return buffer.getvalue()
+
+    async def _render(self, queue: asyncio.Queue, images: dict, pool: ThreadPoolExecutor) -> None:
+        """Render stage.
+
+        Args:
+            queue (asyncio.Queue): Render queue.
+            images (dict): Gets plot name as key, image content as value.
+            pool (ThreadPoolExecutor): Render executor.
+        """
+        while (item := await queue.get()) is not None:
+            name, title, draw, dataframe = item
+            images[name] = await self._blocking('render', name, pool, self._png, draw, dataframe, title)
+
+    def _report(self) -> None:
+        """Log wall time, busy time per stage and backpressure of the run."""
+        wall = time.perf_counter() - self._started
+        busy = defaultdict(float)
+        for stage, _, start, end in self.timings:
+            busy[stage] += end - start
+
+        self.logger.info(f'Pipeline finished in {wall:.3f}s, stages busy {sum(busy.values()):.3f}s')
+        for stage, seconds in busy.items():
+            self.logger.info(f'Pipeline stage {stage}: {seconds:.3f}s busy, '
+                             f'{self.backpressure.get(stage, 0.0):.3f}s backpressure')
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
@@ -0,0 +1,262 @@
+"""Profiling of application phases
+
+---
+`Profiler`
+----------
+
+- Profile CPU time per phase with `cProfile`.
+- Profile memory allocations per phase with `tracemalloc`.
+- Write `.pstats` files and a top-N summary.
+
+A phase is one part of a run, e.g. 'startup', 'scrape',
+'ingest' or 'plots'. Repeated phases are accumulated.
+Without a profiling mode all methods return immediately.
+
+cProfile only sees the thread which enabled it. Work in
+executor threads, e.g. of `SMIT.pipeline.Pipeline`, is
+wrapped with `Profiler.profiled` and added to its phase.
+
+Typical usage:
+
+    app = Application(profile='cpu')
+    with app.profiler.phase('ingest'):
+        ...
+    app.profiler.dump(app.Folder['log'], app.storage)
+"""
+import cProfile
+import datetime as dt
+import functools
+import io
+import marshal
+import pathlib as pl
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterator
+if TYPE_CHECKING:
+    from SMIT.storage import Storage
+
+
+class Profiler():
+    """Scope cProfile or tracemalloc to application phases.
+
+    ---
+
+    Only one phase is profiled at a time. A phase started
+    while another one is active is counted in the active phase.
+
+    Attributes:
+        mode (str | None): 'cpu', 'memory' or `None` for no profiling.
+    """
+    modes = ('cpu', 'memory')
+
+    def __init__(self, mode: str | None = None) -> None:
+
+        if mode is not None and mode not in self.modes:
+            raise ValueError(f'Unknown profiling mode: {mode}, use one of {self.modes}')
+
+        self.mode = mode
+        self._active = None
+        self._profile = None
+        self._memory_start = None
+        self._lock = threading.RLock()
+        # Key: phase name, value: pstats.Stats or list of memory statistics
+        self.results = dict()
+
+    @property
+    def enabled(self) -> bool:
+        """Profiling mode is set."""
+        return self.mode is not None
+
+    def start(self, name: str) -> None:
+        """Start profiling a phase.
+
+        Args:
+            name (string): Name of the phase.
+        """
+        with self._lock:
+            if not self.enabled or self._active is not None:
+                return
+
+            self._active = name
+            if self.mode == 'cpu':
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+            else:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(10)
+                tracemalloc.reset_peak()
+                self._memory_start = tracemalloc.take_snapshot()
+
+    def stop(self, name: str) -> None:
+        """Stop profiling a phase and store the results.
+
+        Args:
+            name (string): Name of the phase.
+        """
+        with self._lock:
+            if self._active != name:
+                return
+
+            if self.mode == 'cpu':
+                self._profile.disable()
+                self._add(name, self._profile)
+                self._profile = None
+            else:
+                statistics = tracemalloc.take_snapshot().compare_to(self._memory_start, 'lineno')
+                peak = tracemalloc.get_traced_memory()[1]
+                self.results.setdefault(name, list()).append((peak, statistics))
+                self._memory_start = None
+
+            self._active = None
+
+    def _add(self, name: str, profile: cProfile.Profile) -> None:
+        """Accumulate a cpu profile in the results of a phase.
+
+        Args:
+            name (string): Name of the phase.
+            profile (cProfile.Profile): Disabled profile.
+        """
+        with self._lock:
+            if name in self.results:
+                self.results[name].add(profile)
+            else:
+                self.results[name] = pstats.Stats(profile)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Profile the code in a `with` block as phase.
+
+        Args:
+            name (string): Name of the phase.
+        """
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def profiled(self, name: str, func: Callable) -> Callable:
+        """Profile each call of `func` in the thread running it.
+
+        - cpu: Each call gets its own profile, added to the phase.
+          If another profile is active for all threads (Python 3.12+)
+          the call is counted in that profile.
+        - memory: tracemalloc traces all threads, the call runs
+          as phase.
+
+        Args:
+            name (string): Name of the phase.
+            func (Callable): Function run in an executor thread.
+
+        Returns:
+            Callable: `func` itself without profiling mode.
+        """
+        if not self.enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if self.mode == 'memory':
+                with self.phase(name):
+                    return func(*args, **kwargs)
+
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._add(name, profile)
+
+        return wrapper
+
+    def _summary(self, name: str, top: int) -> str:
+        """Top-N summary of one phase.
+
+        Args:
+            name (string): Name of the phase.
+            top (int): Number of entries.
+
+        Returns:
+            string: Human readable summary.
+        """
+        if self.mode == 'cpu':
+            stream = io.StringIO()
+            stats = self.results[name]
+            stats.stream = stream
+            stats.sort_stats('cumulative').print_stats(top)
+            return stream.getvalue()
+
+        lines = list()
+        for run, (peak, statistics) in enumerate(self.results[name], start=1):
+            lines.append(f'Run {run}, peak traced memory: {peak / 1024:.1f} KiB')
+            lines.extend(f'    {stat}' for stat in statistics[:top])
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, folder: pl.Path, storage: 'Storage', top: int = 20) -> list:
+        """Write profiling results.
+
+        - cpu: one `.pstats` file per phase, load with `pstats` or snakeviz.
+        - Both modes: one summary file with the top-N entries per phase.
+
+        The profiler exists before the storage backend, so
+        the backend of the application is passed in.
+
+        Args:
+            folder (pathlib.Path): Output folder, usually `Folder['log']`.
+            storage (Storage): Backend of the application, `app.storage`.
+            top (int = 20): Number of entries per phase in the summary.
+
+        Returns:
+            list: Paths of the written files.
+        """
+        if not self.enabled or not self.results:
+            return list()
+
+        folder = pl.Path(folder)
+        stamp = dt.datetime.now().strftime('%Y%m%d_%H%M%S')
+        written = list()
+        summary = list()
+
+        for name in self.results:
+            if self.mode == 'cpu':
+                stats_file = folder / f'profile_{stamp}_{name}.pstats'
+                # Same format as `pstats.Stats.dump_stats`
+                storage.write_bytes(stats_file, marshal.dumps(self.results[name].stats))
+                written.append(stats_file)
+            summary.append(f'==== Phase: {name} ({self.mode}) ====\n{self._summary(name, top)}')
+
+        summary_file = folder / f'profile_{stamp}_summary.txt'
+        storage.write_text(summary_file, '\n'.join(summary))
+        written.append(summary_file)
+
+        return written
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
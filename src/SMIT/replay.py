@@ -0,0 +1,400 @@
+"""Record and replay of the scraping flow
+
+---
+`ScrapeRecorder`
+----------------
+
+- Capture the portal page after each step of `SMIT.scrapedata.Webscraper`.
+- Capture the wait time of each step.
+- Capture the downloaded `.csv` files.
+- Write everything to a cassette folder.
+
+`ReplayServer`
+--------------
+
+- Serve a cassette from a local HTTP server.
+- Pages keep the portal DOM, the XPaths of the scraper match.
+- Clicks on the recorded elements load the next page
+  after the recorded wait time.
+- Download steps serve the recorded `.csv` files.
+
+`LocalServer`
+-------------
+
+- Threaded HTTP server on localhost, running in the background.
+- Base for local stand-ins of the portal.
+
+The scraper is switched with `Options['scrape_mode']` ('live',
+'record' or 'replay'), the cassette folder is `Path['scrape_cassette']`.
+Pages are captured from the rendered DOM, scripts and stylesheets
+are removed. Firefox does not expose the network log to WebDriver,
+data loaded by XHR is contained in the captured pages.
+
+Warning:
+    A cassette contains the pages of the logged in user and the
+    downloaded consumption data. Do not share it.
+
+Typical usage:
+
+    recorder = ScrapeRecorder(app, app.Path['scrape_cassette'])
+    recorder.start(driver, app.Folder['raw_daysum'])
+    recorder.step(xpath, seconds)
+    recorder.finish()
+
+    with ReplayServer(app.Path['scrape_cassette'], app.logger) as server:
+        driver.get(server.url)
+"""
+import json
+import logging
+import pathlib as pl
+import re
+import shutil
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+# Type hints
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from SMIT.application import Application
+
+MANIFEST = 'manifest.json'
+
+# Seconds to wait for running downloads on `ScrapeRecorder.finish`
+DOWNLOAD_TIMEOUT = 30
+
+# Parts of the captured pages which load remote resources
+_REMOTE = re.compile(r'<script\b.*?</script\s*>|<link\b[^>]*>|<base\b[^>]*>', re.IGNORECASE | re.DOTALL)
+
+# Click handler injected into replayed pages
+_PLAYER = """<script>
+(function () {
+  var steps = %(steps)s;
+  var current = %(next)d;
+  document.addEventListener('click', function (event) {
+    // Steps may be skipped, e.g. date inputs filled by script
+    var step = null;
+    for (var index = current; index < steps.length && !step; index++) {
+      if (!steps[index].xpath) { continue; }
+      var node = document.evaluate(steps[index].xpath, document, null,
+                                   XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+      if (node && node.contains(event.target)) { step = steps[index]; current = index; }
+    }
+    if (!step) { return; }
+    event.preventDefault();
+    if (step.files.length) {
+      step.files.forEach(function (name) {
+        var frame = document.createElement('iframe');
+        frame.style.display = 'none';
+        frame.src = '/files/' + encodeURIComponent(name);
+        document.body.appendChild(frame);
+      });
+      current += 1;
+    } else {
+      window.location.href = '/step/' + current;
+    }
+  }, true);
+})();
+</script>"""
+
+Response = namedtuple('Response', ['status', 'content_type', 'body', 'headers'], defaults=[dict()])
+"""HTTP status, content type, body bytes and extra headers."""
+
+
+class LocalServer():
+    """HTTP server on localhost in a background thread.
+
+    ---
+
+    Subclasses override `handle`, the base server answers every
+    request with 404. Each request runs in its own thread, delays
+    in `handle` do not block other requests.
+
+    Attributes:
+        logger (logging.Logger): Logger of the application.
+        port (int = 0): TCP port, 0 selects a free port.
+    """
+    def __init__(self, logger: logging.Logger, port: int = 0) -> None:
+
+        self.logger = logger
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base url of the running server."""
+        return f'http://127.0.0.1:{self.port}'
+
+    def handle(self, method: str, path: str, query: dict, body: bytes) -> Response:
+        """Answer one request.
+
+        Args:
+            method (string): 'GET' or 'POST'.
+            path (string): Url path without query.
+            query (dict): Query parameters, key: name, value: list of values.
+            body (bytes): Request body, empty for 'GET'.
+
+        Returns:
+            Response: Status, content type, body and headers.
+        """
+        return Response(404, 'text/plain; charset=utf-8', f'No content for {method} {path}'.encode('utf-8'))
+
+    def start(self) -> 'LocalServer':
+        """Start serving in a daemon thread.
+
+        Returns:
+            LocalServer: This instance.
+        """
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Forward requests to `LocalServer.handle`."""
+            def _respond(self, method: str) -> None:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                url = urlsplit(self.path)
+                response = owner.handle(method, unquote(url.path), parse_qs(url.query), body)
+                self.send_response(response.status)
+                self.send_header('Content-Type', response.content_type)
+                self.send_header('Content-Length', str(len(response.body)))
+                for name, value in response.headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(response.body)
+
+            def do_GET(self) -> None:
+                self._respond('GET')
+
+            def do_POST(self) -> None:
+                self._respond('POST')
+
+            def log_message(self, format, *args) -> None:
+                owner.logger.debug(f'{owner.__class__.__name__}: {format % args}')
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+        self.logger.debug(f'{self.__class__.__name__} listening on {self.url}')
+
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+        self.logger.debug(f'{self.__class__.__name__} stopped')
+
+    def __enter__(self) -> 'LocalServer':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+class ScrapeRecorder():
+    """Capture a live scraping run.
+
+    ---
+
+    The scraper calls `step` after opening the login page and after
+    each click, `expect_download` after the download click. Files
+    which appear in the download folder are assigned to the last
+    download step.
+
+    Cassette layout:
+
+    - `manifest.json`: Steps with XPath, wait time, page file and files.
+    - `step_NNN.html`: Page after the step.
+    - `files/`: Downloaded `.csv` files.
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+        folder (pathlib.Path): Cassette folder, replaced on `start`.
+    """
+    def __init__(self, app: 'Application', folder: pl.Path) -> None:
+
+        self.user = app
+        self.logger = app.logger
+        self.folder = pl.Path(folder)
+        self.driver = None
+        self.steps = list()
+        self._download_folder = None
+        self._known_files = set()
+        msg  = f'Class {self.__class__.__name__} of the '
+        msg += f'module {self.__class__.__module__} '
+        msg +=  'successfully initialized.'
+        self.logger.debug(msg)
+
+    def start(self, driver, download_folder: pl.Path) -> None:
+        """Begin a new cassette.
+
+        Args:
+            driver (selenium.webdriver.Firefox): Driver of the scraper.
+            download_folder (pathlib.Path): Download folder of the driver.
+        """
+        shutil.rmtree(self.folder, ignore_errors=True)
+        (self.folder / 'files').mkdir(parents=True)
+        self.driver = driver
+        self.steps = list()
+        self._download_folder = pl.Path(download_folder)
+        self._known_files = {path.name for path in self._download_folder.glob('*')}
+
+        self.logger.info(f'Recording scrape run to {self.folder}')
+
+    def step(self, xpath: str | None, seconds: float) -> None:
+        """Capture the page after a step.
+
+        Args:
+            xpath (string | None): Clicked element, `None` for opening the page.
+            seconds (float): Wait time of the step.
+        """
+        self._collect_downloads()
+        page = f'step_{len(self.steps):03d}.html'
+        html = _REMOTE.sub('', self.driver.page_source)
+        (self.folder / page).write_text(html, encoding='utf-8')
+        self.steps.append({'xpath': xpath, 'seconds': seconds, 'page': page, 'files': list()})
+
+    def expect_download(self) -> None:
+        """Mark the last step as download, files are assigned later."""
+        self.steps[-1]['download'] = True
+
+    def _collect_downloads(self) -> bool:
+        """Copy finished downloads to the cassette.
+
+        Returns:
+            bool: True if no download is running.
+        """
+        targets = [step for step in self.steps if step.get('download')]
+        running = False
+        for path in sorted(self._download_folder.glob('*'), key=lambda path: path.stat().st_mtime):
+            if path.name in self._known_files:
+                continue
+            if path.suffix == '.part' or path.with_name(path.name + '.part').exists():
+                running = True
+                continue
+            self._known_files.add(path.name)
+            if not targets:
+                continue
+            shutil.copy2(path, self.folder / 'files' / path.name)
+            targets[-1]['files'].append(path.name)
+            self.logger.debug(f'Download {path.name} recorded')
+
+        return not running
+
+    def finish(self) -> None:
+        """Wait for running downloads and write the manifest."""
+        deadline = time.monotonic() + DOWNLOAD_TIMEOUT
+        while not self._collect_downloads() and time.monotonic() < deadline:
+            time.sleep(0.5)
+        # Downloads without files are not clicked in the replay
+        missing = [index for index, step in enumerate(self.steps) if step.get('download') and not step['files']]
+        if missing:
+            self.logger.warning(f'No files recorded for download steps: {missing}')
+
+        manifest = {'recorded': time.time(), 'steps': self.steps}
+        (self.folder / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+
+        self.logger.info(f'Scrape run recorded with {len(self.steps)} steps')
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+class ReplayServer(LocalServer):
+    """Serve a recorded cassette.
+
+    ---
+
+    `url` opens the first page. A page is served after the recorded
+    wait time of the step which follows it, multiplied by `speed`.
+    Timings of a replay only depend on the cassette.
+
+    Attributes:
+        folder (pathlib.Path): Cassette folder written by `ScrapeRecorder`.
+        logger (logging.Logger): Logger of the application.
+        speed (float = 1.0): Factor for the recorded wait times, 0 serves at once.
+        port (int = 0): TCP port, 0 selects a free port.
+    """
+    def __init__(self, folder: pl.Path, logger: logging.Logger,
+                 speed: float = 1.0, port: int = 0) -> None:
+
+        super().__init__(logger, port)
+        self.folder = pl.Path(folder)
+        self.speed = speed
+        manifest = self.folder / MANIFEST
+        if not manifest.exists():
+            raise FileNotFoundError(f'No recorded scrape run in {self.folder}')
+        self.steps = json.loads(manifest.read_text(encoding='utf-8'))['steps']
+        self._player_steps = json.dumps([{'xpath': step['xpath'], 'files': step['files']}
+                                         for step in self.steps])
+
+    @property
+    def url(self) -> str:
+        """Url of the first recorded page."""
+        return f'{super().url}/step/0'
+
+    def _page(self, index: int) -> Response:
+        """Recorded page with the click handler.
+
+        Args:
+            index (int): Step number.
+
+        Returns:
+            Response: Html page.
+        """
+        if index + 1 < len(self.steps):
+            time.sleep(self.steps[index + 1]['seconds'] * self.speed)
+        html = (self.folder / self.steps[index]['page']).read_text(encoding='utf-8')
+        player = _PLAYER % {'steps': self._player_steps, 'next': index + 1}
+        head = re.search(r'<head\b[^>]*>', html, re.IGNORECASE)
+        position = head.end() if head else 0
+
+        return Response(200, 'text/html; charset=utf-8',
+                        (html[:position] + player + html[position:]).encode('utf-8'))
+
+    def handle(self, method: str, path: str, query: dict, body: bytes) -> Response:
+        parts = path.strip('/').split('/', 1)
+        if len(parts) == 2 and parts[0] == 'step' and parts[1].isdigit() and int(parts[1]) < len(self.steps):
+            return self._page(int(parts[1]))
+        if len(parts) == 2 and parts[0] == 'files':
+            file = self.folder / 'files' / pl.Path(parts[1]).name
+            if file.is_file():
+                return Response(200, 'text/csv', file.read_bytes(),
+                                {'Content-Disposition': f'attachment; filename="{file.name}"'})
+
+        return Response(404, 'text/plain', b'Not recorded')
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
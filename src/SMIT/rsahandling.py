@@ -4,9 +4,10 @@
 `RsaTools`
 ----------
 
-- Generate Rsa key pair for application.
+- Generate Rsa key pair for application in a background thread.
 - Decrypt password from `user_data.toml` file.
 - Encrypt password with application key.
+- Cache loaded keys and, opt-in, decrypted passwords.
 
 Typical usage:
 
@@ -14,13 +15,32 @@
     app.rsa.method()
 """
 from collections import namedtuple
+import hashlib
 import pathlib as pl
+import threading
+import time
 import rsa
+# Instrumentation
+from SMIT.metrics import observe
 # Type hints
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from SMIT.application import Application
 
+# Serialize writing of key files between application instances
+_KEYGEN_LOCK = threading.Lock()
+# Running key generation threads of all instances
+_KEYGEN_THREADS = set()
+
+
+def wait_for_key_generation() -> None:
+    """Wait until all background key generations are finished.
+
+    Call before removing a config folder, e.g. on dummy reset.
+    """
+    for thread in list(_KEYGEN_THREADS):
+        thread.join()
+
 
 class RsaTools():
     """Use Rsa encryption for password storing.
@@ -33,6 +53,12 @@ class RsaTools():
     The password will be saved in the `user_data.toml`
     configuration file. 
 
+    A missing key pair is generated in a background thread,
+    which is only awaited when a key is needed.
+    Loaded keys are cached until the modification time of a
+    key file changes. With `Options['credential_cache_ttl']` > 0
+    decrypted passwords are kept in memory for the given seconds.
+
     Attributes:
         app (class): Accepts `SMIT.application.Application` type attribute.
     """
@@ -44,46 +70,113 @@ def __init__(self, app: 'Application') -> None:
         msg += f'module {self.__class__.__module__} '
         msg +=  'successfully initialized.'
         self.logger.debug(msg)
+
+        # Loaded keys and modification times of the key files
+        self._keys = None
+        self._keys_mtime = None
+        # Decrypted passwords, key: hash of the cipher, value: (expiry, password)
+        self.credential_ttl = self.user.Options['credential_cache_ttl']
+        self._credentials = dict()
         
         self.pub_path = pl.Path(self.user.Path['public_key'])
         self.priv_path = pl.Path(self.user.Path['private_key'])
-        no_public_key = not self.pub_path.exists()
-        no_private_key = not self.priv_path.exists()
+        no_public_key = not self.user.storage.exists(self.pub_path)
+        no_private_key = not self.user.storage.exists(self.priv_path)
+
+        # Background key generation, see `_generate_rsa_keys`
+        self._keygen = None
+        self._keygen_error = None
+        self.keygen_seconds = None
 
         # If no key pair exists in config folder generate one.
         if no_public_key or no_private_key:
-            (public_key, private_key) = rsa.newkeys(1024)
             self.logger.warning('No Rsa key pair found')
+            self._keygen = threading.Thread(target=self._generate_rsa_keys,
+                                            name='rsa-keygen')
+            _KEYGEN_THREADS.add(self._keygen)
+            self._keygen.start()
+
+    def _generate_rsa_keys(self) -> None:
+        """Generate and write a new key pair.
+
+        Runs in a background thread started by `__init__`.
+        Both keys are written in one `SMIT.storage` batch with
+        atomic writes, so an interrupted run never leaves a
+        truncated key behind. If another instance wrote
+        a key pair in the meantime, the new keys are discarded.  
+        The generation time is stored in `keygen_seconds`.
+        """
+        try:
+            start = time.perf_counter()
+            (public_key, private_key) = rsa.newkeys(1024)
+            self.keygen_seconds = time.perf_counter() - start
+            observe('rsa.keygen', self.keygen_seconds)
+
+            with _KEYGEN_LOCK:
+                if self.user.storage.exists(self.pub_path) and self.user.storage.exists(self.priv_path):
+                    self.logger.info('Rsa key pair written by other instance, generated keys discarded')
+                    return
+
+                with self.user.storage.batch():
+                    for path, key in ((self.priv_path, private_key), (self.pub_path, public_key)):
+                        self.user.storage.write_bytes(path, key.save_pkcs1('PEM'))
+
+            self.logger.info(f'Rsa key pair written, generated in {self.keygen_seconds:.2f}s')
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            self._keygen_error = err
+            self.logger.error(f'Rsa key generation failed: {err}')
+        finally:
+            _KEYGEN_THREADS.discard(threading.current_thread())
+
+    def await_rsa_keys(self) -> None:
+        """Wait for a running key generation.
+
+        Raises:
+            RuntimeError: If the key generation failed.
+        """
+        if self._keygen is None:
+            return
+
+        if self._keygen.is_alive():
+            start = time.perf_counter()
+            self._keygen.join()
+            observe('rsa.keygen_wait', time.perf_counter() - start)
+            self.logger.info(f'Waited {time.perf_counter() - start:.2f}s for Rsa key generation')
+        self._keygen = None
 
-        # Write public key
-            with open(self.pub_path, 'wb') as key:
-                key.write(public_key.save_pkcs1('PEM'))
-                self.logger.info('Public key written')
-        # Write private key
-            with open(self.priv_path, 'wb') as key:
-                key.write(private_key.save_pkcs1('PEM'))
-                self.logger.info('Private key written')
+        if self._keygen_error is not None:
+            raise RuntimeError('Rsa key generation failed') from self._keygen_error
 
     def _load_rsa_keys(self) -> tuple[rsa.PrivateKey, rsa.PublicKey]:
         """Create named tuple with rsa keys.
 
-        Make keys accessible via dot notation.
+        Make keys accessible via dot notation.  
+        The keys are parsed once and reused as long as the
+        modification times of both key files are unchanged.
+        Reloading the keys clears the password cache.
         
         Returns:
             tuple: A named tuple holding the 
                 `public_key` and the `private_key`.
         """
+        self.await_rsa_keys()
+        mtime = (self.user.storage.stat(self.pub_path).mtime_ns,
+                 self.user.storage.stat(self.priv_path).mtime_ns)
+        if self._keys is not None and self._keys_mtime == mtime:
+            return self._keys
+
         Keys = namedtuple("Keys", ["public_key", "private_key"])
 
-        with open(self.pub_path, 'rb') as key:
-            public_key = rsa.PublicKey.load_pkcs1(key.read())
+        public_key = rsa.PublicKey.load_pkcs1(self.user.storage.read_bytes(self.pub_path))
+        private_key = rsa.PrivateKey.load_pkcs1(self.user.storage.read_bytes(self.priv_path))
 
-        with open(self.priv_path, 'rb') as key:
-            private_key = rsa.PrivateKey.load_pkcs1(key.read())
+        self._keys = Keys(public_key, private_key)
+        self._keys_mtime = mtime
+        self._credentials.clear()
 
         self.logger.debug('Rsa keys tuple loaded')
 
-        return Keys(public_key, private_key)
+        return self._keys
 
     def encrypt_pwd(self, pwd: str) -> bytes:
         """Convert and encrypt input.
@@ -115,7 +208,9 @@ def decrypt_pwd(self, pwd: bytes) -> str:
 
         Decrypt the input using the rsa library and the 
         private key from the config folder.  
-        Decode the bytes object to string format.
+        Decode the bytes object to string format.  
+        If the password cache is active, a cached result
+        younger than `credential_ttl` seconds is returned.
         
         Note:
             A bytes object is used because TOML files need
@@ -127,11 +222,30 @@ def decrypt_pwd(self, pwd: bytes) -> str:
         Returns:
             string: Decrypted input.
         """
-        pwd_decrypt = rsa.decrypt(pwd, self._load_rsa_keys().private_key)
+        private_key = self._load_rsa_keys().private_key
+
+        if self.credential_ttl > 0:
+            cipher_hash = hashlib.sha256(pwd).digest()
+            cached = self._credentials.get(cipher_hash)
+            if cached is not None and cached[0] > time.monotonic():
+                self.logger.debug('Password read from cache')
+                return cached[1]
+
+        pwd_decrypt = rsa.decrypt(pwd, private_key).decode('utf8')
+
+        if self.credential_ttl > 0:
+            self._credentials[cipher_hash] = (time.monotonic() + self.credential_ttl, pwd_decrypt)
 
         self.logger.debug('Password decrypted')
         
-        return pwd_decrypt.decode('utf8')
+        return pwd_decrypt
+
+    def clear_credential_cache(self) -> None:
+        """Remove all decrypted passwords from memory.
+        """
+        self._credentials.clear()
+
+        self.logger.debug('Password cache cleared')
 
     def __repr__(self) -> str:
         return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
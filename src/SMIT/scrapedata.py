@@ -7,6 +7,10 @@
 - Configure Firefox
 - Manage scrape dates
 - Download data
+- Record a run or replay it offline, see `SMIT.replay`
+- Adapt step timeouts to the latencies of previous runs
+- Report the slowest steps
+- Retry failed stages, skip meters already downloaded today
 
 Typical usage:
 
@@ -14,10 +18,12 @@
     app.scrape.method()
 """
 import time
+from contextlib import contextmanager
 from datetime import date, timedelta
 import pathlib as pl
+import numpy as np
 # Type hints
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator
 # Password handling
 import base64
 # Webdriver imports
@@ -29,10 +35,84 @@
 from selenium.webdriver.firefox.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+# Instrumentation
+from SMIT.metrics import observe, timed
+# Offline scraping
+from SMIT.journal import ScrapeJournal
+from SMIT.replay import ReplayServer, ScrapeRecorder
 # Import just for type hints
 if TYPE_CHECKING:
     from SMIT.application import Application
 
+# XPaths of the portal web elements, key: step name
+XPATHS = {
+    'login': '/html/body/div/app-root/main/div/app-login/div[2]/div[1]/form/div[3]/button',
+    'data_page': '/html/body/div/app-root/main/div/app-dashboard/div[2]/div/div[1]/div[1]/div',
+    'unit_wh': '/html/body/div/app-root/main/div/app-overview/div/div[2]/div[3]/app-unit-selector/div/div[2]',
+    'daily_values': '/html/body/div/app-root/main/div/app-overview/div/app-period-selector/div[1]/div/div[5]/div',
+    'start_date': '//*[@id="fromDayOverviewDate"]',
+    'confirm_dates': '/html/body/div/app-root/main/div/app-overview/div/app-period-selector/div[2]/div/div/div/div[2]/div[2]/div[2]/button',
+    'download': '/html/body/div/app-root/main/div/app-overview/reports-nav/app-header-nav/nav/div/div/div/div/div[2]/div/div[3]/div/div[2]/span',
+    'meter_dropdown': '/html/body/div/app-root/main/div/app-overview/reports-nav/app-meter-point-selector/div/div[2]/div/div[1]/ul/li/a',
+    'day_meter': '/html/body/div/app-root/main/div/app-overview/reports-nav/app-meter-point-selector/div/div[2]/div/div[1]/ul/li/ul/li[1]/a',
+    'night_meter': '/html/body/div/app-root/main/div/app-overview/reports-nav/app-meter-point-selector/div/div[2]/div/div[1]/ul/li/ul/li[2]/a',
+}
+
+# Step name per XPath
+_STEPS = {xpath: step for step, xpath in XPATHS.items()}
+# Steps of the login flow, all other steps belong to the download flow
+LOGIN_STEPS = ('open', 'login', 'data_page', 'unit_wh')
+
+# Step timeouts in seconds: default without history, bounds of the adaptive timeout
+DEFAULT_TIMEOUT = 10
+MIN_TIMEOUT = 2
+MAX_TIMEOUT = 60
+# Adaptive timeout is the p99 latency times this factor
+TIMEOUT_FACTOR = 3
+# Successful runs of a step needed before its timeout adapts
+MIN_SAMPLES = 20
+# Bounds of the polling interval in seconds, adaptive interval is p50 / 10
+POLL_BOUNDS = (0.05, 0.5)
+# Browser sessions per run, a new session starts when a stage fails after all retries
+SESSION_ATTEMPTS = 2
+# Seconds to wait for the file of a started download
+DOWNLOAD_TIMEOUT = 30
+
+# Fill both date inputs in the browser, arguments: start, end (dd-mm-yyyy), timeout in ms, callback.
+# Waits for the start input, sets the values with the native setter and fires the
+# events the web framework listens to. Calls back the browser language, or null.
+_FILL_DATES_SCRIPT = """
+var start = arguments[0], end = arguments[1], timeout = arguments[2], done = arguments[3];
+var deadline = Date.now() + timeout;
+function format(input, date) {
+  var parts = date.split('-');
+  if (input.type === 'date') { return parts[2] + '-' + parts[1] + '-' + parts[0]; }
+  if (navigator.language === 'de') { return parts[0] + '.' + parts[1] + '.' + parts[2]; }
+  return parts[1] + '/' + parts[0] + '/' + parts[2];
+}
+function fill() {
+  var from = document.getElementById('fromDayOverviewDate');
+  if (!from || from.offsetParent === null) {
+    if (Date.now() < deadline) { setTimeout(fill, 50); } else { done(null); }
+    return;
+  }
+  var inputs = Array.prototype.slice.call(document.querySelectorAll('input'));
+  var to = document.getElementById('toDayOverviewDate') || inputs[inputs.indexOf(from) + 1];
+  if (!to) { done(null); return; }
+  var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+  [[from, start], [to, end]].forEach(function (pair) {
+    pair[0].focus();
+    setter.call(pair[0], format(pair[0], pair[1]));
+    ['input', 'change', 'blur'].forEach(function (name) {
+      pair[0].dispatchEvent(new Event(name, {bubbles: true}));
+    });
+  });
+  done(navigator.language);
+}
+fill();
+"""
+
 class Webscraper():
     """Interact with selenium webdriver library.
     
@@ -50,12 +130,50 @@ def __init__(self, app: 'Application') -> None:
 
         self.user = app
         self.driver = None
+        # Set while a run is recorded
+        self.recorder = None
+        # Callback for progress events, set by `SMIT.worker`
+        self.progress = None
+        # Files moved out of the download folder, set by `SMIT.worker`,
+        # None for the files of `SMIT.watcher.DownloadWatcher`
+        self.delivered = None
+        # Browser language, detected once per driver session
+        self._language = None
+        # Key: step name, value: (timeout, poll interval), loaded once from the journal
+        self._limits = None
         self.logger = app.logger
         msg  = f'Class {self.__class__.__name__} of the '
         msg += f'module {self.__class__.__module__} '
         msg +=  'successfully initialized.'
         self.logger.debug(msg)
 
+    def _step_limits(self, step: str) -> tuple[float, float]:
+        """Timeout and polling interval of a step.
+
+        With at least `MIN_SAMPLES` recorded latencies the timeout
+        is `TIMEOUT_FACTOR` times the p99 latency within `MIN_TIMEOUT`
+        and `MAX_TIMEOUT`, the polling interval is a tenth of the
+        median latency. Fast steps fail fast on a dead page, slow
+        steps get more time. Steps without history use `DEFAULT_TIMEOUT`.
+
+        Args:
+            step (string): Step name, see `SMIT.scrapedata.XPATHS`.
+
+        Returns:
+            tuple: (timeout, poll interval) in seconds.
+        """
+        if self._limits is None:
+            self._limits = dict()
+            for name, latencies in self.user.journal.step_latencies().items():
+                if len(latencies) >= MIN_SAMPLES:
+                    p50, p99 = np.percentile(latencies, [50, 99])
+                    self._limits[name] = (float(np.clip(p99 * TIMEOUT_FACTOR, MIN_TIMEOUT, MAX_TIMEOUT)),
+                                          float(np.clip(p50 / 10, *POLL_BOUNDS)))
+            self.logger.debug(f'Adaptive step timeouts: {self._limits}')
+
+        return self._limits.get(step, (DEFAULT_TIMEOUT, POLL_BOUNDS[1]))
+
+    @timed('scrape.wait_and_click')
     def wait_and_click(self, elementXpath: str) -> None:
         """Wait for web element and trigger action.
 
@@ -66,17 +184,56 @@ def wait_and_click(self, elementXpath: str) -> None:
         
             Helper function.  
             The timeout for the element to be available is
-            set to 10s. After this a exception is triggered.
+            set by `SMIT.scrapedata.Webscraper._step_limits`,
+            10s for steps without history. After this a
+            exception is triggered. The latency is recorded
+            in the scrape journal.
 
         Args:
             elementXpath (string): String formatted `xpath` of 
                                     the element to click on.
         """
-        switchName = WebDriverWait(self.driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, elementXpath))
-        )
+        step = _STEPS.get(elementXpath, elementXpath)
+        timeout, poll = self._step_limits(step)
+        started = time.perf_counter()
+        try:
+            switchName = WebDriverWait(self.driver, timeout, poll_frequency=poll).until(
+                EC.element_to_be_clickable((By.XPATH, elementXpath))
+            )
+        except TimeoutException:
+            self.user.journal.record_step(step, time.perf_counter() - started, 'timeout')
+            self.logger.warning(f'Step {step} not clickable after {timeout:.1f}s')
+            raise
         switchName.click()
 
+        seconds = time.perf_counter() - started
+        self.user.journal.record_step(step, seconds)
+        observe(f'scrape.step.{step}', seconds)
+        if self.recorder is not None:
+            self.recorder.step(elementXpath, seconds)
+
+    def step_report(self, top: int = 5, days: int = 30) -> str:
+        """Slowest steps of the login and download flow.
+
+        Args:
+            top (int = 5): Steps per flow.
+            days (int = 30): Only count steps of the last n days.
+
+        Returns:
+            string: Table sorted by p99 latency per flow.
+        """
+        stats = self.user.journal.step_stats(days)
+        lines = [f'{"flow":<9}{"step":<16}{"count":>6}{"timeouts":>9}{"p50":>8}{"p90":>8}{"p99":>8}{"max":>8}']
+        for flow in ('login', 'download'):
+            steps = [(step, values) for step, values in stats.items()
+                     if (step in LOGIN_STEPS) == (flow == 'login')]
+            steps.sort(key=lambda item: (item[1]['timeouts'], np.nan_to_num(item[1]['p99'])), reverse=True)
+            for step, values in steps[:top]:
+                lines.append(f'{flow:<9}{step:<16}{values["count"]:>6}{values["timeouts"]:>9}'
+                             + ''.join(f'{values[key]:>8.2f}' for key in ('p50', 'p90', 'p99', 'max')))
+
+        return '\n'.join(lines)
+
     def _ff_options(self, dl_folder: str,
                     headless: bool) -> webdriver.FirefoxOptions:
         """Set options for Firefox webdriver.
@@ -163,11 +320,14 @@ def _decode_password(self) -> str:
 
         return password
 
+    @timed('scrape.login')
     def sng_login(self, dl_folder: pl.Path,
-                  headless: bool = False) -> None:
+                  headless: bool = False,
+                  url: str | None = None,
+                  account: dict | None = None) -> None:
         """Login to "Stromnetz Graz" web portal and setup data page.
 
-        Initialize Firefox webdriver.  
+        Initialize Firefox webdriver, a running one is closed.  
         Send username and password to the login page.  
         Open the data page and set units for data 
         processing to [Wh].
@@ -176,26 +336,54 @@ def sng_login(self, dl_folder: pl.Path,
             dl_folder (pathlib.Path): Target download directory 
                                         for Firefox webdriver.
             headless (bool = False): Firefox headless mode option.
+            url (string | None = None): Login page, defaults to `Login['url']`.
+            account (dict | None = None): Plain text `username` and `password`,
+                e.g. of `SMIT.mockportal.MockPortal.accounts`. Defaults to the
+                stored credentials.
         """
+        self.quit_driver()
         service = Service(executable_path=self.user.Path['geckodriver_executable'],
                           log_output=self.user.Path['webdriver_logFolder'])
         self.driver = webdriver.Firefox(options=self._ff_options(dl_folder, headless),
                                         service=service)
+        self._language = None
+        self._limits = None
         # Load Url
-        self.driver.get(self.user.Login['url'])
+        started = time.perf_counter()
+        self.driver.get(url or self.user.Login['url'])
+        self.user.journal.record_step('open', time.perf_counter() - started)
+        if self.recorder is not None:
+            self.recorder.start(self.driver, dl_folder)
+            self.recorder.step(None, time.perf_counter() - started)
         self.driver.maximize_window()
         # Send username and password
-        self.driver.find_element(By.NAME, "email").send_keys(self.user.Login['username'])
-        self.driver.find_element(By.NAME, "password").send_keys(self._decode_password())
+        if account is None:
+            username, password = self.user.Login['username'], self._decode_password()
+        else:
+            username, password = account['username'], account['password']
+        self.driver.find_element(By.NAME, "email").send_keys(username)
+        self.driver.find_element(By.NAME, "password").send_keys(password)
         # Login confirmation
-        self.wait_and_click('/html/body/div/app-root/main/div/app-login/div[2]/div[1]/form/div[3]/button')
+        self.wait_and_click(XPATHS['login'])
         # Open data page
-        self.wait_and_click('/html/body/div/app-root/main/div/app-dashboard/div[2]/div/div[1]/div[1]/div')
+        self.wait_and_click(XPATHS['data_page'])
         # Set unit to [Wh]
-        self.wait_and_click('/html/body/div/app-root/main/div/app-overview/div/div[2]/div[3]/app-unit-selector/div/div[2]')
+        self.wait_and_click(XPATHS['unit_wh'])
         
         self.logger.info('Login to Stromnetz Graz successful')
 
+    def _browser_language(self) -> str:
+        """Language of the browser, asked once per driver session.
+
+        Returns:
+            string: Value of `navigator.language`, e.g. 'de'.
+        """
+        if self._language is None:
+            self._language = self.driver.execute_script("return navigator.language;")
+            self.logger.debug(f'Browser language: {self._language}')
+
+        return self._language
+
     def _sng_input_dates(self, input_date: str) -> None:
         """Pass dates to web form.
 
@@ -209,7 +397,7 @@ def _sng_input_dates(self, input_date: str) -> None:
         Args:
             input_date (string): Date with format dd-mm-yyyy
         """
-        language = self.driver.execute_script("return navigator.language;")
+        language = self._browser_language()
         actions = ActionChains(self.driver)
 
         if language == 'de':
@@ -225,12 +413,39 @@ def _sng_input_dates(self, input_date: str) -> None:
 
         self.logger.debug(f'Date: {input_date} send to web element')
 
+    def _sng_fill_dates_script(self, start: str, end: str) -> bool:
+        """Fill both date inputs with one script call.
+
+        Replaces clicking the start input and typing both dates
+        with `SMIT.scrapedata.Webscraper._sng_input_dates`. The
+        script waits up to 10s for the start input.
+
+        Args:
+            start (string): Date with format dd-mm-yyyy
+            end (string): Date with format dd-mm-yyyy
+
+        Returns:
+            bool: False if the date inputs were not found.
+        """
+        language = self.driver.execute_async_script(_FILL_DATES_SCRIPT, start, end, 10_000)
+        if language is None:
+            self.logger.warning('Date inputs not found by script, falling back to keystrokes')
+            return False
+
+        self._language = language
+        self.logger.debug(f'Dates: {start} to {end} set by script')
+
+        return True
+
+    @timed('scrape.fill_dates')
     def _sng_fill_dates_element(self, start: str, end: str) -> None:
         """Activate daily average computation and fill dates.
         
         Activate the web element for daily average data.  
-        Call `SMIT.scrapedata.Webscraper._sng_input_dates`
-        method and confirm the selected dates.  
+        Fill the dates with `SMIT.scrapedata.Webscraper._sng_fill_dates_script`,
+        with `Options['date_input']` 'keys' or if the script fails call
+        `SMIT.scrapedata.Webscraper._sng_input_dates` and
+        confirm the selected dates.  
         Wait for data to be loaded.
 
         Args:
@@ -238,27 +453,72 @@ def _sng_fill_dates_element(self, start: str, end: str) -> None:
             end (string): Date with format dd-mm-yyyy
         """
         # Select daily sum measurements
-        self.wait_and_click('/html/body/div/app-root/main/div/app-overview/div/app-period-selector/div[1]/div/div[5]/div')
-        # Set cursor in start date input field
-        self.wait_and_click('//*[@id="fromDayOverviewDate"]')
-        self._sng_input_dates(start)    # Start date
-        self._sng_input_dates(end)      # End date
+        self.wait_and_click(XPATHS['daily_values'])
+        if self.user.Options['date_input'] != 'script' or not self._sng_fill_dates_script(start, end):
+            # Set cursor in start date input field
+            self.wait_and_click(XPATHS['start_date'])
+            self._sng_input_dates(start)    # Start date
+            self._sng_input_dates(end)      # End date
         # Confirm date selections
-        self.wait_and_click('/html/body/div/app-root/main/div/app-overview/div/app-period-selector/div[2]/div/div/div/div[2]/div[2]/div[2]/button')
+        self.wait_and_click(XPATHS['confirm_dates'])
 
         time.sleep(3)   # Wait for element to load
 
         self.logger.debug('Web element for date inputs filled')
 
+    @timed('scrape.download')
     def _sng_start_download(self) -> None:
         """Click download button.
         
         Start downloading files with filled dates from scraper.
         """
-        self.wait_and_click('/html/body/div/app-root/main/div/app-overview/reports-nav/app-header-nav/nav/div/div/div/div/div[2]/div/div[3]/div/div[2]/span')
+        self.wait_and_click(XPATHS['download'])
+        if self.recorder is not None:
+            self.recorder.expect_download()
 
         self.logger.debug('Download of raw files started')
 
+    def _sng_download_file(self, dl_folder: pl.Path, meter: str) -> pl.Path:
+        """Start the download and wait for the file of the meter.
+
+        The file has landed if a new `.csv` file with the meter
+        number is complete in the download folder, or if the
+        `SMIT.watcher.DownloadWatcher` already moved it. In the
+        worker process the moves of the watcher of the application
+        arrive in `delivered`.
+
+        Args:
+            dl_folder (pathlib.Path): Download folder of the browser.
+            meter (string): Day/Night meter device number.
+
+        Raises:
+            TimeoutException: If no file landed within `DOWNLOAD_TIMEOUT` seconds.
+
+        Returns:
+            pathlib.Path: Downloaded file.
+        """
+        dl_folder = pl.Path(dl_folder).absolute()
+        pattern = f'*{meter}*.csv'
+        known = set(self.user.storage.glob(dl_folder, pattern))
+        delivered = self.user.watcher.files if self.delivered is None else self.delivered
+        handled = len(delivered)
+
+        self._sng_start_download()
+
+        deadline = time.monotonic() + DOWNLOAD_TIMEOUT
+        while True:
+            moved = [path for path in delivered[handled:] if meter in path.name]
+            # Firefox writes to '<name>.part' while the download runs
+            landed = [path for path in self.user.storage.glob(dl_folder, pattern)
+                      if path not in known and not path.with_name(path.name + '.part').exists()]
+            if moved or landed:
+                return (moved + landed)[0]
+            if time.monotonic() > deadline:
+                raise TimeoutException(f'No file for meter {meter} in {dl_folder} '
+                                       f'after {DOWNLOAD_TIMEOUT}s')
+            time.sleep(POLL_BOUNDS[1])
+
+    @timed('scrape.switch_meter')
     def _sng_switch_day_night_meassurements(self, day_night: str) -> None:
         """Select meter for data setup.
 
@@ -272,47 +532,216 @@ def _sng_switch_day_night_meassurements(self, day_night: str) -> None:
             day_night (string): Accepts 'day' or 'night'.
         """
         # make dropdown active
-        self.wait_and_click('/html/body/div/app-root/main/div/app-overview/reports-nav/app-meter-point-selector/div/div[2]/div/div[1]/ul/li/a')
+        self.wait_and_click(XPATHS['meter_dropdown'])
         # choose night measurements
         if day_night == 'night':
-            self.wait_and_click('/html/body/div/app-root/main/div/app-overview/reports-nav/app-meter-point-selector/div/div[2]/div/div[1]/ul/li/ul/li[2]/a')
+            self.wait_and_click(XPATHS['night_meter'])
             self.logger.debug('Night meter measurements selected in web element')
         # choose day measurements
         else:
-            self.wait_and_click('/html/body/div/app-root/main/div/app-overview/reports-nav/app-meter-point-selector/div/div[2]/div/div[1]/ul/li/ul/li[1]/a')
+            self.wait_and_click(XPATHS['day_meter'])
             self.logger.debug('Day meter measurements selected in web element')
 
         time.sleep(3)
 
+    def _report(self, stage: str, **details) -> None:
+        """Send a progress event to the `progress` callback.
+
+        Args:
+            stage (string): Finished stage, e.g. 'login'.
+            **details: Further event entries.
+        """
+        if self.progress is not None:
+            self.progress({'stage': stage, **details})
+
+    def quit_driver(self) -> None:
+        """Close the browser, errors of a dead session are ignored."""
+        if self.driver is None:
+            return
+        try:
+            self.driver.quit()
+        except WebDriverException as error:
+            self.logger.debug(f'Browser not closed cleanly: {error!r}')
+        self.driver = None
+
+    def _retry(self, stage: str, func, *args):
+        """Run a stage, retry on webdriver errors.
+
+        Retries `Options['scrape_retries']` times, the wait before
+        retry n is `Options['scrape_backoff']` * 2^n seconds. Other
+        errors are raised at once.
+
+        Args:
+            stage (string): Stage name for the log.
+            func (Callable): Stage function.
+            *args: Arguments for `func`.
+
+        Returns:
+            Return value of `func`.
+        """
+        retries = self.user.Options['scrape_retries']
+        for attempt in range(retries + 1):
+            try:
+                return func(*args)
+            except WebDriverException as error:
+                if attempt == retries:
+                    self.logger.error(f'Stage {stage} failed after {retries} retries: {error.__class__.__name__}')
+                    raise
+                wait = self.user.Options['scrape_backoff'] * 2 ** attempt
+                self.logger.warning(f'Stage {stage} failed: {error.__class__.__name__}, '
+                                    f'retry {attempt + 1}/{retries} in {wait:.1f}s')
+                self._report('retry', failed=stage, attempt=attempt + 1)
+                time.sleep(wait)
+
+    def _download_meter(self, day_night: str, meter: str, dl_folder: pl.Path) -> None:
+        """Download the planned date range of one meter.
+
+        The stages switch meter, fill dates and download
+        are retried separately. The download is recorded
+        as attempt in the scrape journal, as successful
+        only after the file landed.
+
+        Args:
+            day_night (string): Accepts 'day' or 'night'.
+            meter (string): Day/Night meter device number.
+            dl_folder (pathlib.Path): Download folder of the browser.
+        """
+        meter = str(meter)
+        start, end = self.user.journal.plan(meter)
+        started = time.perf_counter()
+        try:
+            self._retry('switch_meter', self._sng_switch_day_night_meassurements, day_night)
+            self._retry('fill_dates', self._sng_fill_dates_element, start, end)
+            path = self._retry('download', self._sng_download_file, dl_folder, meter)
+        except Exception as error:
+            self.user.journal.record(meter, start, end, 'failed',
+                                     time.perf_counter() - started, error=repr(error))
+            raise
+        self.user.journal.record(meter, start, end, 'ok', time.perf_counter() - started)
+        self.logger.info(f'Downloaded data for meter: {meter} from {start} to {end} to {path.name}')
+        self._report('meter', meter=meter, start=start, end=end)
+
+    def download_meters(self, dl_folder: pl.Path,
+                        headless: bool = False,
+                        url: str | None = None,
+                        account: dict | None = None) -> None:
+        """Login and download the files of day and night meter.
+
+        The date range per meter is planned by
+        `SMIT.journal.ScrapeJournal.plan`, each download is
+        recorded as attempt in the scrape journal.
+
+        Meters downloaded up to yesterday are skipped, e.g. the
+        night meter after a run which failed on the day meter.
+        Login and each stage of a meter are retried with backoff.
+        If a stage still fails a new browser session logs in and
+        continues with the meters not downloaded yet.
+
+        Args:
+            dl_folder (pathlib.Path): Target download directory
+                                        for Firefox webdriver.
+            headless (bool = False): Firefox headless mode option.
+            url (string | None = None): Login page, defaults to `Login['url']`.
+            account (dict | None = None): Credentials and meters (`day_meter`,
+                `night_meter`) of another account, defaults to the stored user.
+        """
+        meters = self.user.Meter if account is None else account
+        pending = [day_night for day_night in ('night', 'day')
+                   if not self.user.journal.is_current(meters[f'{day_night}_meter'])]
+        if not pending:
+            self.logger.info('All meters already downloaded up to yesterday')
+            return
+
+        for session in range(SESSION_ATTEMPTS):
+            try:
+                # Login to "Stromnetz Graz" and scrape data for each meter
+                self._retry('login', self.sng_login, dl_folder, headless, url, account)
+                self._report('login')
+                while pending:
+                    self._download_meter(pending[0], meters[f'{pending[0]}_meter'], dl_folder)
+                    pending.pop(0)
+                break
+            except WebDriverException:
+                if session == SESSION_ATTEMPTS - 1:
+                    raise
+                self.logger.warning(f'Starting new browser session for meters: {pending}')
+
+        self.logger.info(f'Slowest scrape steps:\n{self.step_report(top=3)}')
+
+    @timed('scrape.get_daysum_files')
     def get_daysum_files(self, headless: bool = False) -> None:
         """Initiate download for daily average data.
         
         - Manage scrape dates logging.
         - Set Firefox headless mode according to config.
-        - Download files for day and night meter.
+        - Download files for day and night meter with
+          `SMIT.scrapedata.Webscraper.download_meters`.
+        - With `Options['scrape_mode']` 'record' capture the run to
+          `Path['scrape_cassette']`, with 'replay' scrape the captured
+          run from a local server instead of the portal.
+
+        Info:
+            Replayed runs are recorded in an in-memory journal, see
+            `SMIT.scrapedata.Webscraper._memory_journal`. Attempts and
+            scrape dates of the stored journal are not changed.
         
         Args:
             headless (bool = False): Firefox headless mode option.
+
+        Raises:
+            ValueError: For an unknown `Options['scrape_mode']`.
         """
+        mode = self.user.Options['scrape_mode']
+        if mode not in ('live', 'record', 'replay'):
+            raise ValueError(f"Unknown scrape mode: {mode}, use 'live', 'record' or 'replay'")
+
         self.user.persistence.initialize_dates_log()
         dates = self.user.persistence.load_dates_log()
         dates['end'] = (date.today() - timedelta(days=1)).strftime('%d-%m-%Y')
 
-        self.logger.debug('Scraping routine triggered')
-
-        # Login to "Stromnetz Graz" and scrape data for each meter
-        self.sng_login(self.user.Folder['raw_daysum'], headless)
-        self._sng_switch_day_night_meassurements('night')
-        self._sng_fill_dates_element(dates['start'], dates['end'])
-        self._sng_start_download()
-        self._sng_switch_day_night_meassurements('day')
-        self._sng_fill_dates_element(dates['start'], dates['end'])
-        self._sng_start_download()
-        self.logger.info('Downloaded data with the following arguments:')
-        self.logger.info('Start date: ' + dates['start'])
-        self.logger.info('End date: ' + dates['end'])
+        self.logger.debug(f'Scraping routine triggered, mode: {mode}')
+
+        if mode == 'replay':
+            with self._memory_journal(), \
+                    ReplayServer(self.user.Path['scrape_cassette'], self.logger) as server:
+                self.download_meters(self.user.Folder['raw_daysum'], headless, server.url)
+                self.start_date_updater(dates)
+            return
+        if mode == 'record':
+            self.recorder = ScrapeRecorder(self.user, self.user.Path['scrape_cassette'])
+            try:
+                self.download_meters(self.user.Folder['raw_daysum'], headless)
+            finally:
+                if self.recorder.driver is not None:
+                    self.recorder.finish()
+                self.recorder = None
+        else:
+            self.download_meters(self.user.Folder['raw_daysum'], headless)
         self.start_date_updater(dates)
 
+    @contextmanager
+    def _memory_journal(self) -> Iterator[ScrapeJournal]:
+        """Replace the scrape journal with an in-memory copy.
+
+        The copy starts with the scrape dates of the stored
+        journal, attempts and steps of a replayed run are
+        dropped on exit. Step timeouts are loaded again on
+        the next live run.
+
+        Yields:
+            ScrapeJournal: Journal used in the `with` block.
+        """
+        journal, limits = self.user.journal, self._limits
+        self.user.journal = ScrapeJournal(self.user, ':memory:')
+        self.user.journal.update_state(journal.state)
+        self._limits = None
+        try:
+            yield self.user.journal
+        finally:
+            self.user.journal.close()
+            self.user.journal = journal
+            self._limits = limits
+
     def __repr__(self) -> str:
         return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
 
@@ -0,0 +1,232 @@
+"""Read-only application settings
+
+---
+`Settings`
+----------
+
+- Parse `.toml` config files with `tomllib`.
+- Validate settings against a schema.
+- Provide a frozen settings snapshot.
+
+Typical usage:
+
+    settings = load_settings(pathlib.Path('config/user_settings.toml'))
+    settings.Folder['log']
+"""
+import pathlib as pl
+import tomllib
+from types import MappingProxyType
+
+# Required keys per table and their types
+SETTINGS_SCHEMA = {
+    'Init': {'csv_startDate': str},
+    'Options': {'headless_mode': bool},
+    'Folder': {'raw_daysum': str,
+               'raw_15min': str,
+               'work_daysum': str,
+               'work_15min': str,
+               'config': str,
+               'log': str},
+    'Path': {'log_file': str,
+             'persist_dates': str,
+             'geckodriver_executable': str,
+             'webdriver_logFolder': str,
+             'private_key': str,
+             'public_key': str,
+             'user_settings': str,
+             'user_data': str},
+}
+
+# Optional keys per table and their default values, types are checked against the default
+SETTINGS_DEFAULTS = {
+    'Init': {},
+    'Options': {'credential_cache_ttl': 0,
+                'log_level': 'DEBUG',
+                'metrics': False,
+                'storage': 'filesystem',
+                'scrape_lock_mode': 'join',
+                'scrape_lock_timeout': 600,
+                'scrape_mode': 'live',
+                'date_input': 'script',
+                'scrape_retries': 3,
+                'scrape_backoff': 2.0,
+                'scrape_worker': 'process',
+                'scrape_worker_timeout': 300,
+                'download_watcher': 'auto'},
+    'Folder': {'cache': './cache'},
+    'Path': {'plot_snapshot': './cache/snapshot.json',
+             'metrics_file': './log/metrics.json',
+             'scrape_journal': './log/scrape_journal.sqlite',
+             'scrape_lock': './log/scrape.lock',
+             'scrape_cassette': './log/cassette'},
+}
+
+USER_DATA_SCHEMA = {
+    'Login': {'url': str, 'username': str},
+    'Meter': {'day_meter': str, 'night_meter': str},
+}
+
+
+class Settings():
+    """Frozen snapshot of `user_settings.toml`.
+
+    ---
+
+    Each table is a read-only mapping. Setting or deleting
+    attributes raises an `AttributeError`.
+
+    Attributes:
+        tables (dict): Validated tables from the settings file.
+    """
+    __slots__ = tuple(SETTINGS_SCHEMA)
+
+    def __init__(self, tables: dict) -> None:
+        for name in self.__slots__:
+            object.__setattr__(self, name, MappingProxyType(dict(tables[name])))
+
+    def __setattr__(self, name, value) -> None:
+        raise AttributeError(f'Settings are read-only, cannot set {name}')
+
+    def __delattr__(self, name) -> None:
+        raise AttributeError(f'Settings are read-only, cannot delete {name}')
+
+    def __repr__(self) -> str:
+        return f"Settings({', '.join(self.__slots__)})"
+
+
+def _read_toml(file_path: pl.Path) -> dict:
+    """Parse `.toml` file with `tomllib`.
+
+    Args:
+        file_path (pathlib.Path): Path to `.toml` config file.
+
+    Returns:
+        dict: Plain Python representation of the file.
+    """
+    with open(file_path, 'rb') as file:
+        return tomllib.load(file)
+
+
+def _is_type(value, key_type: type) -> bool:
+    """Check the type of a config value.
+
+    Integers are accepted for float options,
+    e.g. `scrape_backoff = 2`. Booleans are no numbers.
+
+    Args:
+        value: Value from the config file.
+        key_type (type): Expected type.
+
+    Returns:
+        bool: True if the value can be used as `key_type`.
+    """
+    if key_type is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, key_type)
+
+
+def _validate(data: dict, schema: dict, file_path: pl.Path) -> None:
+    """Check tables, keys and value types.
+
+    Args:
+        data (dict): Parsed config file.
+        schema (dict): Table name as key, dict of key and type as value.
+        file_path (pathlib.Path): Config file, used in error message.
+
+    Raises:
+        ValueError: Listing all missing tables, keys and wrong types.
+    """
+    errors = list()
+    for table, keys in schema.items():
+        if not isinstance(data.get(table), dict):
+            errors.append(f'missing table [{table}]')
+            continue
+        for key, key_type in keys.items():
+            if key not in data[table]:
+                errors.append(f'missing key {table}.{key}')
+            elif not _is_type(data[table][key], key_type):
+                errors.append(f'{table}.{key} must be of type {key_type.__name__}')
+
+    if errors:
+        raise ValueError(f'Invalid config file {file_path}: ' + '; '.join(errors))
+
+
+def load_settings(file_path: pl.Path) -> Settings:
+    """Read and validate `user_settings.toml`.
+
+    Optional keys missing in the file are set to the
+    values from `SETTINGS_DEFAULTS`.
+
+    Args:
+        file_path (pathlib.Path): Path to settings file.
+
+    Raises:
+        ValueError: If the file does not match `SETTINGS_SCHEMA`.
+
+    Returns:
+        Settings: Frozen settings object.
+    """
+    data = _read_toml(file_path)
+    _validate(data, SETTINGS_SCHEMA, file_path)
+
+    unknown = set(data) - set(SETTINGS_SCHEMA)
+    if unknown:
+        raise ValueError(f'Invalid config file {file_path}: unknown tables {sorted(unknown)}')
+
+    errors = [f'{table}.{key} must be of type {type(default).__name__}'
+              for table, defaults in SETTINGS_DEFAULTS.items()
+              for key, default in defaults.items()
+              if key in data[table] and not _is_type(data[table][key], type(default))]
+    if errors:
+        raise ValueError(f'Invalid config file {file_path}: ' + '; '.join(errors))
+
+    tables = {table: {**SETTINGS_DEFAULTS[table], **data[table]} for table in SETTINGS_SCHEMA}
+    # Integers given for float options
+    for table, defaults in SETTINGS_DEFAULTS.items():
+        for key, default in defaults.items():
+            if isinstance(default, float):
+                tables[table][key] = float(tables[table][key])
+
+    return Settings(tables)
+
+
+def load_user_data(file_path: pl.Path) -> dict:
+    """Read and validate `user_data.toml`.
+
+    The tables stay mutable, the Gui updates
+    credentials on the application instance.
+
+    Args:
+        file_path (pathlib.Path): Path to user data file.
+
+    Raises:
+        ValueError: If the file does not match `USER_DATA_SCHEMA`.
+
+    Returns:
+        dict: Table name as key, dict of entries as value.
+    """
+    data = _read_toml(file_path)
+    _validate(data, USER_DATA_SCHEMA, file_path)
+
+    return data
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
@@ -0,0 +1,521 @@
+"""File storage backends
+
+---
+`FileStorage`
+-------------
+
+- Read and write files on the filesystem.
+- Atomic writes via temporary file and rename, permissions are kept.
+- Buffer writes, moves and removes in a batch and apply them together.
+
+`MemoryStorage`
+---------------
+
+- Keep all written, moved and deleted files in memory.
+- Read files which were never written from the filesystem.
+- Run the scrape, move and ingest pipeline without writing to disk.
+
+Both backends share the interface of `Storage`. All paths are
+`pathlib.Path` objects and are resolved to absolute paths. The backend
+is selected with `Options['storage']` ('filesystem' or 'memory').
+
+Typical usage:
+
+    app = Application()
+    app.storage.write_text(path, 'content')
+    with app.storage.batch():
+        app.storage.write_bytes(path, b'content')
+"""
+import abc
+import fnmatch
+import io
+import os
+import pathlib as pl
+import stat
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+# Type hints
+from typing import TYPE_CHECKING, BinaryIO, Iterator
+if TYPE_CHECKING:
+    from SMIT.application import Application
+
+FileInfo = namedtuple('FileInfo', ['size', 'mtime_ns', 'ctime_ns'])
+"""Size in bytes, modification and change time in nanoseconds."""
+
+
+class Storage(abc.ABC):
+    """Interface for storage backends.
+
+    ---
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+    """
+    def __init__(self, app: 'Application') -> None:
+
+        self.user = app
+        self.logger = app.logger
+        msg  = f'Class {self.__class__.__name__} of the '
+        msg += f'module {self.__class__.__module__} '
+        msg +=  'successfully initialized.'
+        self.logger.debug(msg)
+
+    @abc.abstractmethod
+    def read_bytes(self, path: pl.Path) -> bytes:
+        """Content of a file.
+
+        Args:
+            path (pathlib.Path): File to read.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+
+        Returns:
+            bytes: File content.
+        """
+        raise NotImplementedError
+
+    def read_text(self, path: pl.Path) -> str:
+        """Content of an utf-8 text file.
+
+        Args:
+            path (pathlib.Path): File to read.
+
+        Returns:
+            string: File content.
+        """
+        return self.read_bytes(path).decode('utf-8')
+
+    def open_read(self, path: pl.Path) -> BinaryIO:
+        """Binary file object for reading, e.g. for `pandas.read_csv`.
+
+        Args:
+            path (pathlib.Path): File to read.
+
+        Returns:
+            BinaryIO: File object, close after use.
+        """
+        return io.BytesIO(self.read_bytes(path))
+
+    @abc.abstractmethod
+    def write_bytes(self, path: pl.Path, data: bytes) -> None:
+        """Replace the content of a file.
+
+        Args:
+            path (pathlib.Path): File to write.
+            data (bytes): New content.
+        """
+        raise NotImplementedError
+
+    def write_text(self, path: pl.Path, text: str) -> None:
+        """Replace the content of an utf-8 text file.
+
+        Args:
+            path (pathlib.Path): File to write.
+            text (string): New content.
+        """
+        self.write_bytes(path, text.encode('utf-8'))
+
+    @abc.abstractmethod
+    def exists(self, path: pl.Path) -> bool:
+        """Check if a file exists.
+
+        Args:
+            path (pathlib.Path): File to check.
+
+        Returns:
+            bool: True if the file exists.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stat(self, path: pl.Path) -> FileInfo:
+        """Size and timestamps of a file.
+
+        Args:
+            path (pathlib.Path): Existing file.
+
+        Returns:
+            FileInfo: Size, modification and change time.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def glob(self, folder: pl.Path, pattern: str) -> list[pl.Path]:
+        """Files in a folder matching a pattern, not recursive.
+
+        Args:
+            folder (pathlib.Path): Folder to search.
+            pattern (string): Shell pattern, e.g. '*.csv'.
+
+        Returns:
+            list: Sorted absolute paths.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def move(self, src: pl.Path, dest: pl.Path) -> None:
+        """Move or rename a file, an existing `dest` is replaced.
+
+        Args:
+            src (pathlib.Path): Existing file.
+            dest (pathlib.Path): New path.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def remove(self, path: pl.Path) -> None:
+        """Delete a file.
+
+        Args:
+            path (pathlib.Path): Existing file.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group several writes.
+
+        Backends may buffer writes in the `with` block and
+        flush them together on exit.
+        """
+        yield
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+class FileStorage(Storage):
+    """Filesystem backend.
+
+    ---
+
+    Each write goes to a temporary file in the destination
+    folder which then replaces the target, an interrupted
+    write never leaves a truncated file. The target keeps its
+    permissions, new files get the default of the umask.
+
+    In a `batch` block writes, moves and removes are buffered
+    and applied on exit of the outermost block. Buffered changes
+    are visible to reads in the meantime. All new contents are
+    written to temporary files before the first target is
+    replaced, if one of them fails no target is changed.
+    Batches are per thread, only the thread which opened a
+    batch buffers its changes and sees them before the flush.
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+    """
+    def __init__(self, app: 'Application') -> None:
+
+        # Per thread: pending, buffered changes with key: absolute path,
+        # value: (content, write time), content None for a removed file
+        # and depth, the number of open batch blocks
+        self._local = threading.local()
+        super().__init__(app)
+
+    @property
+    def _pending(self) -> dict:
+        """Buffered changes of the current thread."""
+        if not hasattr(self._local, 'pending'):
+            self._local.pending = dict()
+        return self._local.pending
+
+    @property
+    def _batch_depth(self) -> int:
+        """Open batch blocks of the current thread."""
+        return getattr(self._local, 'depth', 0)
+
+    def _buffered(self, path: pl.Path) -> tuple[bytes | None, int] | None:
+        """Buffered change of a file.
+
+        Args:
+            path (pathlib.Path): Absolute path.
+
+        Raises:
+            FileNotFoundError: If the file is removed in the batch.
+
+        Returns:
+            tuple | None: Content and write time, None if unchanged.
+        """
+        change = self._pending.get(path)
+        if change is not None and change[0] is None:
+            raise FileNotFoundError(path)
+        return change
+
+    def read_bytes(self, path: pl.Path) -> bytes:
+        path = pl.Path(path).absolute()
+        change = self._buffered(path)
+        if change is not None:
+            return change[0]
+        return path.read_bytes()
+
+    def open_read(self, path: pl.Path) -> BinaryIO:
+        path = pl.Path(path).absolute()
+        change = self._buffered(path)
+        if change is not None:
+            return io.BytesIO(change[0])
+        return open(path, 'rb')
+
+    def write_bytes(self, path: pl.Path, data: bytes) -> None:
+        path = pl.Path(path).absolute()
+        if self._batch_depth:
+            self._pending[path] = (bytes(data), time.time_ns())
+            return
+        self._write(path, data)
+
+    @staticmethod
+    def _stage(path: pl.Path, data: bytes) -> pl.Path:
+        """Write content to a temporary file next to the target.
+
+        The temporary file gets the permissions of the
+        target. For a new file the umask is applied by the
+        system when the file is created.
+
+        Args:
+            path (pathlib.Path): Absolute destination path.
+            data (bytes): File content.
+
+        Returns:
+            pathlib.Path: Temporary file, replaces the target with `os.replace`.
+        """
+        try:
+            mode = stat.S_IMODE(path.stat().st_mode)
+        except FileNotFoundError:
+            mode = None
+
+        temp = path.with_name(f'.{path.name}.{uuid.uuid4().hex[:8]}')
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+        descriptor = os.open(temp, flags, 0o666 if mode is None else 0o600)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+            if mode is not None:
+                os.chmod(temp, mode)
+        except BaseException:
+            temp.unlink()
+            raise
+        return temp
+
+    @classmethod
+    def _write(cls, path: pl.Path, data: bytes) -> None:
+        """Atomic write of one file.
+
+        Args:
+            path (pathlib.Path): Absolute destination path.
+            data (bytes): File content.
+        """
+        temp = cls._stage(path, data)
+        try:
+            os.replace(temp, path)
+        finally:
+            temp.unlink(missing_ok=True)
+
+    def exists(self, path: pl.Path) -> bool:
+        path = pl.Path(path).absolute()
+        try:
+            change = self._buffered(path)
+        except FileNotFoundError:
+            return False
+        return change is not None or path.is_file()
+
+    def stat(self, path: pl.Path) -> FileInfo:
+        path = pl.Path(path).absolute()
+        change = self._buffered(path)
+        if change is not None:
+            data, written = change
+            return FileInfo(len(data), written, written)
+        info = path.stat()
+        return FileInfo(info.st_size, info.st_mtime_ns, info.st_ctime_ns)
+
+    def glob(self, folder: pl.Path, pattern: str) -> list[pl.Path]:
+        folder = pl.Path(folder).absolute()
+        files = {path for path in folder.glob(pattern) if path.is_file()}
+        for path, (data, _) in self._pending.items():
+            if path.parent != folder or not fnmatch.fnmatch(path.name, pattern):
+                continue
+            if data is None:
+                files.discard(path)
+            else:
+                files.add(path)
+        return sorted(files)
+
+    def move(self, src: pl.Path, dest: pl.Path) -> None:
+        src, dest = pl.Path(src).absolute(), pl.Path(dest).absolute()
+        if self._batch_depth:
+            data = self.read_bytes(src)
+            written = time.time_ns()
+            self._pending[dest] = (data, written)
+            self._pending[src] = (None, written)
+            return
+        src.replace(dest)
+
+    def remove(self, path: pl.Path) -> None:
+        path = pl.Path(path).absolute()
+        if self._batch_depth:
+            if not self.exists(path):
+                raise FileNotFoundError(path)
+            self._pending[path] = (None, time.time_ns())
+            return
+        path.unlink()
+
+    def flush(self) -> None:
+        """Apply all buffered changes of the current thread.
+
+        New contents are staged in temporary files first, on
+        an error the staged files are deleted and no target
+        is changed. Then the targets are replaced and removed
+        files are deleted.
+        """
+        pending, self._local.pending = self._pending, dict()
+        staged = list()
+        try:
+            for path, (data, _) in pending.items():
+                if data is not None:
+                    staged.append((self._stage(path, data), path))
+        except BaseException:
+            for temp, _ in staged:
+                temp.unlink(missing_ok=True)
+            raise
+
+        for temp, path in staged:
+            os.replace(temp, path)
+        for path, (data, _) in pending.items():
+            if data is None:
+                path.unlink(missing_ok=True)
+        if pending:
+            self.logger.debug(f'{len(pending)} buffered changes applied')
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Buffer changes and apply them on exit of the outermost block.
+
+        Changes of other threads are written directly. On an
+        exception the buffered changes are discarded.
+        """
+        self._local.depth = self._batch_depth + 1
+        try:
+            yield
+        except BaseException:
+            if self._batch_depth == 1:
+                self._pending.clear()
+            raise
+        finally:
+            self._local.depth -= 1
+        if self._batch_depth == 0:
+            self.flush()
+
+
+class MemoryStorage(Storage):
+    """In-memory backend.
+
+    ---
+
+    Works as copy-on-write layer over the filesystem: written
+    and moved files are kept in memory, deleted files are hidden.
+    Files which were never touched are read from disk, e.g. the
+    dummy fixtures or downloaded `.csv` files. Nothing is ever
+    written to disk.
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+    """
+    def __init__(self, app: 'Application') -> None:
+
+        # Key: absolute path, value: (content, write time)
+        self._files = dict()
+        # Files on disk which are hidden by a move or remove
+        self._hidden = set()
+        super().__init__(app)
+
+    def read_bytes(self, path: pl.Path) -> bytes:
+        path = pl.Path(path).absolute()
+        if path in self._files:
+            return self._files[path][0]
+        if path in self._hidden:
+            raise FileNotFoundError(path)
+        return path.read_bytes()
+
+    def write_bytes(self, path: pl.Path, data: bytes) -> None:
+        path = pl.Path(path).absolute()
+        self._files[path] = (bytes(data), time.time_ns())
+        self._hidden.discard(path)
+
+    def exists(self, path: pl.Path) -> bool:
+        path = pl.Path(path).absolute()
+        return path in self._files or (path not in self._hidden and path.is_file())
+
+    def stat(self, path: pl.Path) -> FileInfo:
+        path = pl.Path(path).absolute()
+        if path in self._files:
+            data, written = self._files[path]
+            return FileInfo(len(data), written, written)
+        if path in self._hidden:
+            raise FileNotFoundError(path)
+        info = path.stat()
+        return FileInfo(info.st_size, info.st_mtime_ns, info.st_ctime_ns)
+
+    def glob(self, folder: pl.Path, pattern: str) -> list[pl.Path]:
+        folder = pl.Path(folder).absolute()
+        files = {path for path in folder.glob(pattern)
+                 if path not in self._hidden and path.is_file()}
+        files.update(path for path in self._files
+                     if path.parent == folder and fnmatch.fnmatch(path.name, pattern))
+        return sorted(files)
+
+    def move(self, src: pl.Path, dest: pl.Path) -> None:
+        self.write_bytes(dest, self.read_bytes(src))
+        self.remove(src)
+
+    def remove(self, path: pl.Path) -> None:
+        path = pl.Path(path).absolute()
+        if not self.exists(path):
+            raise FileNotFoundError(path)
+        self._files.pop(path, None)
+        self._hidden.add(path)
+
+
+STORAGES = {'filesystem': FileStorage, 'memory': MemoryStorage}
+
+
+def create_storage(app: 'Application') -> Storage:
+    """Instantiate the backend selected in `Options['storage']`.
+
+    Args:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+
+    Raises:
+        ValueError: For an unknown backend name.
+
+    Returns:
+        Storage: `FileStorage` or `MemoryStorage` instance.
+    """
+    name = app.Options['storage']
+    if name not in STORAGES:
+        raise ValueError(f'Unknown storage backend: {name}, use one of {tuple(STORAGES)}')
+
+    return STORAGES[name](app)
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
@@ -0,0 +1,266 @@
+"""Synthetic smart meter export files
+
+---
+`generate_exports`
+------------------
+
+- Write daily (`Tagesübersicht`) and 15 minute (`Viertelstundenwerte`)
+  files in the format of the Stromnetz Graz portal.
+- Any number of meters and any date range.
+- Optional missing days and overlapping re-downloads.
+- Rows are streamed to disk, memory use does not grow with the date range.
+
+File format: 7 columns separated by semicolon, decimal comma,
+timestamps with Europe/Vienna offset and a monotonically increasing
+`Zaehlerstand` in [kWh]. `Verbrauch` is given in [Wh].
+
+Typical usage:
+
+    generate_exports({'day': pathlib.Path('./csv_raw/daysum')}, ['199996', '199997'],
+                     dt.date(2014, 1, 1), dt.date(2023, 12, 31))
+
+    python -m SMIT.synthetic ./out --meters 199996 199997 --years 10 --resolution day 15min
+"""
+import argparse
+import datetime as dt
+import math
+import pathlib as pl
+from zoneinfo import ZoneInfo
+import numpy as np
+
+HEADER = ('Ablesezeitpunkt;Zaehlerstand Einheitstarif;Zaehlerstand Hochtarif;'
+          'Zaehlerstand Niedertarif;Verbrauch Einheitstarif;Verbrauch Hochtarif;'
+          'Verbrauch Niedertarif')
+
+# Filename suffix per resolution
+SUFFIX = {'day': 'Tagesübersicht', '15min': 'Viertelstundenwerte'}
+
+# Metering point number is this prefix, zero padded, followed by the meter number
+POD_PREFIX = 'AT0081000802'
+
+TIMEZONE = ZoneInfo('Europe/Vienna')
+QUARTER = dt.timedelta(minutes=15)
+
+# Relative load per hour of day, low at night, peaks in the morning and evening
+HOURLY_PROFILE = np.array([0.5, 0.4, 0.4, 0.4, 0.4, 0.5, 0.8, 1.2, 1.3, 1.0, 0.9, 0.9,
+                           1.0, 0.9, 0.8, 0.8, 0.9, 1.1, 1.4, 1.6, 1.5, 1.2, 0.9, 0.7])
+
+
+def _windows(start: dt.date, end: dt.date, chunk_days: int, overlap_days: int) -> list[tuple]:
+    """Date ranges of the single export files.
+
+    Args:
+        start (datetime.date): First day of the data.
+        end (datetime.date): Last day of the data.
+        chunk_days (int): Days per file.
+        overlap_days (int): Days repeated from the previous file.
+
+    Raises:
+        ValueError: If `overlap_days` is not smaller than `chunk_days`.
+
+    Returns:
+        list: (first day, last day) per file.
+    """
+    if not 0 <= overlap_days < chunk_days:
+        raise ValueError('overlap_days must be at least 0 and smaller than chunk_days')
+
+    windows = list()
+    first = start
+    while True:
+        last = min(first + dt.timedelta(days=chunk_days - 1), end)
+        windows.append((first, last))
+        if last >= end:
+            return windows
+        first = last - dt.timedelta(days=overlap_days - 1)
+
+def _quarters(day: dt.date) -> list[dt.datetime]:
+    """Local start times of all 15 minute intervals of a day.
+
+    Days with a daylight saving time change have 92 or 100 intervals.
+
+    Args:
+        day (datetime.date): Day of the readings.
+
+    Returns:
+        list: Timezone aware datetimes.
+    """
+    start = dt.datetime(day.year, day.month, day.day, tzinfo=TIMEZONE).astimezone(dt.timezone.utc)
+    following = day + dt.timedelta(days=1)
+    end = dt.datetime(following.year, following.month, following.day,
+                      tzinfo=TIMEZONE).astimezone(dt.timezone.utc)
+    count = int((end - start) / QUARTER)
+
+    return [(start + index * QUARTER).astimezone(TIMEZONE) for index in range(count)]
+
+def _quarter_usage(rng: np.random.Generator, day: dt.date,
+                   moments: list[dt.datetime], base: float) -> np.ndarray:
+    """Consumption per 15 minute interval.
+
+    Daily consumption follows a yearly cycle with a winter peak
+    and is higher on weekends. It is spread over the day with
+    `HOURLY_PROFILE` and random noise.
+
+    Args:
+        rng (numpy.random.Generator): Random number source.
+        day (datetime.date): Day of the readings.
+        moments (list): Output of `_quarters`.
+        base (float): Mean daily consumption in [Wh].
+
+    Returns:
+        numpy.ndarray: Integer consumption in [Wh] per interval.
+    """
+    season = 1 + 0.35 * math.cos(2 * math.pi * (day.timetuple().tm_yday - 15) / 365.25)
+    weekend = 1.15 if day.weekday() >= 5 else 1.0
+    target = base * season * weekend * rng.lognormal(0, 0.15)
+
+    weights = HOURLY_PROFILE[[moment.hour for moment in moments]] * rng.lognormal(0, 0.3, len(moments))
+
+    return np.round(target * weights / weights.sum()).astype(np.int64)
+
+def _row(moment: dt.datetime, reading: int, usage: int) -> str:
+    """One line of an export file.
+
+    Args:
+        moment (datetime.datetime): Timezone aware timestamp.
+        reading (int): Meter reading in [Wh].
+        usage (int): Consumption in [Wh].
+
+    Returns:
+        string: Semicolon separated line with decimal comma.
+    """
+    return (f'{moment.isoformat(timespec="milliseconds")};'
+            f'{reading // 1000},{reading % 1000:03d};0;0;{usage};0;0\n')
+
+def export_filename(meter: str, first: dt.date, last: dt.date, resolution: str) -> str:
+    """Portal style filename.
+
+    Args:
+        meter (string): Meter number.
+        first (datetime.date): First day in the file.
+        last (datetime.date): Last day in the file.
+        resolution (string): 'day' or '15min'.
+
+    Returns:
+        string: Filename containing the meter number.
+    """
+    return (f'Synthetic_{first:%Y%m%d}-{last:%Y%m%d}_Zaehlpunkt_'
+            f'{POD_PREFIX}{meter:0>21}_{SUFFIX[resolution]}.csv')
+
+def generate_exports(folders: dict,
+                     meters: list,
+                     start: dt.date,
+                     end: dt.date,
+                     chunk_days: int = 90,
+                     overlap_days: int = 0,
+                     gap_rate: float = 0.0,
+                     seed: int = 0) -> list[pl.Path]:
+    """Write synthetic export files.
+
+    Each meter gets one file per `chunk_days` and resolution.
+    Daily and 15 minute values of a day have the same sum.
+    With `overlap_days` every file repeats the last days of the
+    previous file with identical values, like a re-download.
+    With `gap_rate` days are left out in all files, the meter
+    reading still includes the consumption of missing days.
+
+    Args:
+        folders (dict): Resolution ('day' and/or '15min') as key,
+            output folder as value. Folders are created if missing.
+        meters (list): Meter numbers, e.g. ['199996', '199997'].
+        start (datetime.date): First day of the data.
+        end (datetime.date): Last day of the data.
+        chunk_days (int = 90): Days per file.
+        overlap_days (int = 0): Days repeated from the previous file.
+        gap_rate (float = 0.0): Probability for a missing day.
+        seed (int = 0): Seed for reproducible data.
+
+    Raises:
+        ValueError: For unknown resolutions or invalid overlap.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    unknown = set(folders) - set(SUFFIX)
+    if unknown:
+        raise ValueError(f'Unknown resolutions: {sorted(unknown)}, use {tuple(SUFFIX)}')
+
+    folders = {resolution: pl.Path(folder) for resolution, folder in folders.items()}
+    for folder in folders.values():
+        folder.mkdir(parents=True, exist_ok=True)
+    windows = _windows(start, end, chunk_days, overlap_days)
+    written = list()
+
+    for index, meter in enumerate(meters):
+        meter = str(meter)
+        rng = np.random.default_rng([seed, index])
+        base = rng.uniform(3000, 8000)
+        reading = int(rng.integers(1_000_000, 10_000_000))
+        # Key: (window index, resolution), value: open file
+        open_files = dict()
+
+        try:
+            day = start
+            while day <= end:
+                moments = _quarters(day)
+                usage = _quarter_usage(rng, day, moments, base)
+                missing = rng.random() < gap_rate
+
+                for number, (first, last) in enumerate(windows):
+                    if not first <= day <= last:
+                        continue
+                    for resolution, folder in folders.items():
+                        key = (number, resolution)
+                        if key not in open_files:
+                            path = folder / export_filename(meter, first, last, resolution)
+                            open_files[key] = open(path, 'w', encoding='utf-8', newline='')
+                            open_files[key].write(HEADER + '\n')
+                            written.append(path)
+                        if missing:
+                            continue
+                        if resolution == 'day':
+                            open_files[key].write(_row(moments[0], reading + int(usage.sum()),
+                                                       int(usage.sum())))
+                        else:
+                            quarter_readings = reading + np.cumsum(usage)
+                            open_files[key].writelines(
+                                _row(moment, int(value), int(amount))
+                                for moment, value, amount in zip(moments, quarter_readings, usage))
+
+                # Close files of finished windows
+                for key in [key for key in open_files if windows[key[0]][1] <= day]:
+                    open_files.pop(key).close()
+
+                reading += int(usage.sum())
+                day += dt.timedelta(days=1)
+        finally:
+            for file in open_files.values():
+                file.close()
+
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic smart meter export files')
+    parser.add_argument('folder', type=pl.Path,
+                        help="Output folder, files are written to the subfolders 'daysum' and '15min'")
+    parser.add_argument('--meters', nargs='+', default=['199996', '199997'])
+    parser.add_argument('--years', type=int, default=1, help='Years ending yesterday')
+    parser.add_argument('--resolution', nargs='+', default=['day'], choices=tuple(SUFFIX))
+    parser.add_argument('--chunk-days', type=int, default=90)
+    parser.add_argument('--overlap-days', type=int, default=0)
+    parser.add_argument('--gap-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    last_day = dt.date.today() - dt.timedelta(days=1)
+    subfolders = {'day': 'daysum', '15min': '15min'}
+    files = generate_exports({resolution: args.folder / subfolders[resolution]
+                              for resolution in args.resolution},
+                             args.meters,
+                             last_day - dt.timedelta(days=round(365.25 * args.years) - 1),
+                             last_day,
+                             args.chunk_days,
+                             args.overlap_days,
+                             args.gap_rate,
+                             args.seed)
+    print(f'{len(files)} files written to {args.folder}')
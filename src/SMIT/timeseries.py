@@ -0,0 +1,183 @@
+"""Date indexed consumption series
+
+---
+`SeriesStore`
+-------------
+
+- Hold date sorted arrays per meter.
+- Maintain day + night total with rolling medians.
+- Slice date ranges with binary search.
+
+Typical usage:
+
+    app = Application()
+    app.series.method()
+"""
+from datetime import date
+import numpy as np
+import pandas as pd
+# Type hints
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from SMIT.application import Application
+
+
+class SeriesStore():
+    """Range queries over ingested consumption data.
+
+    ---
+
+    Each dataset is stored as a sorted `datetime64[D]` array
+    and aligned value arrays. The total dataset is the sum of
+    day and night meter on common dates, rounded to [Wh], with
+    7 and 30 day rolling medians. It is rebuilt whenever one
+    of both meters is updated, so range queries only cost
+    the binary search plus the size of the result.
+
+    Dataset columns:
+
+    - Meter datasets: one column named after the meter number.
+    - 'total': [`sum_verbrauch`, `median30`, `median7`].
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+    """
+    resolutions = {'day': None, 'week': 'W-SUN', 'month': 'MS', 'year': 'YS'}
+
+    def __init__(self, app: 'Application') -> None:
+
+        self.user = app
+        self.logger = app.logger
+        # Key: dataset name, value: (dates, {column: values})
+        self._datasets = dict()
+        msg  = f'Class {self.__class__.__name__} of the '
+        msg += f'module {self.__class__.__module__} '
+        msg +=  'successfully initialized.'
+        self.logger.debug(msg)
+
+    def update(self, meter: str, dataframe: pd.DataFrame) -> None:
+        """Replace the series of one meter.
+
+        If the meter is the day or night meter,
+        the total dataset is rebuilt.
+
+        Args:
+            meter (string): Day/Night meter device number.
+            dataframe (pd.DataFrame): Output of
+                `SMIT.filehandling.OsInterface.create_dataframe`.
+        """
+        meter = str(meter)
+        dates = pd.to_datetime(dataframe['date']).to_numpy(dtype='datetime64[D]')
+        values = dataframe['verbrauch'].to_numpy(dtype=float)
+        order = np.argsort(dates, kind='stable')
+        self._datasets[meter] = (dates[order], {meter: values[order]})
+
+        if meter in (str(self.user.Meter['day_meter']), str(self.user.Meter['night_meter'])):
+            self._build_total()
+
+        self.logger.debug(f'Series for meter: {meter} updated')
+
+    def _build_total(self) -> None:
+        """Materialize the day + night total.
+
+        Same computation as a merge on date with summed
+        and rounded consumption followed by rolling medians.
+        """
+        day_meter = str(self.user.Meter['day_meter'])
+        night_meter = str(self.user.Meter['night_meter'])
+        if day_meter not in self._datasets or night_meter not in self._datasets:
+            return
+
+        day_dates, day_values = self._datasets[day_meter]
+        night_dates, night_values = self._datasets[night_meter]
+        dates, day_idx, night_idx = np.intersect1d(day_dates, night_dates,
+                                                   assume_unique=True,
+                                                   return_indices=True)
+        total = np.round(day_values[day_meter][day_idx] + night_values[night_meter][night_idx], 0)
+        series = pd.Series(total)
+
+        self._datasets['total'] = (dates, {
+            'sum_verbrauch': total,
+            'median30': series.rolling(30).median().to_numpy(),
+            'median7': series.rolling(7).median().to_numpy()})
+
+        self.logger.debug('Series for total consumption materialized')
+
+    def _slice(self, dataset: str, start: str | date, end: str | date) -> pd.DataFrame:
+        """Select rows between start and end date.
+
+        Args:
+            dataset (string): Meter number or 'total'.
+            start (str | date): First day, format: 'YYYY-MM-DD'.
+            end (str | date): Last day, format: 'YYYY-MM-DD'.
+
+        Returns:
+            pd.DataFrame: Date index and dataset columns.
+        """
+        dates, columns = self._datasets[str(dataset)]
+        low = np.searchsorted(dates, np.datetime64(start, 'D'), side='left')
+        high = np.searchsorted(dates, np.datetime64(end, 'D'), side='right')
+
+        return pd.DataFrame({name: values[low:high] for name, values in columns.items()},
+                            index=pd.DatetimeIndex(dates[low:high].astype('datetime64[ns]')))
+
+    def get_range(self, meters: list, start: str | date, end: str | date,
+                  resolution: str = 'day') -> pd.DataFrame:
+        """Consumption of one or more datasets for a date range.
+
+        Bounds are found with binary search on the sorted date arrays,
+        start and end date are included.
+        For resolutions other than 'day' the consumption is summed
+        and the last median value of each period is used.
+
+        Args:
+            meters (list): Meter numbers and/or 'total'.
+            start (str | date): First day, format: 'YYYY-MM-DD'.
+            end (str | date): Last day, format: 'YYYY-MM-DD'.
+            resolution (str = 'day'): One of `SeriesStore.resolutions`.
+
+        Raises:
+            KeyError: If a dataset was not ingested.
+
+        Returns:
+            pd.DataFrame: Column `date` followed by the 
+                columns of the requested datasets.
+        """
+        frames = [self._slice(meter, start, end) for meter in meters]
+        dataframe = frames[0] if len(frames) == 1 else pd.concat(frames, axis=1)
+
+        rule = self.resolutions[resolution]
+        if rule is not None:
+            aggregation = {column: 'last' if column.startswith('median') else 'sum'
+                           for column in dataframe.columns}
+            dataframe = dataframe.resample(rule).agg(aggregation)
+
+        dataframe = dataframe.rename_axis('date').reset_index()
+
+        self.logger.debug(f'Range for {meters} with start: {start} and end: {end} selected')
+
+        return dataframe
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
@@ -0,0 +1,456 @@
+"""Watch the download folders and ingest files as they land
+
+---
+`DownloadWatcher`
+-----------------
+
+- Watch `Folder['raw_daysum']` and `Folder['raw_15min']`.
+- Use inotify on Linux, scan the folders on other systems.
+- Validate each complete `.csv` file.
+- Move valid files to the work directory and ingest them.
+
+A file is complete when the browser closed it or renamed
+it from its `.part` file (inotify) or when its size and
+modification time did not change between two scans (polling).
+Invalid files stay in the download folder. Each file is
+handled once, the move removes it from the download folder.
+
+The mode is selected with `Options['download_watcher']`:
+'auto' uses inotify where available, 'poll' always scans
+and 'off' moves the files after the scrape.
+
+Typical usage:
+
+    app = Application()
+    with app.watcher:
+        app.scrape.get_daysum_files(headless=True)
+    app.watcher.files
+"""
+import ctypes
+import ctypes.util
+import datetime as dt
+import os
+import pathlib as pl
+import select
+import struct
+import sys
+import threading
+# Type hints
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from SMIT.application import Application
+
+# Seconds between two scans of the polling source
+POLL_INTERVAL = 0.5
+# Seconds to wait for the watcher thread on stop
+STOP_TIMEOUT = 10
+
+# Event masks, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0)
+# struct inotify_event without the name: wd, mask, cookie, len
+_EVENT = struct.Struct('iIII')
+
+# Download folder key and work folder key per resolution
+FOLDERS = {'daysum': ('raw_daysum', 'work_daysum'),
+           '15min': ('raw_15min', 'work_15min')}
+
+
+class _InotifySource():
+    """Complete files from inotify events, Linux only.
+
+    Args:
+        folders (list): Folders to watch.
+
+    Raises:
+        OSError: If inotify is not available or a folder can not be watched.
+    """
+    def __init__(self, folders: list[pl.Path]) -> None:
+
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux')
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        # Written by `wake` to end a running `poll`
+        self._wake_read, self._wake_write = os.pipe()
+        self._folders = dict()
+        for folder in folders:
+            descriptor = libc.inotify_add_watch(self._fd, os.fsencode(folder),
+                                                IN_CLOSE_WRITE | IN_MOVED_TO)
+            if descriptor < 0:
+                error = ctypes.get_errno()
+                self.close()
+                raise OSError(error, f'inotify_add_watch failed for {folder}')
+            self._folders[descriptor] = folder
+
+    def poll(self, timeout: float) -> list[pl.Path]:
+        """Files closed after writing or moved into a folder.
+
+        Args:
+            timeout (float): Seconds to wait for events.
+
+        Returns:
+            list: Paths of the files.
+        """
+        readable, _, _ = select.select([self._fd, self._wake_read], [], [], timeout)
+        if self._wake_read in readable:
+            os.read(self._wake_read, 64)
+        if self._fd not in readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = list()
+        offset = 0
+        while offset < len(data):
+            descriptor, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if name and descriptor in self._folders:
+                paths.append(self._folders[descriptor] / name)
+
+        return paths
+
+    def wake(self) -> None:
+        """End a running `poll` without events."""
+        os.write(self._wake_write, b'\0')
+
+    def close(self) -> None:
+        """Close the inotify descriptor, removes all watches."""
+        os.close(self._fd)
+        os.close(self._wake_read)
+        os.close(self._wake_write)
+
+
+class _PollingSource():
+    """Complete files from folder scans.
+
+    A file is complete if size and modification time
+    are the same in two scans.
+
+    Args:
+        folders (list): Folders to watch.
+        app (class): Accepts `SMIT.application.Application` type attribute.
+    """
+    def __init__(self, folders: list[pl.Path], app: 'Application') -> None:
+
+        self.user = app
+        self._folders = folders
+        # Last scan, key: path, value: (size, mtime)
+        self._seen = dict()
+        self._wake = threading.Event()
+
+    def poll(self, timeout: float) -> list[pl.Path]:
+        """Files unchanged since the last scan.
+
+        Args:
+            timeout (float): Seconds between two scans.
+
+        Returns:
+            list: Paths of the files.
+        """
+        if self._wake.wait(timeout):
+            self._wake.clear()
+            return []
+        current = dict()
+        for folder in self._folders:
+            for path in self.user.storage.glob(folder, '*.csv'):
+                try:
+                    stat = self.user.storage.stat(path)
+                except FileNotFoundError:
+                    continue
+                current[path] = (stat.size, stat.mtime_ns)
+
+        complete = [path for path, signature in current.items() if self._seen.get(path) == signature]
+        self._seen = current
+
+        return complete
+
+    def wake(self) -> None:
+        """End a running `poll` without scan."""
+        self._wake.set()
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+class DownloadWatcher():
+    """Move, validate and ingest downloads while the scraper runs.
+
+    ---
+
+    Files are handled in a background thread. Day data is
+    ingested with `SMIT.filehandling.OsInterface.create_dataframe`
+    right after the move, so the data of one meter is processed
+    while the other meter is still downloading.
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+    """
+    def __init__(self, app: 'Application') -> None:
+
+        self.user = app
+        self.logger = app.logger
+        # Moved files of the current run
+        self.files = list()
+        # Files which failed the validation
+        self.rejected = list()
+        # Called with meter and resolution after each move instead of the ingest
+        self.consumer = None
+        # Called with the download path right after each move, e.g. by `SMIT.worker.ScrapeWorker`
+        self.notify = None
+        self._source = None
+        self._thread = None
+        self._stop = threading.Event()
+        # Guards `files`, `rejected` and `_handled`, not held during move and ingest
+        self._lock = threading.Lock()
+        # Handled files, key: path, value: (size, mtime)
+        self._handled = dict()
+        msg  = f'Class {self.__class__.__name__} of the '
+        msg += f'module {self.__class__.__module__} '
+        msg +=  'successfully initialized.'
+        self.logger.debug(msg)
+
+    @property
+    def running(self) -> bool:
+        """Watcher thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _folders(self) -> dict:
+        """Download folders.
+
+        Returns:
+            dict: Absolute folder path as key, resolution as value.
+        """
+        return {pl.Path(self.user.Folder[raw]).absolute(): kind
+                for kind, (raw, _) in FOLDERS.items()}
+
+    def _create_source(self, mode: str) -> _InotifySource | _PollingSource:
+        """Event source for `mode`, falls back to polling.
+
+        Args:
+            mode (string): 'auto' or 'poll'.
+
+        Returns:
+            class: Source with `poll` and `close` methods.
+        """
+        folders = list(self._folders())
+        if mode == 'auto':
+            try:
+                source = _InotifySource(folders)
+                self.logger.debug('Download watcher uses inotify')
+                return source
+            except (OSError, AttributeError) as error:
+                self.logger.info(f'inotify not available, download watcher scans folders: {error}')
+
+        return _PollingSource(folders, self.user)
+
+    def start(self) -> None:
+        """Start watching the download folders.
+
+        Raises:
+            ValueError: For an unknown `Options['download_watcher']`.
+        """
+        mode = self.user.Options['download_watcher']
+        if mode not in ('auto', 'poll', 'off'):
+            raise ValueError(f"Unknown download watcher mode: {mode}, use 'auto', 'poll' or 'off'")
+        if mode == 'off' or self.running:
+            return
+
+        self.files = list()
+        self.rejected = list()
+        # New event per run, a thread of a previous run may still be stopping
+        self._stop = threading.Event()
+        self._source = self._create_source(mode)
+        self._thread = threading.Thread(target=self._run, args=(self._source, self._stop),
+                                        name='SMIT download watcher', daemon=True)
+        self._thread.start()
+
+        self.logger.info(f'Download watcher started for {len(FOLDERS)} folders')
+
+    def _run(self, source: _InotifySource | _PollingSource, stop: threading.Event) -> None:
+        """Loop of the watcher thread, closes the source on exit.
+
+        Args:
+            source (class): Event source of this run.
+            stop (threading.Event): Set to end the loop.
+        """
+        try:
+            while not stop.is_set():
+                for path in source.poll(POLL_INTERVAL):
+                    try:
+                        self.handle(path)
+                    except Exception: # pylint: disable=broad-except
+                        # Keep watching for the other downloads
+                        self.logger.exception(f'Download watcher failed on file: {path}')
+        finally:
+            source.close()
+
+    def stop(self) -> list[pl.Path]:
+        """Stop watching and handle the remaining files.
+
+        The thread is woken and closes its source on exit. If it
+        is still handling a file after `STOP_TIMEOUT` seconds it
+        finishes in the background. Files of today which were
+        missed, e.g. downloaded before the start, are handled
+        with a final scan.
+
+        Returns:
+            list: Moved files of the run.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._source.wake()
+            self._thread.join(STOP_TIMEOUT)
+            if self._thread.is_alive():
+                self.logger.warning(f'Download watcher thread still busy after {STOP_TIMEOUT}s')
+            self._thread = None
+            self._source = None
+
+            for folder in self._folders():
+                for path in self.user.storage.glob(folder, '*.csv'):
+                    try:
+                        self.handle(path)
+                    except Exception: # pylint: disable=broad-except
+                        # Handle the other files and stop regularly
+                        self.logger.exception(f'Download watcher failed on file: {path}')
+
+            self.logger.info(f'Download watcher stopped, {len(self.files)} files moved, '
+                             f'{len(self.rejected)} rejected')
+
+        return self.files
+
+    def handle(self, path: pl.Path) -> bool:
+        """Validate, move and ingest one downloaded file.
+
+        - Skip files which are no `.csv` export of today.
+        - Skip files without a meter number in the filename.
+        - Validate the content with `SMIT.watcher.DownloadWatcher.validate`.
+        - Move the file with `SMIT.filehandling.OsInterface._pathlib_move`
+        and pass its download path to `notify`.
+        - Ingest day data with `SMIT.filehandling.OsInterface.create_dataframe`
+        or hand the meter to `consumer`, e.g. `SMIT.pipeline.Pipeline`.
+
+        Args:
+            path (pathlib.Path): Downloaded file.
+
+        Returns:
+            bool: True if the file was moved.
+        """
+        path = pl.Path(path).absolute()
+        kind = self._folders().get(path.parent)
+        # Browser downloads end on '.part', atomic writes start with '.'
+        if kind is None or path.suffix != '.csv' or path.name.startswith('.'):
+            return False
+
+        try:
+            stat = self.user.storage.stat(path)
+        except FileNotFoundError:
+            return False
+        # Claim the file, a second event for it is skipped
+        with self._lock:
+            if self._handled.get(path) == (stat.size, stat.mtime_ns):
+                return False
+            self._handled[path] = (stat.size, stat.mtime_ns)
+
+        # Just process downloaded files from today
+        if dt.datetime.fromtimestamp(stat.ctime_ns / 1e9).date() != dt.date.today():
+            return False
+        meter = next((str(self.user.Meter[key]) for key in ('day_meter', 'night_meter')
+                      if str(self.user.Meter[key]) in path.name), None)
+        if meter is None:
+            self.logger.debug(f'File: {path.name} has no meter number, skipped')
+            return False
+        if not self.validate(path, kind):
+            with self._lock:
+                self.rejected.append(path)
+            return False
+
+        workdir = pl.Path(self.user.Folder[FOLDERS[kind][1]]).absolute()
+        self.user.os_tools._pathlib_move(path, workdir, meter) # pylint: disable=protected-access
+        self.user.journal.add_bytes(meter, stat.size)
+        if self.notify is not None:
+            self.notify(path)
+        if self.consumer is not None:
+            self.consumer(meter, kind)
+        elif kind == 'daysum':
+            self.user.os_tools.create_dataframe(workdir, meter)
+        with self._lock:
+            self.files.append(path)
+
+        self.logger.info(f'Download for meter: {meter} handled from {path.name}')
+
+        return True
+
+    def validate(self, path: pl.Path, kind: str) -> bool:
+        """Check a downloaded file before the move.
+
+        Day files must parse with
+        `SMIT.filehandling.OsInterface._read_daysum_file`
+        and contain readings. 15 minute files must have the
+        export header and a row with all columns.
+
+        Args:
+            path (pathlib.Path): Downloaded file.
+            kind (string): 'daysum' or '15min'.
+
+        Returns:
+            bool: True if the file is valid.
+        """
+        try:
+            if kind == 'daysum':
+                readings = self.user.os_tools._read_daysum_file(path) # pylint: disable=protected-access
+                valid = not readings.empty and readings['date'].notna().all()
+            else:
+                lines = self.user.storage.read_text(path).splitlines()
+                valid = (len(lines) > 1 and lines[0].startswith('Ablesezeitpunkt')
+                         and lines[1].count(';') == lines[0].count(';'))
+        except (ValueError, TypeError, UnicodeDecodeError) as error:
+            self.logger.warning(f'File: {path.name} can not be parsed: {error}')
+            return False
+
+        if not valid:
+            self.logger.warning(f'File: {path.name} has no readings, left in {path.parent}')
+
+        return valid
+
+    def __enter__(self) -> 'DownloadWatcher':
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
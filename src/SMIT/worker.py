@@ -0,0 +1,455 @@
+"""Scraper in a separate process
+
+---
+`ScrapeWorker`
+--------------
+
+- Run `SMIT.scrapedata.Webscraper` in a child process.
+- Send scrape jobs over a `multiprocessing` pipe.
+- Report progress and downloaded files to the application.
+- Kill a hanging worker and start a new one on the next job.
+
+The Selenium stack, the browser and their memory live in the
+worker. A hanging driver does not block the Gui forever and
+the memory is freed with the worker.
+
+Protocol, all messages are dicts:
+
+- Application to worker: `{'cmd': 'ping'}`, `{'cmd': 'stop'}`,
+  `{'cmd': 'scrape', 'headless': bool, 'login': dict, 'meter': dict}`,
+  `{'cmd': 'delivered', 'path': str}`.
+- Worker to application: `{'event': 'ready', 'pid': int}`,
+  `{'event': 'pong'}`, `{'event': 'progress', 'stage': str, ...}`,
+  `{'event': 'file', 'path': str}`, `{'event': 'done', 'files': list}`,
+  `{'event': 'error', 'error': str}`, `{'event': 'log', 'record': dict}`.
+
+The worker loads the configuration files of the application and
+only builds the modules the scraper needs, see `_WorkerContext`.
+The download watcher runs in the application only. Files it moves
+during a scrape are reported to the worker as `delivered`, the
+scraper takes them as landed downloads.
+Scrape dates and attempts are exchanged through the scrape journal
+database. Log records are sent to the application, which writes
+them to its log file, the worker opens no log file.
+
+Typical usage:
+
+    app = Application()
+    files = app.scrape_worker.scrape(headless=True)
+    app.scrape_worker.stop()
+"""
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import pathlib as pl
+import queue
+import threading
+import time
+# Type hints
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from SMIT.application import Application
+
+# Seconds to wait for a new worker
+STARTUP_TIMEOUT = 60
+# Seconds to wait for the worker to exit on stop
+STOP_TIMEOUT = 10
+# Seconds to wait for running downloads after a scrape
+DOWNLOAD_TIMEOUT = 30
+
+
+class ScrapeWorkerError(RuntimeError):
+    """Scrape job failed in the worker process."""
+
+
+def _wait_for_downloads(folder: pl.Path, known: set) -> list[pl.Path]:
+    """New `.csv` files in the download folder.
+
+    Waits until Firefox finished writing, `.part` files
+    exist while a download is running.
+
+    Args:
+        folder (pathlib.Path): Download folder.
+        known (set): Files present before the scrape.
+
+    Returns:
+        list: Sorted paths of the new files.
+    """
+    deadline = time.monotonic() + DOWNLOAD_TIMEOUT
+    while any(folder.glob('*.part')) and time.monotonic() < deadline:
+        time.sleep(0.5)
+
+    return sorted(path for path in folder.glob('*.csv') if path not in known)
+
+
+class _PipeQueue():
+    """Queue for `logging.handlers.QueueHandler` which sends records over a pipe.
+
+    Args:
+        connection (multiprocessing.connection.Connection): Pipe to the application.
+    """
+    def __init__(self, connection) -> None:
+
+        self._connection = connection
+        self._lock = threading.Lock()
+
+    def put_nowait(self, record: logging.LogRecord) -> None:
+        """Send a prepared record, messages of other threads are not interleaved."""
+        with self._lock:
+            self._connection.send({'event': 'log', 'record': record.__dict__})
+
+
+class _WorkerContext():
+    """Modules of the application needed by the scraper.
+
+    ---
+
+    Stands in for `SMIT.application.Application` in the worker.
+    User data and settings are read from the files of the
+    application. Storage, key handling, persistence, journal
+    and the scraper are built, no download watcher, Gui,
+    pipeline, metrics export or profiler. Logging goes
+    through `_PipeQueue` to the application.
+
+    Attributes:
+        connection (multiprocessing.connection.Connection): Pipe to the application.
+        dummy (bool): Application runs with dummy configuration.
+        user_data (string): User data file of the application.
+        user_settings (string): Settings file of the application.
+    """
+    def __init__(self, connection, dummy: bool, user_data: str, user_settings: str) -> None:
+
+        # Imported here, the application module imports this module
+        from SMIT.settings import load_settings, load_user_data
+        from SMIT.storage import create_storage
+        from SMIT.rsahandling import RsaTools
+        from SMIT.filepersistence import Persistence
+        from SMIT.journal import ScrapeJournal
+        from SMIT.scrapedata import Webscraper
+
+        self.dummy = dummy
+        self.logger = logging.getLogger(__name__)
+        self.logger.propagate = False
+        self.logger.addHandler(logging.handlers.QueueHandler(_PipeQueue(connection)))
+
+        for key, value in load_user_data(pl.Path(user_data)).items():
+            setattr(self, key, value)
+        self.settings = load_settings(pl.Path(user_settings))
+        for key in self.settings.__slots__:
+            setattr(self, key, getattr(self.settings, key))
+        self.logger.setLevel(self.Options['log_level'])
+
+        self.storage = create_storage(self)
+        self.rsa = RsaTools(self)
+        self.persistence = Persistence(self)
+        self.journal = ScrapeJournal(self)
+        self.scrape = Webscraper(self)
+        msg  = f'Class {self.__class__.__name__} of the '
+        msg += f'module {self.__class__.__module__} '
+        msg +=  'successfully initialized.'
+        self.logger.debug(msg)
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+def _read_commands(connection, commands: queue.Queue, delivered: list) -> None:
+    """Receive the messages of the application in the worker.
+
+    Runs in a thread, delivery notices arrive while a scrape job
+    blocks the main loop. Other commands are queued for the main
+    loop, a closed pipe is queued as stop.
+
+    Args:
+        connection (multiprocessing.connection.Connection): Pipe to the application.
+        commands (queue.Queue): Commands for the main loop.
+        delivered (list): Files moved by the download watcher of the application.
+    """
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            # Application closed the pipe
+            commands.put({'cmd': 'stop'})
+            return
+        if message['cmd'] == 'delivered':
+            delivered.append(pl.Path(message['path']))
+        else:
+            commands.put(message)
+        if message['cmd'] == 'stop':
+            return
+
+
+def _serve(connection, dummy: bool, user_data: str, user_settings: str) -> None:
+    """Main loop of the worker process.
+
+    Args:
+        connection (multiprocessing.connection.Connection): Pipe to the application.
+        dummy (bool): Application runs with dummy configuration.
+        user_data (string): User data file of the application.
+        user_settings (string): Settings file of the application.
+    """
+    app = _WorkerContext(connection, dummy, user_data, user_settings)
+    scraper = app.scrape
+    scraper.progress = lambda event: connection.send({'event': 'progress', **event})
+    # Files moved by the download watcher of the application, see `ScrapeWorker._deliver`
+    scraper.delivered = list()
+    commands = queue.Queue()
+    threading.Thread(target=_read_commands, args=(connection, commands, scraper.delivered),
+                     name='SMIT worker commands', daemon=True).start()
+    connection.send({'event': 'ready', 'pid': os.getpid()})
+
+    while True:
+        job = commands.get()
+        if job['cmd'] == 'stop':
+            break
+        if job['cmd'] == 'ping':
+            connection.send({'event': 'pong'})
+            continue
+
+        folder = pl.Path(app.Folder['raw_daysum']).absolute()
+        known = set(folder.glob('*.csv'))
+        try:
+            app.Login.update(job['login'])
+            app.Meter.update(job['meter'])
+            app.journal.reload()
+            scraper.get_daysum_files(job['headless'])
+            files = [str(path) for path in _wait_for_downloads(folder, known)]
+            for path in files:
+                connection.send({'event': 'file', 'path': path})
+            app.journal.flush()
+            connection.send({'event': 'done', 'files': files})
+        except Exception as error: # pylint: disable=broad-except
+            app.journal.flush()
+            connection.send({'event': 'error', 'error': repr(error)})
+        finally:
+            scraper.quit_driver()
+
+    app.journal.close()
+
+
+class ScrapeWorker():
+    """Drive the scraper in a child process.
+
+    ---
+
+    The worker is started on the first job and kept for further
+    jobs. If it sends nothing for `Options['scrape_worker_timeout']`
+    seconds it is killed, the next job starts a new worker.
+    During a job files moved by `SMIT.watcher.DownloadWatcher`
+    are reported to the worker.
+
+    Attributes:
+        app (class): Accepts `SMIT.application.Application` type attribute.
+    """
+    def __init__(self, app: 'Application') -> None:
+
+        self.user = app
+        self.logger = app.logger
+        self.process = None
+        self._connection = None
+        # Guards sends of the watcher thread against the close of the pipe
+        self._lock = threading.Lock()
+        msg  = f'Class {self.__class__.__name__} of the '
+        msg += f'module {self.__class__.__module__} '
+        msg +=  'successfully initialized.'
+        self.logger.debug(msg)
+
+    @property
+    def alive(self) -> bool:
+        """Worker process is running."""
+        return self.process is not None and self.process.is_alive()
+
+    def start(self) -> None:
+        """Start a worker process and wait until it is ready.
+
+        Raises:
+            ScrapeWorkerError: If the worker does not get ready.
+        """
+        if self.alive:
+            return
+
+        # Spawn: no copy of the Gui, data frames or Tk state in the worker
+        context = multiprocessing.get_context('spawn')
+        self._connection, child = context.Pipe()
+        self.process = context.Process(target=_serve,
+                                       args=(child, self.user.dummy,
+                                             str(pl.Path(self.user.user_data).absolute()),
+                                             str(pl.Path(self.user.user_settings).absolute())),
+                                       name='SMIT scrape worker', daemon=True)
+        self.process.start()
+        child.close()
+
+        message = self._receive(STARTUP_TIMEOUT)
+        if message.get('event') != 'ready':
+            self.kill()
+            raise ScrapeWorkerError(f'Scrape worker not ready: {message}')
+
+        self.logger.info(f'Scrape worker started with pid {message["pid"]}')
+
+    def _receive(self, timeout: float) -> dict:
+        """Next message of the worker.
+
+        Log records of the worker are passed to the
+        application logger and not returned.
+
+        Args:
+            timeout (float): Seconds to wait.
+
+        Raises:
+            TimeoutError: If the worker sent nothing, the worker is killed.
+            ScrapeWorkerError: If the worker died.
+
+        Returns:
+            dict: Message of the worker.
+        """
+        try:
+            while self._connection.poll(timeout):
+                message = self._connection.recv()
+                if message.get('event') != 'log':
+                    return message
+                self.logger.handle(logging.makeLogRecord(message['record']))
+        except (EOFError, OSError) as error:
+            self.kill()
+            raise ScrapeWorkerError(f'Scrape worker died: {error!r}') from error
+
+        self.logger.error(f'Scrape worker sent nothing for {timeout}s, killing it')
+        self.kill()
+        raise TimeoutError(f'Scrape worker hangs, no message for {timeout}s')
+
+    def ping(self, timeout: float = 5) -> float:
+        """Round trip to the worker, starts it if needed.
+
+        Args:
+            timeout (float = 5): Seconds to wait for the answer.
+
+        Returns:
+            float: Round trip time in seconds.
+        """
+        self.start()
+        started = time.perf_counter()
+        self._connection.send({'cmd': 'ping'})
+        self._receive(timeout)
+
+        return time.perf_counter() - started
+
+    def scrape(self, headless: bool = False) -> list[pl.Path]:
+        """Run `SMIT.scrapedata.Webscraper.get_daysum_files` in the worker.
+
+        Buffered journal changes are written before the job and the
+        journal is reloaded afterwards, it holds the dates of the job.
+        Files moved by the download watcher during the job are sent
+        to the worker with `SMIT.worker.ScrapeWorker._deliver`.
+
+        Args:
+            headless (bool = False): Firefox headless mode option.
+
+        Raises:
+            ScrapeWorkerError: If the scrape failed or the worker died.
+            TimeoutError: If the worker hangs.
+
+        Returns:
+            list: Downloaded files.
+        """
+        self.start()
+        self.user.journal.flush()
+        self._connection.send({'cmd': 'scrape',
+                               'headless': headless,
+                               'login': {key: str(value) for key, value in self.user.Login.items()},
+                               'meter': {key: str(value) for key, value in self.user.Meter.items()}})
+        # After the job, notices follow the job on the pipe
+        self.user.watcher.notify = self._deliver
+        timeout = self.user.Options['scrape_worker_timeout']
+        files = list()
+        try:
+            while True:
+                message = self._receive(timeout)
+                if message['event'] == 'progress':
+                    self.logger.info(f'Scrape worker: {message}')
+                elif message['event'] == 'file':
+                    files.append(pl.Path(message['path']))
+                    self.logger.debug(f'Scrape worker downloaded {message["path"]}')
+                elif message['event'] == 'done':
+                    return files
+                elif message['event'] == 'error':
+                    raise ScrapeWorkerError(f'Scrape failed in worker: {message["error"]}')
+        finally:
+            self.user.watcher.notify = None
+            self.user.journal.reload()
+
+    def _deliver(self, path: pl.Path) -> None:
+        """Report a file moved by the download watcher to the worker.
+
+        Called in the watcher thread. The file is gone from the
+        download folder, the scraper of the worker waits for
+        this notice instead.
+
+        Args:
+            path (pathlib.Path): Moved download.
+        """
+        with self._lock:
+            if self._connection is None:
+                return
+            try:
+                self._connection.send({'cmd': 'delivered', 'path': str(path)})
+            except OSError as error:
+                self.logger.warning(f'Scrape worker not told about {path.name}: {error!r}')
+
+    def kill(self) -> None:
+        """Terminate the worker, killed if it does not exit."""
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join(STOP_TIMEOUT)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+            self.logger.warning(f'Scrape worker {self.process.pid} terminated')
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+        self.process = None
+
+    def stop(self) -> None:
+        """Let the worker exit, killed after `STOP_TIMEOUT`."""
+        if not self.alive:
+            return
+        try:
+            self._connection.send({'cmd': 'stop'})
+        except OSError:
+            pass
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.kill()
+            return
+        with self._lock:
+            self._connection.close()
+            self._connection = None
+        self.process = None
+
+        self.logger.info('Scrape worker stopped')
+
+    def __repr__(self) -> str:
+        return f"Module '{self.__class__.__module__}.{self.__class__.__name__}'"
+
+
+# Pdoc config get underscore methods
+__pdoc__ = {name: True
+            for name, classes in globals().items()
+            if name.startswith('_') and isinstance(classes, type)}
+
+
+__pdoc__.update({f'{name}.{member}': True
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member not in {'__module__', '__dict__',
+                                   '__weakref__', '__doc__'}})
+
+__pdoc__.update({f'{name}.{member}': False
+                 for name, classes in globals().items()
+                 if isinstance(classes, type)
+                 for member in classes.__dict__.keys()
+                 if member.__contains__('__') and member not in {'__module__', '__dict__',
+                                                                 '__weakref__', '__doc__'}})
@@ -0,0 +1,21 @@
+"""Pytest configuration.
+
+---
+
+Each pytest-xdist worker gets its own dummy environment,
+so `Application(True)` in parallel test runs never shares files.
+"""
+import os
+import shutil
+import tempfile
+
+_WORKER = os.environ.get('PYTEST_XDIST_WORKER')
+_ROOT = None
+if _WORKER and 'SMIT_DUMMY_ROOT' not in os.environ:
+    _ROOT = tempfile.mkdtemp(prefix=f'smit_dummy_{_WORKER}_')
+    os.environ['SMIT_DUMMY_ROOT'] = _ROOT
+
+def pytest_unconfigure(config): # pylint: disable=unused-argument
+    """Remove the dummy environment of the worker."""
+    if _ROOT is not None:
+        shutil.rmtree(_ROOT, ignore_errors=True)
@@ -0,0 +1,80 @@
+"""Test the precomputed aggregates.
+
+---
+
+On ingest the daily readings of each meter are added
+to weekly, monthly, yearly and weekday buckets. A total
+dataset combines day and night meter.
+"""
+# pylint: disable=no-member
+from datetime import date
+import pandas as pd
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+
+app = Application(True)
+
+@pytest.fixture
+def readings():
+    """Fixture with readings for both meters.
+
+    Returns:
+        tuple: Day and night meter dataframe.
+    """
+    dates = [date(2022, 3, 1), date(2023, 3, 1), date(2023, 3, 2)]
+    df_day = pd.DataFrame({'date': dates, 'verbrauch': [100.0, 200.0, 300.0]})
+    df_night = pd.DataFrame({'date': dates, 'verbrauch': [10.0, 20.0, 30.0]})
+    
+    return df_day, df_night
+
+@pytest.mark.smoke
+@pytest.mark.aggregation
+def test_ingest(readings):
+    """Test aggregates after ingest.
+    
+    Assert:
+        - Monthly sum for the total dataset.
+        - Year over year delta of the monthly means.
+    """
+    app.aggregates.ingest(app.Meter['day_meter'], readings[0])
+    app.aggregates.ingest(app.Meter['night_meter'], readings[1])
+    
+    assert app.aggregates.total('total', 'month', (2023, 3)) == 550
+    assert app.aggregates.yoy_delta('total', 'month', (2023, 3)) == pytest.approx(1.5)
+    assert app.aggregates.summary('total')['month_sum'] == 550
+
+@pytest.mark.smoke
+@pytest.mark.aggregation
+def test_reingest(readings):
+    """Test ingest of changed readings.
+    
+    Assert:
+        Changed day replaces the old value, day count is unchanged.
+    """
+    df_day = readings[0].copy()
+    df_day.loc[2, 'verbrauch'] = 400.0
+    app.aggregates.ingest(app.Meter['day_meter'], df_day)
+    
+    assert app.aggregates.total(app.Meter['day_meter'], 'month', (2023, 3)) == 600
+    assert app.aggregates.mean(app.Meter['day_meter'], 'month', (2023, 3)) == 300
+
+@pytest.mark.smoke
+@pytest.mark.aggregation
+def test_removed_day(readings):
+    """Test ingest without a previously ingested day.
+
+    Assert:
+        - Day is removed from the meter and the total.
+        - Empty buckets are dropped, latest day is updated.
+    """
+    app.aggregates.ingest(app.Meter['day_meter'], readings[0])
+    app.aggregates.ingest(app.Meter['night_meter'], readings[1])
+    app.aggregates.ingest(app.Meter['day_meter'], readings[0].iloc[:2])
+
+    assert app.aggregates.total(app.Meter['day_meter'], 'month', (2023, 3)) == 200
+    assert app.aggregates.total('total', 'month', (2023, 3)) == 220
+    assert app.aggregates.latest(app.Meter['day_meter']) == date(2023, 3, 1)
+
+    app.aggregates.ingest(app.Meter['day_meter'], readings[0].iloc[:1])
+    assert app.aggregates.total(app.Meter['day_meter'], 'month', (2023, 3)) is None
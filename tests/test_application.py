@@ -18,9 +18,15 @@
 """
 # pylint: disable=no-member
 import os
+import gzip
+import logging
+import logging.handlers
+import pathlib as pl
 import pytest # pylint: disable=import-error
 
-from SMIT.application import Application
+import SMIT.application
+import SMIT.storage
+from SMIT.application import Application, _compress_log
 
 app = Application(True)
 
@@ -61,11 +67,19 @@ def test_load_modules():
         with a static dict.
     """
     modules = dict([
+    ('storage', 'FileStorage'),
     ('rsa', 'RsaTools'),
     ('toml_tools', 'TomlTools'),
     ('os_tools', 'OsInterface'),
     ('persistence', 'Persistence'),
-    ('scrape', 'Webscraper')])
+    ('journal', 'ScrapeJournal'),
+    ('scrape', 'Webscraper'),
+    ('scrape_worker', 'ScrapeWorker'),
+    ('watcher', 'DownloadWatcher'),
+    ('aggregates', 'AggregateCache'),
+    ('series', 'SeriesStore'),
+    ('metrics', 'Metrics'),
+    ('pipeline', 'Pipeline')])
     
     app_modules = app._load_modules()
     
@@ -92,4 +106,66 @@ def test_folderstructure():
     """
     for folder_path in app.Folder.values():
         assert os.path.exists(folder_path)
-    
\ No newline at end of file
+        
+@pytest.mark.smoke
+@pytest.mark.application
+def test_queue_logging():
+    """Test non-blocking logging setup.
+    
+    Assert:
+        - Logger only has a queue handler attached.
+        - Logger level is taken from the settings.
+        - Rotated log files are compressed.
+    """
+    assert all(isinstance(handler, logging.handlers.QueueHandler)
+               for handler in app.logger.handlers)
+    assert logging.getLevelName(app.logger.level) == app.Options['log_level']
+    
+    log_file = pl.Path(app.Folder['cache']) / 'rotate.log'
+    log_file.write_text('rotate me')
+    _compress_log(str(log_file), str(log_file) + '.gz')
+    
+    assert not log_file.exists()
+    with gzip.open(str(log_file) + '.gz', 'rt') as backup:
+        assert backup.read() == 'rotate me'
+
+@pytest.mark.smoke
+@pytest.mark.application
+def test_dummy_key_cache(tmp_path, monkeypatch):
+    """Test validation of the cached dummy key pair.
+
+    Assert:
+        - Keys are cached after the first run and linked on the next.
+        - A broken cache is not used and replaced.
+    """
+    cache = tmp_path / 'keys'
+    monkeypatch.setattr(SMIT.application, 'DUMMY_KEY_CACHE', cache)
+
+    first = Application(True, dummy_root=tmp_path / 'first')
+    public = pl.Path(first.Path['public_key'])
+    assert (cache / public.name).read_bytes() == public.read_bytes()
+
+    second = Application(True, dummy_root=tmp_path / 'second')
+    assert os.path.samefile(cache / public.name, second.Path['public_key'])
+
+    (cache / public.name).write_bytes(b'no key')
+    third = Application(True, dummy_root=tmp_path / 'third')
+    assert not os.path.samefile(cache / public.name, third.Path['public_key'])
+    assert (cache / public.name).read_bytes() == pl.Path(third.Path['public_key']).read_bytes()
+    assert third.rsa.decrypt_pwd(third.rsa.encrypt_pwd('secret')) == 'secret'
+
+@pytest.mark.smoke
+@pytest.mark.application
+def test_dummy_key_cache_memory(tmp_path, monkeypatch):
+    """Test caching the dummy key pair with the memory backend.
+
+    Assert:
+        - Keys written to memory storage only are cached.
+    """
+    cache = tmp_path / 'keys'
+    monkeypatch.setattr(SMIT.application, 'DUMMY_KEY_CACHE', cache)
+    monkeypatch.setitem(SMIT.storage.STORAGES, 'filesystem', SMIT.storage.MemoryStorage)
+
+    app = Application(True, dummy_root=tmp_path / 'dummy')
+    public = pl.Path(app.Path['public_key'])
+    assert (cache / public.name).read_bytes() == app.storage.read_bytes(public)
@@ -0,0 +1,245 @@
+"""Performance benchmarks for the data and plot pipeline.
+
+---
+
+Not part of the smoke tests, run with `tox -e benchmark`
+or `pytest -m benchmark`.
+
+For 1, 5 and 10 years of daily readings per meter the
+following stages are timed:
+
+- `ingest`: `SMIT.filehandling.OsInterface.create_dataframe`
+- `medians`: Day + night total with rolling medians
+- `slice`: Range query used by `SMIT.gui.plots.PlotFrame._slice_dataframe`
+- `stats`: `SMIT.aggregation.AggregateCache.summary`
+- `render_*`: Figures from `SMIT.gui.figures`, drawn with the Agg backend
+
+With a recorded scrape run (see `SMIT.replay`) the full download
+flow `SMIT.scrapedata.Webscraper.download_meters` is timed against
+the local replay server as stage `scrape.replay`. With geckodriver
+installed `SMIT_BENCHMARK_ACCOUNTS` scrapers download in parallel from
+`SMIT.mockportal.MockPortal` as stage `portal.parallel`.
+
+Each stage is the best of `REPEAT` runs. Results are written as
+JSON and compared with a stored baseline. A stage fails if it is
+slower than baseline * threshold and more than `MIN_REGRESSION`
+seconds slower in absolute terms.
+
+Environment variables:
+
+- `SMIT_BENCHMARK_RESULTS`: Results file (default 'log/benchmark.json', git-ignored).
+- `SMIT_BENCHMARK_BASELINE`: Baseline file (default 'log/benchmark_baseline.json').
+- `SMIT_BENCHMARK_THRESHOLD`: Allowed slowdown factor (default 1.5).
+- `SMIT_BENCHMARK_UPDATE`: Set to 1 to store the results as new baseline.
+- `SMIT_BENCHMARK_CASSETTE`: Recorded scrape run (default 'log/cassette').
+- `SMIT_BENCHMARK_ACCOUNTS`: Parallel scrapers for the portal load test (default 4).
+- `SMIT_BENCHMARK_LATENCY`: Response latency of the mock portal (default 0.1).
+
+The baseline in 'log/benchmark_baseline.json' is committed. Without
+a baseline entry the test is skipped, record it with
+`SMIT_BENCHMARK_UPDATE=1` and commit the baseline file.
+"""
+# pylint: disable=no-member
+import datetime as dt
+import json
+import os
+import pathlib as pl
+import threading
+import time
+import numpy as np
+import pytest # pylint: disable=import-error
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from SMIT.application import Application
+from SMIT.aggregation import AggregateCache
+from SMIT.timeseries import SeriesStore
+from SMIT.synthetic import generate_exports
+from SMIT.gui import figures
+from SMIT.replay import ReplayServer
+from SMIT.mockportal import MockPortal
+from SMIT.scrapedata import Webscraper
+
+app = Application(True)
+
+RESULTS = pl.Path(os.environ.get('SMIT_BENCHMARK_RESULTS', 'log/benchmark.json'))
+BASELINE = pl.Path(os.environ.get('SMIT_BENCHMARK_BASELINE', 'log/benchmark_baseline.json'))
+THRESHOLD = float(os.environ.get('SMIT_BENCHMARK_THRESHOLD', '1.5'))
+UPDATE = os.environ.get('SMIT_BENCHMARK_UPDATE') == '1'
+CASSETTE = pl.Path(os.environ.get('SMIT_BENCHMARK_CASSETTE', 'log/cassette'))
+ACCOUNTS = int(os.environ.get('SMIT_BENCHMARK_ACCOUNTS', '4'))
+LATENCY = float(os.environ.get('SMIT_BENCHMARK_LATENCY', '0.1'))
+REPEAT = 3
+MIN_REGRESSION = 0.005
+
+def best_of(func, reset=None) -> float:
+    """Best wall clock time of `REPEAT` runs.
+
+    Args:
+        func (Callable): Timed function.
+        reset (Callable | None): Called before each run, not timed.
+
+    Returns:
+        float: Duration in seconds.
+    """
+    durations = list()
+    for _ in range(REPEAT):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+def render(figure) -> None:
+    """Draw a figure like a canvas on screen."""
+    FigureCanvasAgg(figure).draw()
+
+def reset_stores() -> None:
+    """Drop cached dataframes and ingested data."""
+    app.os_tools._dataframes.clear()
+    app.aggregates = AggregateCache(app)
+    app.series = SeriesStore(app)
+
+def run_stages(folder: pl.Path) -> dict:
+    """Time all stages for the data in `folder`.
+
+    Args:
+        folder (pathlib.Path): Folder with `.csv` files for both meters.
+
+    Returns:
+        dict: Stage as key, seconds as value.
+    """
+    day_meter = app.Meter['day_meter']
+    night_meter = app.Meter['night_meter']
+    results = dict()
+
+    results['ingest'] = best_of(lambda: app.os_tools.create_dataframe(folder, day_meter),
+                                reset=reset_stores)
+    df_day = app.os_tools.create_dataframe(folder, day_meter)
+    df_night = app.os_tools.create_dataframe(folder, night_meter)
+
+    results['medians'] = best_of(app.series._build_total)
+    end = app.series._datasets['total'][0][-1]
+    start = end - np.timedelta64(6, 'D')
+    results['slice'] = best_of(lambda: app.series.get_range(['total'], start, end))
+    df_slice = app.series.get_range(['total'], start, end)
+    results['stats'] = best_of(lambda: app.aggregates.summary('total'))
+
+    results['render_day'] = best_of(lambda: render(figures.seaborn_bar_figure(df_day, 'Day')))
+    results['render_night'] = best_of(lambda: render(figures.seaborn_bar_figure(df_night, 'Night')))
+    results['render_slice'] = best_of(lambda: render(figures.slice_figure(df_slice, 'Last Week')))
+
+    return results
+
+def store(key: str, results: dict) -> None:
+    """Merge results into the results file and optionally the baseline.
+
+    Args:
+        key (str): Dataset size, e.g. '5y'.
+        results (dict): Output of `run_stages`.
+    """
+    targets = [RESULTS, BASELINE] if UPDATE else [RESULTS]
+    for file in targets:
+        content = json.loads(file.read_text()) if file.exists() else dict()
+        content[key] = results
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(json.dumps(content, indent=2), encoding='utf-8')
+
+def compare(key: str, results: dict) -> None:
+    """Fail on stages slower than the baseline.
+
+    A missing baseline entry skips the test, a benchmark
+    never passes unchecked.
+
+    Args:
+        key (str): Dataset size, e.g. '5y'.
+        results (dict): Stage durations in seconds.
+    """
+    content = json.loads(BASELINE.read_text()) if BASELINE.exists() else dict()
+    baseline = content.get(key)
+    if not baseline:
+        pytest.skip(f'No baseline for {key} in {BASELINE}, record it with SMIT_BENCHMARK_UPDATE=1')
+
+    regressions = [f'{stage}: {seconds:.4f}s vs baseline {baseline[stage]:.4f}s'
+                   for stage, seconds in results.items()
+                   if stage in baseline
+                   and seconds > baseline[stage] * THRESHOLD
+                   and seconds - baseline[stage] > MIN_REGRESSION]
+
+    assert not regressions, f'Regressions for {key}: ' + '; '.join(regressions)
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('years', [1, 5, 10])
+def test_benchmark(years, tmp_path):
+    """Benchmark the pipeline for one dataset size.
+
+    Assert:
+        No stage regressed past the threshold against the baseline.
+    """
+    generate_exports({'day': tmp_path}, [app.Meter['day_meter'], app.Meter['night_meter']],
+                     dt.date(2024 - years, 1, 1), dt.date(2023, 12, 31), seed=years)
+
+    key = f'{years}y'
+    results = run_stages(tmp_path)
+    store(key, results)
+    compare(key, results)
+
+@pytest.mark.benchmark
+def test_scrape_replay(tmp_path):
+    """Benchmark the download flow against a recorded run.
+
+    Assert:
+        The replayed flow did not regress past the threshold.
+    """
+    if not (CASSETTE / 'manifest.json').exists():
+        pytest.skip(f'No recorded scrape run in {CASSETTE}')
+
+    def scrape():
+        app.scrape.download_meters(tmp_path, True, server.url)
+        app.scrape.quit_driver()
+
+    with ReplayServer(CASSETTE, app.logger) as server:
+        results = {'replay': best_of(scrape)}
+    store('scrape', results)
+    compare('scrape', results)
+
+@pytest.mark.benchmark
+def test_portal_load(tmp_path):
+    """Load test with parallel scrapers against the mock portal.
+
+    Every scraper uses its own account, browser and download folder.
+
+    Assert:
+        - All meters were downloaded.
+        - Wall time did not regress past the threshold.
+    """
+    if not pl.Path(app.Path['geckodriver_executable']).exists():
+        pytest.skip('geckodriver not installed')
+
+    errors = list()
+
+    def scrape(scraper, account, folder):
+        try:
+            scraper.download_meters(folder, True, portal.url, account)
+        except Exception as error: # pylint: disable=broad-except
+            errors.append(error)
+        finally:
+            scraper.quit_driver()
+
+    with MockPortal(app.logger, accounts=ACCOUNTS, latency=LATENCY) as portal:
+        threads = [threading.Thread(target=scrape, args=(Webscraper(app), account, tmp_path / str(number)))
+                   for number, account in enumerate(portal.accounts)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+        stats = portal.stats
+
+    assert not errors, errors
+    assert stats['downloads'] == 2 * ACCOUNTS
+
+    results = {'parallel': wall, 'per_account': wall / ACCOUNTS}
+    store(f'portal_{ACCOUNTS}', results)
+    compare(f'portal_{ACCOUNTS}', results)
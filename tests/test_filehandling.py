@@ -38,8 +38,8 @@ def fh_tests_setup():
                                'df_columns',
                                'app'])
     
-    source_dir = pl.Path('./.dummy/csv_raw/daily')
-    dest_dir = pl.Path('./.dummy/csv_workdir/daily')
+    source_dir = pl.Path(app.Folder['raw_daysum'])
+    dest_dir = pl.Path(app.Folder['work_daysum'])
     source_files = [ ]
     dest_files = [ ]
     file_stem = str(str(dt.date.today().strftime('%Y%m%d') 
@@ -102,3 +102,86 @@ def test_create_dataframe(fh_tests_setup):
     # Test if all needed columns exist and are labeled correctly
     for entry in fh_tests_setup.df_columns:
         assert entry in df_testfunction.columns
+
+@pytest.mark.smoke
+@pytest.mark.osinterface
+def test_data_fingerprint(fh_tests_setup):
+    """Test fingerprint of the meter data files.
+    
+    Assert:
+        - Fingerprint is stable if no file changed.
+        - Fingerprint changes if a file is added.
+    """
+    workdir = app.Folder['work_daysum']
+    fingerprint = app.os_tools.data_fingerprint(workdir, fh_tests_setup.test_meter)
+    
+    assert fingerprint == app.os_tools.data_fingerprint(workdir, fh_tests_setup.test_meter)
+    
+    new_file = pl.Path(workdir) / f'fingerprint_{fh_tests_setup.test_meter}.csv'
+    new_file.write_text('')
+    try:
+        assert fingerprint != app.os_tools.data_fingerprint(workdir, fh_tests_setup.test_meter)
+    finally:
+        new_file.unlink()
+
+@pytest.mark.smoke
+@pytest.mark.osinterface
+def test_plot_fingerprint(fh_tests_setup):
+    """Test fingerprint of the rendered plots.
+
+    Assert:
+        - Contains the dataset fingerprints.
+        - Changes with the slice end date.
+    """
+    fingerprint = app.os_tools.plot_fingerprint('2023-03-31')
+
+    assert fingerprint['data'] == app.os_tools.daysum_fingerprints()
+    assert fingerprint != app.os_tools.plot_fingerprint('2023-04-01')
+
+@pytest.mark.smoke
+@pytest.mark.osinterface
+def test_changed_datasets(fh_tests_setup):
+    """Test change detection for processed datasets.
+    
+    Assert:
+        - Ingested meter is reported unchanged.
+        - Unchanged data returns the cached dataframe.
+    """
+    df_first = app.os_tools.create_dataframe(
+        app.Folder['work_daysum'],
+        fh_tests_setup.test_meter)
+    
+    assert fh_tests_setup.test_meter not in app.os_tools.changed_datasets()
+    
+    df_second = app.os_tools.create_dataframe(
+        app.Folder['work_daysum'],
+        fh_tests_setup.test_meter)
+    
+    assert df_first.equals(df_second)
+
+@pytest.mark.smoke
+@pytest.mark.osinterface
+def test_config_session():
+    """Test batched config edits.
+    
+    Assert:
+        - All edits of a session are written to the file.
+        - File is not written for a session without changes.
+    """
+    toml_path = pl.Path(app.Folder['cache']) / 'session_test.toml'
+    toml_path.write_bytes(pl.Path(app.Path['user_data']).read_bytes())
+    
+    with app.toml_tools.config_session(toml_path) as config:
+        app.toml_tools.set_entry(config, 'Login', 'username', 'session user')
+        app.toml_tools.set_entry(config, 'Meter', 'day_meter', '123456')
+    mtime = toml_path.stat().st_mtime_ns
+    
+    with app.toml_tools.config_session(toml_path) as config:
+        assert config['Login']['username'] == 'session user'
+        assert config['Meter']['day_meter'] == '123456'
+    
+    assert toml_path.stat().st_mtime_ns == mtime
+    
+    app.toml_tools.delete_entry_from_config(toml_path, 'Login', 'username')
+    assert 'username' not in app.toml_tools.load_toml_file(toml_path)['Login']
+    toml_path.unlink()
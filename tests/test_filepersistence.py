@@ -93,3 +93,27 @@ def test_modify_dates_log(fp_tests_setup):
     dates_reload = app.persistence.load_dates_log()
     
     assert dates_reload == fp_tests_setup.dates_modified
+
+@pytest.mark.smoke
+@pytest.mark.persistence
+def test_plot_snapshot():
+    """Test serializing of the plot snapshot.
+    
+    Assert:
+        - Stored snapshot equals loaded snapshot.
+        - Snapshot with missing image is discarded.
+    """
+    image = pl.Path(app.Folder['cache']) / 'test.png'
+    image.write_bytes(b'')
+    stats = {'week': 1.0, 'month': 2.0}
+    
+    fingerprint = {app.Meter['day_meter']: 'day', app.Meter['night_meter']: 'night'}
+    
+    app.persistence.save_plot_snapshot(fingerprint, stats, {'test': image})
+    snapshot = app.persistence.load_plot_snapshot()
+    
+    assert snapshot['fingerprint'] == fingerprint
+    assert snapshot['stats'] == stats
+    
+    image.unlink()
+    assert app.persistence.load_plot_snapshot() is None
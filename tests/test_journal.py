@@ -0,0 +1,143 @@
+"""Test the scrape journal.
+
+---
+
+Scrape dates and attempts are held in memory and
+written behind to a SQLite database. The journal
+plans the next scrape range per meter.
+"""
+# pylint: disable=no-member
+import datetime as dt
+import gc
+import pathlib as pl
+import pickle
+import sqlite3
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+import SMIT.journal
+from SMIT.journal import ScrapeJournal, DATE_FORMAT, RESCRAPE_DAYS
+
+app = Application(True)
+
+def day(offset: int) -> str:
+    """Date relative to today in journal format."""
+    return (dt.date.today() + dt.timedelta(days=offset)).strftime(DATE_FORMAT)
+
+@pytest.mark.smoke
+@pytest.mark.journal
+def test_write_behind(tmp_path):
+    """Test buffered writes.
+    
+    Assert:
+        - Nothing is written before `flush`.
+        - A new journal reads state and attempts from the database.
+    """
+    path = tmp_path / 'journal.sqlite'
+    journal = ScrapeJournal(app, path)
+    journal.initialize_state()
+    journal.record('199996', day(-10), day(-1), 'ok', 2.0, size=100)
+    
+    count = sqlite3.connect(path).execute('SELECT COUNT(*) FROM attempts').fetchone()[0]
+    assert count == 0
+    
+    journal.close()
+    reopened = ScrapeJournal(app, path)
+    
+    assert reopened.state['last_scrape'] == 'never'
+    assert reopened.throughput()['199996']['bytes'] == 100
+    reopened.close()
+
+@pytest.mark.smoke
+@pytest.mark.journal
+def test_plan(tmp_path):
+    """Test scrape planning.
+    
+    Assert:
+        - Without attempts the range starts at the start date.
+        - Failed attempts do not move the start date.
+        - Successful attempts are scraped again for a few days.
+    """
+    journal = ScrapeJournal(app, tmp_path / 'journal.sqlite')
+    journal.update_state({'start': day(-30), 'end': day(-1), 'last_scrape': 'never'})
+    
+    assert journal.plan('199996') == (day(-30), day(-1))
+    
+    journal.record('199996', day(-30), day(-1), 'failed', 1.0, error='Timeout')
+    assert journal.plan('199996') == (day(-30), day(-1))
+    
+    journal.record('199996', day(-30), day(-2), 'ok', 1.0)
+    journal.add_bytes('199996', 250)
+    assert journal.plan('199996') == (day(-2 - RESCRAPE_DAYS), day(-1))
+    assert journal.plan('199997') == (day(-30), day(-1))
+    
+    stats = journal.throughput()['199996']
+    assert (stats['attempts'], stats['failures'], stats['bytes']) == (2, 1, 250)
+    journal.close()
+
+@pytest.mark.smoke
+@pytest.mark.journal
+def test_import_dates_pickle(tmp_path):
+    """Test migration of `dates.pkl`.
+    
+    Assert:
+        State of an existing pickle file is taken over.
+    """
+    dates = {'start': '01-02-2023', 'end': '02-02-2023', 'last_scrape': '03-02-2023'}
+    with open(app.Path['persist_dates'], 'wb') as file:
+        pickle.dump(dates, file)
+    
+    try:
+        journal = ScrapeJournal(app, tmp_path / 'journal.sqlite')
+        assert journal.state == dates
+        journal.close()
+    finally:
+        pl.Path(app.Path['persist_dates']).unlink()
+
+@pytest.mark.smoke
+@pytest.mark.journal
+def test_step_stats(tmp_path):
+    """Test step latency records.
+
+    Assert:
+        - Latencies are limited to the most recent samples.
+        - Percentiles, timeouts and cumulative buckets per step.
+    """
+    journal = ScrapeJournal(app, tmp_path / 'journal.sqlite')
+    for seconds in range(1, 11):
+        journal.record_step('login', seconds / 10)
+    journal.record_step('login', 10.0, 'timeout')
+
+    assert len(journal.step_latencies(samples=4)['login']) == 4
+    stats = journal.step_stats()['login']
+    assert stats['count'] == 10 and stats['timeouts'] == 1
+    assert stats['p50'] == pytest.approx(0.55)
+    assert stats['max'] == pytest.approx(1.0)
+    assert stats['buckets']['0.5'] == 5 and stats['buckets']['+Inf'] == 10
+    journal.close()
+
+@pytest.mark.smoke
+@pytest.mark.journal
+def test_flush_at_exit(tmp_path):
+    """Test the exit handler of open journals.
+
+    Assert:
+        - Closed and collected journals are not kept for the exit handler.
+        - A removed database file is not created again.
+    """
+    journal = ScrapeJournal(app, tmp_path / 'closed.sqlite')
+    journal.close()
+    assert journal not in SMIT.journal._OPEN_JOURNALS # pylint: disable=protected-access
+    collected = len(SMIT.journal._OPEN_JOURNALS) # pylint: disable=protected-access
+    ScrapeJournal(app, tmp_path / 'dropped.sqlite')
+    gc.collect()
+    assert len(SMIT.journal._OPEN_JOURNALS) <= collected # pylint: disable=protected-access
+
+    path = tmp_path / 'removed.sqlite'
+    journal = ScrapeJournal(app, path)
+    journal.initialize_state()
+    journal.flush()
+    journal.record('199996', day(-10), day(-1), 'ok', 2.0)
+    path.unlink()
+    journal._flush_at_exit() # pylint: disable=protected-access
+    assert not path.exists()
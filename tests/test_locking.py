@@ -0,0 +1,130 @@
+"""Test the cross-process scrape lock.
+
+---
+
+Only one process runs the scrape pipeline. Locks of
+crashed processes are recovered, a second run waits
+for the first one or skips.
+"""
+# pylint: disable=no-member
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+from SMIT.locking import FileLock
+
+app = Application(True)
+
+@pytest.mark.smoke
+@pytest.mark.locking
+def test_exclusive(tmp_path):
+    """Test exclusive access.
+
+    Assert:
+        - A second lock on the same file is refused.
+        - The owner info names the holding process.
+        - The lock is free after release.
+    """
+    first = FileLock(tmp_path / 'scrape.lock', app.logger)
+    second = FileLock(tmp_path / 'scrape.lock', app.logger)
+
+    assert first.acquire()
+    assert not second.acquire()
+    assert second.owner()['pid'] == os.getpid()
+
+    first.release()
+    assert first.owner() is None
+    assert second.acquire()
+    second.release()
+
+@pytest.mark.smoke
+@pytest.mark.locking
+def test_stale_recovery(tmp_path):
+    """Test takeover of a lock left by a crashed process.
+
+    Assert:
+        - Lock file with owner info but without os lock is taken.
+        - The previous owner is reported in `recovered`.
+    """
+    path = tmp_path / 'scrape.lock'
+    path.write_text(json.dumps({'pid': 999999, 'host': 'crashed', 'started': 0.0}))
+
+    lock = FileLock(path, app.logger)
+    assert lock.acquire()
+    assert lock.recovered['pid'] == 999999
+    assert lock.owner()['pid'] == os.getpid()
+    lock.release()
+
+@pytest.mark.smoke
+@pytest.mark.locking
+def test_wait(tmp_path):
+    """Test blocking acquire.
+
+    Assert:
+        - Waiting with timeout fails while the lock is held.
+        - Waiting succeeds after the owner releases the lock.
+    """
+    holder = FileLock(tmp_path / 'scrape.lock', app.logger)
+    waiter = FileLock(tmp_path / 'scrape.lock', app.logger)
+    holder.acquire()
+
+    assert not waiter.acquire(blocking=True, timeout=0.3)
+
+    threading.Timer(0.3, holder.release).start()
+    start = time.monotonic()
+    assert waiter.acquire(blocking=True, timeout=10)
+    assert time.monotonic() - start >= 0.2
+    waiter.release()
+
+@pytest.mark.smoke
+@pytest.mark.locking
+def test_other_process(tmp_path):
+    """Test lock held by another process.
+
+    Assert:
+        - Lock of a running process is refused.
+        - Lock is free after the process died without release.
+    """
+    path = tmp_path / 'scrape.lock'
+    script = ('import logging, time\n'
+              'from SMIT.locking import FileLock\n'
+              f'lock = FileLock({str(path)!r}, logging.getLogger())\n'
+              'lock.acquire()\n'
+              'print("locked", flush=True)\n'
+              'time.sleep(60)\n')
+    process = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, text=True)
+    try:
+        assert process.stdout.readline().strip() == 'locked'
+        lock = FileLock(path, app.logger)
+        assert not lock.acquire()
+        assert lock.owner()['pid'] == process.pid
+    finally:
+        process.kill()
+        process.wait()
+
+    assert lock.acquire()
+    assert lock.recovered['pid'] == process.pid
+    lock.release()
+
+@pytest.mark.smoke
+@pytest.mark.locking
+def test_join_running_scrape():
+    """Test pipeline with a running scrape in another process.
+
+    Assert:
+        - Joined run waits and reloads the journal.
+        - Lock is released after the run.
+    """
+    holder = FileLock(app.Path['scrape_lock'], app.logger)
+    holder.acquire()
+    threading.Timer(0.3, holder.release).start()
+
+    start = time.monotonic()
+    app.os_tools.sng_scrape_and_move()
+    assert time.monotonic() - start >= 0.2
+    assert FileLock(app.Path['scrape_lock'], app.logger).owner() is None
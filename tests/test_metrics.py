@@ -0,0 +1,66 @@
+"""Test the timing instrumentation.
+
+---
+
+Functions and code blocks are timed with a decorator
+and a context manager. The histograms are exported
+as JSON or Prometheus textfile.
+"""
+# pylint: disable=no-member
+import json
+import pathlib as pl
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+from SMIT.metrics import timed, timer
+
+app = Application(True)
+
+@timed('test.decorated')
+def decorated() -> int:
+    """Function for instrumentation tests."""
+    return 1
+
+@pytest.mark.smoke
+@pytest.mark.metrics
+def test_disabled_metrics():
+    """Test disabled instrumentation.
+    
+    Assert:
+        Nothing is recorded.
+    """
+    app.metrics.enabled = False
+    decorated()
+    with timer('test.block'):
+        pass
+    
+    assert 'test.decorated' not in app.metrics.snapshot()
+    assert 'test.block' not in app.metrics.snapshot()
+
+@pytest.mark.smoke
+@pytest.mark.metrics
+def test_export_metrics():
+    """Test recording and export.
+    
+    Assert:
+        - Histograms hold all calls.
+        - JSON and Prometheus export contain the stages.
+    """
+    app.metrics.enabled = True
+    try:
+        for _ in range(3):
+            decorated()
+        with timer('test.block'):
+            pass
+        
+        json_file = pl.Path(app.Folder['cache']) / 'metrics.json'
+        prom_file = pl.Path(app.Folder['cache']) / 'metrics.prom'
+        app.metrics.export(json_file)
+        app.metrics.export(prom_file)
+    finally:
+        app.metrics.enabled = False
+    
+    stages = json.loads(json_file.read_text())['stages']
+    assert stages['test.decorated']['count'] == 3
+    assert stages['test.decorated']['buckets']['+Inf'] == 3
+    assert 'smit_stage_seconds_count{stage="test.block"} 1' in prom_file.read_text()
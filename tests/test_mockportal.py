@@ -0,0 +1,119 @@
+"""Test the local portal stand-in.
+
+---
+
+The mock portal serves login, dashboard and data page
+with the XPaths used by the webscraper and generates
+`.csv` downloads for synthetic accounts.
+"""
+# pylint: disable=no-member
+import datetime as dt
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+from SMIT.mockportal import MockPortal
+from SMIT.scrapedata import XPATHS
+
+app = Application(True)
+
+def fetch(url: str, form: dict | None = None):
+    """Fetch url, redirects are followed.
+
+    Returns:
+        tuple: (final url, headers, body).
+    """
+    data = urllib.parse.urlencode(form).encode() if form is not None else None
+    with urllib.request.urlopen(url, data, timeout=10) as response:
+        return response.url, response.headers, response.read().decode('utf-8')
+
+def find(page: str, xpath: str):
+    """Element of a served page, scripts are removed for the xml parser."""
+    root = ET.fromstring(re.sub(r'<script>.*?</script>', '', page, flags=re.DOTALL).split('\n', 1)[1])
+    path = '.' + xpath if xpath.startswith('//') else xpath.replace('/html/', './', 1)
+    return root.find(path)
+
+def login(portal: MockPortal, number: int = 0) -> str:
+    """Login with a synthetic account.
+
+    Returns:
+        string: Session url prefix.
+    """
+    account = portal.accounts[number]
+    url, _, _ = fetch(f'{portal.url}/login', {'email': account['username'],
+                                             'password': account['password']})
+    return url.rsplit('/', 1)[0]
+
+@pytest.mark.smoke
+@pytest.mark.mockportal
+def test_xpaths():
+    """Test page structure.
+
+    Assert:
+        Every XPath of the webscraper is found on its page.
+    """
+    with MockPortal(app.logger) as portal:
+        _, _, login_page = fetch(portal.url)
+        session = login(portal)
+        _, _, dashboard = fetch(f'{session}/dashboard')
+        _, _, overview = fetch(f'{session}/overview')
+
+    pages = {'login': login_page, 'data_page': dashboard}
+    for step, xpath in XPATHS.items():
+        assert find(pages.get(step, overview), xpath) is not None, step
+    assert find(login_page, '//*[@name="email"]') is not None
+
+@pytest.mark.smoke
+@pytest.mark.mockportal
+def test_download():
+    """Test generated downloads.
+
+    Assert:
+        - One row per day of the requested range.
+        - Filename contains the meter number.
+        - Overlapping downloads have identical readings.
+        - Meters of other accounts are refused.
+    """
+    with MockPortal(app.logger, accounts=2, data_start=dt.date.today() - dt.timedelta(days=60)) as portal:
+        session = login(portal, 1)
+        meter = portal.accounts[1]['night_meter']
+        first = dt.date.today() - dt.timedelta(days=20)
+        _, headers, body = fetch(f'{session}/download?meter={meter}'
+                                 f'&from={first}&to={first + dt.timedelta(days=9)}')
+        _, _, overlap = fetch(f'{session}/download?meter={meter}'
+                              f'&from={first + dt.timedelta(days=5)}&to={first + dt.timedelta(days=9)}')
+
+        with pytest.raises(urllib.error.HTTPError):
+            fetch(f'{session}/download?meter={portal.accounts[0]["day_meter"]}&from={first}&to={first}')
+        stats = portal.stats
+
+    rows = body.splitlines()[1:]
+    assert len(rows) == 10
+    assert meter in headers['Content-Disposition']
+    assert rows[5:] == overlap.splitlines()[1:]
+    assert stats['downloads'] == 2 and stats['logins'] == 1
+
+@pytest.mark.smoke
+@pytest.mark.mockportal
+def test_login_and_latency():
+    """Test failed login, session check and latency.
+
+    Assert:
+        - Wrong password shows the login page again.
+        - Pages without session redirect to the login.
+        - Responses are delayed by the latency.
+    """
+    with MockPortal(app.logger, latency=0.1) as portal:
+        _, _, page = fetch(f'{portal.url}/login', {'email': 'user0@example.com', 'password': 'wrong'})
+        assert 'Ungültige Anmeldedaten' in page
+
+        start = time.perf_counter()
+        url, _, _ = fetch(f'{portal.url}/s/unknown/overview')
+        assert url.endswith('/login')
+        assert time.perf_counter() - start >= 0.2
+        assert portal.stats['failed_logins'] == 1
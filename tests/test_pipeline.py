@@ -0,0 +1,99 @@
+"""Test the asynchronous data pipeline.
+
+---
+
+Dummy data runs through move, ingest, aggregate
+and render, downloads of the watcher are ingested
+while the scrape stage is still running.
+"""
+# pylint: disable=no-member
+import datetime as dt
+import os
+import pathlib as pl
+import time
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+from SMIT.synthetic import generate_exports
+
+@pytest.fixture
+def app(tmp_path):
+    """Application with its own dummy folder."""
+    return Application(True, dummy_root=tmp_path / 'dummy')
+
+def stages(app: Application, stage: str) -> dict:
+    """Timings of one stage.
+
+    Returns:
+        dict: Label as key, (start, end) as value.
+    """
+    return {label: (start, end) for name, label, start, end in app.pipeline.timings if name == stage}
+
+@pytest.mark.smoke
+@pytest.mark.pipeline
+def test_run(app):
+    """Test a run with the dummy data.
+
+    Assert:
+        - Every stage is timed, each meter is ingested.
+        - Snapshot with day, night and slice image is written.
+        - Stats match the plot frame values.
+    """
+    snapshot = app.pipeline.run()
+
+    meters = {app.Meter['day_meter'], app.Meter['night_meter']}
+    assert set(stages(app, 'ingest')) == meters
+    assert set(stages(app, 'render')) == {'day', 'night', 'slice'}
+    assert list(snapshot['images']) == ['day', 'night', 'slice']
+    assert app.persistence.load_plot_snapshot() == snapshot
+    assert snapshot['fingerprint'] == app.os_tools.plot_fingerprint(app.pipeline.slice_dates()[1])
+
+    df_slice = app.series.get_range(['total'], *app.pipeline.slice_dates())
+    assert snapshot['stats']['week'] == float(df_slice.iloc[-1,-1])
+
+@pytest.mark.smoke
+@pytest.mark.pipeline
+def test_unchanged(app):
+    """Test a second run without new data.
+
+    Assert:
+        - Ingest, aggregate and render are skipped.
+        - Stored snapshot is returned, images are not written again.
+    """
+    snapshot = app.pipeline.run()
+    written = {name: pl.Path(path).stat().st_mtime_ns for name, path in snapshot['images'].items()}
+
+    assert app.pipeline.run() == snapshot
+    assert {stage for stage, _, _, _ in app.pipeline.timings} == {'scrape'}
+    assert {name: pl.Path(path).stat().st_mtime_ns for name, path in snapshot['images'].items()} == written
+
+@pytest.mark.smoke
+@pytest.mark.pipeline
+def test_overlap(app, tmp_path, monkeypatch):
+    """Test ingest of a landed download during the scrape.
+
+    Assert:
+        Night meter is ingested before the scrape stage ends.
+    """
+    for path in pl.Path(app.Folder['raw_daysum']).glob('*.csv'):
+        path.unlink()
+    raw = pl.Path(app.Folder['raw_daysum']).absolute()
+    meter = app.Meter['night_meter']
+    exports = sorted(generate_exports({'day': tmp_path / 'export'}, [meter, app.Meter['day_meter']],
+                                      dt.date(2023, 1, 1), dt.date(2023, 4, 30), chunk_days=200),
+                     key=lambda path: meter not in path.name)
+
+    def scrape():
+        with app.watcher:
+            os.replace(exports[0], raw / exports[0].name)
+            # Day meter still downloading
+            deadline = time.monotonic() + 10
+            while meter not in stages(app, 'ingest') and time.monotonic() < deadline:
+                time.sleep(0.05)
+            os.replace(exports[1], raw / exports[1].name)
+    monkeypatch.setattr(app.os_tools, 'sng_scrape_and_move', scrape)
+
+    app.pipeline.run()
+
+    assert stages(app, 'ingest')[meter][1] < stages(app, 'scrape')['meters'][1]
+    assert app.watcher.consumer is None
@@ -0,0 +1,120 @@
+"""Test the profiling mode.
+
+---
+
+Phases are profiled with cProfile or tracemalloc.
+Results are written as `.pstats` files and a summary.
+"""
+# pylint: disable=no-member
+import marshal
+import pathlib as pl
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+from SMIT.storage import MemoryStorage
+from SMIT.profiling import Profiler
+
+app = Application(True)
+
+def workload() -> int:
+    """Function for profiling tests."""
+    return sum(list(range(10_000)))
+
+@pytest.mark.smoke
+@pytest.mark.profiling
+def test_disabled_profiler():
+    """Test profiler without mode.
+    
+    Assert:
+        Nothing is recorded or written.
+    """
+    profiler = Profiler()
+    with profiler.phase('ingest'):
+        workload()
+
+    assert profiler.results == dict()
+    assert profiler.dump(app.Folder['cache'], app.storage) == list()
+
+@pytest.mark.smoke
+@pytest.mark.profiling
+def test_cpu_profile():
+    """Test cpu profiling.
+    
+    Assert:
+        - Repeated phases are accumulated.
+        - One `.pstats` file per phase and a summary are written.
+    """
+    profiler = Profiler('cpu')
+    for _ in range(2):
+        with profiler.phase('ingest'):
+            workload()
+    with profiler.phase('plots'):
+        workload()
+
+    files = profiler.dump(pl.Path(app.Folder['cache']), app.storage, top=5)
+    names = [file.name for file in files]
+
+    assert len(files) == 3
+    assert names[0].endswith('_ingest.pstats')
+    assert names[-1].endswith('_summary.txt')
+    calls = [stat[1] for func, stat in pstats.Stats(str(files[0])).stats.items()
+             if func[2] == 'workload']
+    assert calls == [2]
+    assert '==== Phase: plots (cpu) ====' in files[-1].read_text()
+
+@pytest.mark.smoke
+@pytest.mark.profiling
+def test_memory_profile():
+    """Test memory profiling.
+    
+    Assert:
+        Summary with peak memory is written.
+    """
+    profiler = Profiler('memory')
+    with profiler.phase('ingest'):
+        workload()
+
+    files = profiler.dump(pl.Path(app.Folder['cache']), app.storage)
+
+    assert len(files) == 1
+    assert 'peak traced memory' in files[0].read_text()
+
+@pytest.mark.smoke
+@pytest.mark.profiling
+def test_thread_profile():
+    """Test cpu profiling of executor threads.
+
+    Assert:
+        Calls in executor threads are added to the phase.
+    """
+    profiler = Profiler('cpu')
+    with ThreadPoolExecutor(2) as pool:
+        results = list(pool.map(lambda _: profiler.profiled('ingest', workload)(), range(2)))
+
+    assert results == [workload()] * 2
+    calls = [stat[1] for func, stat in profiler.results['ingest'].stats.items()
+             if func[2] == 'workload']
+    assert calls == [2]
+
+@pytest.mark.smoke
+@pytest.mark.profiling
+def test_dump_to_storage(tmp_path):
+    """Test profiling results written through a storage backend.
+
+    Assert:
+        - The memory backend holds the files, nothing is on disk.
+        - The `.pstats` content loads with `pstats`.
+    """
+    profiler = Profiler('cpu')
+    with profiler.phase('ingest'):
+        workload()
+    storage = MemoryStorage(app)
+
+    files = profiler.dump(tmp_path, storage)
+
+    assert list(tmp_path.iterdir()) == list()
+    assert storage.glob(tmp_path, 'profile_*') == sorted(files)
+    stats = marshal.loads(storage.read_bytes(files[0]))
+    assert any(func[2] == 'workload' for func in stats)
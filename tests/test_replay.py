@@ -0,0 +1,159 @@
+"""Test record and replay of the scraping flow.
+
+---
+
+A recorded run is served from a local HTTP server
+with the recorded pages, wait times and files.
+"""
+# pylint: disable=no-member
+import json
+import time
+import types
+import urllib.error
+import urllib.request
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+from SMIT.replay import LocalServer, ScrapeRecorder, ReplayServer
+
+app = Application(True)
+
+LOGIN = '<html><head><script src="app.js"></script></head><body><input name="email"></body></html>'
+DASHBOARD = ('<html><head><link rel="stylesheet" href="style.css"></head>'
+             '<body><div><button id="download">csv</button></div></body></html>')
+
+class Page():
+    """Current page of a browser."""
+    def __init__(self, html: str) -> None:
+        self.page_source = html
+
+def record(folder, downloads) -> None:
+    """Record login, one click and one download.
+
+    Args:
+        folder (pathlib.Path): Cassette folder.
+        downloads (pathlib.Path): Download folder.
+    """
+    driver = Page(LOGIN)
+    recorder = ScrapeRecorder(app, folder)
+    recorder.start(driver, downloads)
+    recorder.step(None, 0.5)
+    driver.page_source = DASHBOARD
+    recorder.step('//button[@id="login"]', 0.2)
+    recorder.step('//*[@id="download"]', 0.1)
+    recorder.expect_download()
+    (downloads / 'meter.csv').write_text('Ablesezeitpunkt;Zaehlerstand\n', encoding='utf-8')
+    recorder.finish()
+
+def get(url: str):
+    """Fetch url.
+
+    Returns:
+        tuple: (response, body).
+    """
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response, response.read()
+
+@pytest.mark.smoke
+@pytest.mark.replay
+def test_record(tmp_path):
+    """Test cassette content.
+
+    Assert:
+        - One page per step without scripts and stylesheets.
+        - Download assigned to the download step, older files ignored.
+    """
+    downloads = tmp_path / 'downloads'
+    downloads.mkdir()
+    (downloads / 'old.csv').write_text('old', encoding='utf-8')
+    record(tmp_path / 'cassette', downloads)
+
+    steps = json.loads((tmp_path / 'cassette' / 'manifest.json').read_text())['steps']
+    assert [step['xpath'] for step in steps] == [None, '//button[@id="login"]', '//*[@id="download"]']
+    assert [step['files'] for step in steps] == [[], [], ['meter.csv']]
+    assert '<script' not in (tmp_path / 'cassette' / steps[0]['page']).read_text()
+    assert '<link' not in (tmp_path / 'cassette' / steps[1]['page']).read_text()
+    assert (tmp_path / 'cassette' / 'files' / 'meter.csv').exists()
+
+@pytest.mark.smoke
+@pytest.mark.replay
+def test_replay(tmp_path):
+    """Test replay server.
+
+    Assert:
+        - Pages keep their DOM and get the click handler.
+        - Pages are delayed by the wait time of the following step.
+        - Recorded files are served as download.
+    """
+    downloads = tmp_path / 'downloads'
+    downloads.mkdir()
+    record(tmp_path / 'cassette', downloads)
+
+    with ReplayServer(tmp_path / 'cassette', app.logger, speed=0.5) as server:
+        start = time.perf_counter()
+        _, body = get(server.url)
+        assert time.perf_counter() - start >= 0.1
+        assert b'<input name="email">' in body
+        assert b'//button[@id=\\"login\\"]' in body
+
+        response, body = get(f'{server.url.rsplit("/step", 1)[0]}/files/meter.csv')
+        assert response.headers['Content-Disposition'] == 'attachment; filename="meter.csv"'
+        assert body.startswith(b'Ablesezeitpunkt')
+
+        with pytest.raises(urllib.error.HTTPError):
+            get(f'{server.url.rsplit("/step", 1)[0]}/step/9')
+
+@pytest.mark.smoke
+@pytest.mark.replay
+def test_missing_cassette(tmp_path):
+    """Test replay without recording.
+
+    Assert:
+        Raises FileNotFoundError.
+    """
+    with pytest.raises(FileNotFoundError):
+        ReplayServer(tmp_path, app.logger)
+
+@pytest.mark.smoke
+@pytest.mark.replay
+def test_replay_journal(tmp_path, monkeypatch):
+    """Test that a replayed run does not change the stored journal.
+
+    Assert:
+        - Attempts and dates of the replay go to an in-memory journal.
+        - Stored journal and its scrape dates are unchanged afterwards.
+    """
+    record(tmp_path / 'cassette', tmp_path)
+    monkeypatch.setattr(app, 'Options', types.MappingProxyType({**app.Options, 'scrape_mode': 'replay'}))
+    monkeypatch.setattr(app, 'Path', types.MappingProxyType({**app.Path, 'scrape_cassette': tmp_path / 'cassette'}))
+    journal = app.journal
+    journal.update_state({'start': '01-01-2023', 'end': '01-01-2023', 'last_scrape': 'never'})
+    journal.flush()
+    meter = str(app.Meter['day_meter'])
+
+    def download(folder, headless, url):
+        assert app.journal is not journal
+        assert app.journal.path == ':memory:'
+        get(url)
+        app.journal.record(meter, *app.journal.plan(meter), 'ok', 1.0)
+    monkeypatch.setattr(app.scrape, 'download_meters', download)
+
+    app.scrape.get_daysum_files(True)
+
+    assert app.journal is journal
+    assert journal.state['last_scrape'] == 'never'
+    assert not journal.is_current(meter)
+    assert journal.throughput() == dict()
+
+@pytest.mark.smoke
+@pytest.mark.replay
+def test_local_server():
+    """Test the base server without handler.
+
+    Assert:
+        Every request is answered with 404.
+    """
+    with LocalServer(app.logger) as server:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            get(f'{server.url}/any')
+    assert error.value.code == 404
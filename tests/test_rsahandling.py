@@ -8,10 +8,12 @@
 in the config folder.
 """
 # pylint: disable=no-member
+import os
 import rsa
 import pytest # pylint: disable=import-error
 
 from SMIT.application import Application
+from SMIT.rsahandling import RsaTools
 
 app = Application(True)
 
@@ -46,4 +48,59 @@ def test_encryption():
     test_pwd = 'String to test Rsa functionality'
     pwd_enc = app.rsa.encrypt_pwd(test_pwd)
     pwd_dec = app.rsa.decrypt_pwd(pwd_enc)
-    assert test_pwd == pwd_dec
\ No newline at end of file
+    assert test_pwd == pwd_dec
+@pytest.mark.smoke
+@pytest.mark.crypto
+def test_key_cache():
+    """Test caching of loaded keys.
+    
+    Assert:
+        - Unchanged key files return the cached keys.
+        - Changed modification time reloads the keys.
+    """
+    keys = app.rsa._load_rsa_keys()
+    assert app.rsa._load_rsa_keys() is keys
+    
+    stat = os.stat(app.Path['public_key'])
+    os.utime(app.Path['public_key'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    
+    assert app.rsa._load_rsa_keys() is not keys
+    assert app.rsa._load_rsa_keys().public_key == keys.public_key
+
+@pytest.mark.smoke
+@pytest.mark.crypto
+def test_credential_cache():
+    """Test opt-in cache for decrypted passwords.
+    
+    Assert:
+        Second decryption is served from the cache.
+    """
+    app.rsa.credential_ttl = 60
+    pwd_enc = app.rsa.encrypt_pwd('Cached password')
+    try:
+        assert app.rsa.decrypt_pwd(pwd_enc) == 'Cached password'
+        assert len(app.rsa._credentials) == 1
+        assert app.rsa.decrypt_pwd(pwd_enc) == 'Cached password'
+    finally:
+        app.rsa.credential_ttl = 0
+        app.rsa.clear_credential_cache()
+
+@pytest.mark.smoke
+@pytest.mark.crypto
+def test_background_keygen():
+    """Test key generation in background thread.
+    
+    Remove the key pair and create a new `RsaTools` instance.
+    
+    Assert:
+        - Key generation is awaited on first use.
+        - Generation time is recorded.
+    """
+    os.remove(app.Path['public_key'])
+    os.remove(app.Path['private_key'])
+    
+    rsa_tools = RsaTools(app)
+    pwd_enc = rsa_tools.encrypt_pwd('Background keys')
+    
+    assert rsa_tools.decrypt_pwd(pwd_enc) == 'Background keys'
+    assert rsa_tools.keygen_seconds > 0
@@ -8,14 +8,18 @@
 `Service` class provided by the selenium package.
 """
 # pylint: disable=no-member
+import datetime as dt
+import pathlib as pl
 import pytest # pylint: disable=import-error
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.firefox.service import Service
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
 from SMIT.application import Application
+from SMIT.scrapedata import Webscraper, DEFAULT_TIMEOUT, MIN_SAMPLES, MIN_TIMEOUT
 
 app = Application(True)
 
@@ -50,3 +54,174 @@ def test_webdriver():
     loaded_mail_element = driver.find_element(By.XPATH, mail_element_xpath)
     
     assert loaded_mail_element.is_displayed()
+
+class Browser():
+    """Driver which answers scripts with a fixed language."""
+    def __init__(self, language: str | None) -> None:
+        self.language = language
+        self.calls = list()
+
+    def execute_script(self, script, *args):
+        self.calls.append(args)
+        return self.language
+
+    def execute_async_script(self, script, *args):
+        self.calls.append(args)
+        return self.language
+
+@pytest.mark.smoke
+@pytest.mark.scraping
+def test_fill_dates_script():
+    """Test date entry by script.
+
+    Assert:
+        - Both dates are set with one script call.
+        - The returned language is reused for the session.
+        - Missing inputs report failure for the keystroke fallback.
+        - The language is only asked once.
+    """
+    scraper = Webscraper(app)
+    scraper.driver = Browser('de')
+    assert scraper._sng_fill_dates_script('01-02-2023', '05-02-2023')
+    assert scraper._browser_language() == 'de'
+    assert scraper.driver.calls == [('01-02-2023', '05-02-2023', 10_000)]
+
+    scraper = Webscraper(app)
+    scraper.driver = Browser(None)
+    assert not scraper._sng_fill_dates_script('01-02-2023', '05-02-2023')
+    scraper.driver.language = 'en-US'
+    scraper._browser_language()
+    scraper._browser_language()
+    assert len(scraper.driver.calls) == 2
+
+@pytest.mark.smoke
+@pytest.mark.scraping
+def test_step_limits():
+    """Test adaptive step timeouts and report.
+
+    Assert:
+        - Steps without history use the default timeout.
+        - Fast steps get a short timeout and polling interval.
+        - Slow steps get a longer timeout, limited to the maximum.
+        - Report lists the slowest step first.
+    """
+    for _ in range(MIN_SAMPLES):
+        app.journal.record_step('unit_wh', 0.2)
+        app.journal.record_step('download', 15.0)
+    app.journal.record_step('download', 15.0, 'timeout')
+    scraper = Webscraper(app)
+
+    assert scraper._step_limits('confirm_dates') == (DEFAULT_TIMEOUT, 0.5)
+    assert scraper._step_limits('unit_wh') == (MIN_TIMEOUT, pytest.approx(0.05))
+    assert scraper._step_limits('download') == (45.0, 0.5)
+
+    report = scraper.step_report().splitlines()
+    assert report[1].startswith('login    unit_wh')
+    assert report[2].startswith('download download')
+
+@pytest.mark.smoke
+@pytest.mark.scraping
+def test_retry(monkeypatch):
+    """Test stage retries.
+
+    Assert:
+        - Webdriver errors are retried with growing backoff.
+        - Other errors are raised at once.
+        - Errors are raised after all retries.
+    """
+    waits = list()
+    monkeypatch.setattr('SMIT.scrapedata.time.sleep', waits.append)
+    scraper = Webscraper(app)
+    calls = list()
+
+    def flaky(value):
+        calls.append(value)
+        if len(calls) < 3:
+            raise TimeoutException('not ready')
+        return value
+
+    assert scraper._retry('download', flaky, 'done') == 'done'
+    backoff = app.Options['scrape_backoff']
+    assert waits == [backoff, backoff * 2]
+
+    def dead():
+        raise WebDriverException('dead')
+
+    with pytest.raises(ValueError):
+        scraper._retry('download', int, 'x')
+    with pytest.raises(WebDriverException):
+        scraper._retry('download', dead)
+    assert len(waits) == 2 + app.Options['scrape_retries']
+
+@pytest.mark.smoke
+@pytest.mark.scraping
+def test_checkpoint():
+    """Test skipping meters downloaded today.
+
+    Assert:
+        - A meter with a download up to yesterday is current.
+        - No browser is started if all meters are current.
+    """
+    account = {'username': 'user', 'password': 'password', 'day_meter': '900001', 'night_meter': '900002'}
+    yesterday = (dt.date.today() - dt.timedelta(days=1)).strftime('%d-%m-%Y')
+    app.journal.record(account['night_meter'], yesterday, yesterday, 'ok', 1.0)
+    assert app.journal.is_current(account['night_meter'])
+    assert not app.journal.is_current(account['day_meter'])
+
+    app.journal.record(account['day_meter'], yesterday, yesterday, 'ok', 1.0)
+    scraper = Webscraper(app)
+    scraper.download_meters(pl.Path('unused'), True, 'http://127.0.0.1:9', account)
+    assert scraper.driver is None
+
+@pytest.mark.smoke
+@pytest.mark.scraping
+def test_download_landed(tmp_path, monkeypatch):
+    """Test journaling of a download after the file landed.
+
+    Assert:
+        - Success is recorded once the file is complete in the download folder.
+        - A click without file is recorded as failed.
+    """
+    monkeypatch.setattr('SMIT.scrapedata.DOWNLOAD_TIMEOUT', 0.2)
+    scraper = Webscraper(app)
+    monkeypatch.setattr(scraper, '_sng_switch_day_night_meassurements', lambda day_night: None)
+    monkeypatch.setattr(scraper, '_sng_fill_dates_element', lambda start, end: None)
+    meter = '900010'
+
+    def download():
+        partial = tmp_path / f'export_{meter}.csv.part'
+        partial.write_text('Ablesezeitpunkt;Zaehlerstand\n', encoding='utf-8')
+        assert scraper.user.journal.throughput().get(meter) is None
+        partial.rename(tmp_path / f'export_{meter}.csv')
+    monkeypatch.setattr(scraper, '_sng_start_download', download)
+
+    scraper._download_meter('day', meter, tmp_path)
+    assert app.journal.throughput()[meter]['failures'] == 0
+
+    monkeypatch.setattr(scraper, '_sng_start_download', lambda: None)
+    monkeypatch.setattr('SMIT.scrapedata.time.sleep', lambda seconds: None)
+    with pytest.raises(TimeoutException):
+        scraper._download_meter('night', meter, tmp_path)
+    stats = app.journal.throughput()[meter]
+    assert (stats['attempts'], stats['failures']) == (2, 1)
+
+@pytest.mark.smoke
+@pytest.mark.scraping
+def test_download_delivered(tmp_path, monkeypatch):
+    """Test a download moved by the watcher of another process.
+
+    Assert:
+        - A delivery notice counts as landed file, one attempt is recorded.
+    """
+    monkeypatch.setattr('SMIT.scrapedata.DOWNLOAD_TIMEOUT', 0.2)
+    scraper = Webscraper(app)
+    scraper.delivered = list()
+    monkeypatch.setattr(scraper, '_sng_switch_day_night_meassurements', lambda day_night: None)
+    monkeypatch.setattr(scraper, '_sng_fill_dates_element', lambda start, end: None)
+    meter = '900020'
+    moved = tmp_path / f'export_{meter}.csv'
+    monkeypatch.setattr(scraper, '_sng_start_download', lambda: scraper.delivered.append(moved))
+
+    scraper._download_meter('day', meter, tmp_path)
+    stats = app.journal.throughput()[meter]
+    assert (stats['attempts'], stats['failures']) == (1, 0)
@@ -0,0 +1,73 @@
+"""Test the read-only settings loader.
+
+---
+
+The settings file is parsed with `tomllib`, validated 
+against a schema and provided as frozen object. The
+user data stays mutable for changes from the Gui.
+"""
+# pylint: disable=no-member
+import pathlib as pl
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+from SMIT.settings import load_settings
+
+app = Application(True)
+
+@pytest.mark.smoke
+@pytest.mark.settings
+def test_frozen_settings():
+    """Test read-only settings.
+    
+    Assert:
+        - Settings tables are assigned to the application instance.
+        - Attributes and tables can not be changed.
+    """
+    assert app.Folder['log'] == app.settings.Folder['log']
+    
+    with pytest.raises(AttributeError):
+        app.settings.Folder = dict()
+    with pytest.raises(TypeError):
+        app.Folder['log'] = './elsewhere'
+
+@pytest.mark.smoke
+@pytest.mark.settings
+def test_invalid_settings():
+    """Test schema validation.
+    
+    Assert:
+        Missing key raises a `ValueError`.
+    """
+    settings_file = pl.Path(app.Folder['cache']) / 'invalid_settings.toml'
+    settings_file.write_text(
+        pl.Path(app.user_settings).read_text(encoding='utf-8').replace('headless_mode', 'headless'),
+        encoding='utf-8')
+    
+    with pytest.raises(ValueError, match='Options.headless_mode'):
+        load_settings(settings_file)
+    
+    settings_file.unlink()
+
+@pytest.mark.smoke
+@pytest.mark.settings
+def test_optional_settings():
+    """Test defaults and number types of optional keys.
+
+    Assert:
+        - Settings without cache folder and plot snapshot path load with defaults.
+        - An integer is accepted for a float option.
+    """
+    settings_file = pl.Path(app.Folder['cache']) / 'old_settings.toml'
+    lines = [line for line in pl.Path(app.user_settings).read_text(encoding='utf-8').splitlines()
+             if not line.startswith(('cache ', 'plot_snapshot ', 'scrape_backoff '))]
+    lines.insert(lines.index('[Options]') + 1, 'scrape_backoff = 2')
+    settings_file.write_text('\n'.join(lines), encoding='utf-8')
+
+    settings = load_settings(settings_file)
+    settings_file.unlink()
+
+    assert settings.Folder['cache'] == './cache'
+    assert settings.Path['plot_snapshot'] == './cache/snapshot.json'
+    assert settings.Options['scrape_backoff'] == 2.0
+    assert isinstance(settings.Options['scrape_backoff'], float)
@@ -0,0 +1,183 @@
+"""Test the storage backends.
+
+---
+
+The filesystem backend writes atomically and buffers
+writes in a batch. The memory backend keeps all changes
+in memory and reads untouched files from disk.
+"""
+# pylint: disable=no-member
+import os
+import pathlib as pl
+import stat
+import threading
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+from SMIT.storage import FileStorage, MemoryStorage, Storage
+
+app = Application(True)
+
+@pytest.mark.smoke
+@pytest.mark.storage
+def test_file_storage_batch(tmp_path):
+    """Test buffered writes of the filesystem backend.
+    
+    Assert:
+        - Buffered files are readable, but not on disk.
+        - All files are written on exit of the batch.
+        - On an exception buffered files are discarded.
+    """
+    storage = FileStorage(app)
+    first = tmp_path / 'first.txt'
+    second = tmp_path / 'second.txt'
+    
+    with storage.batch():
+        storage.write_text(first, 'one')
+        storage.write_bytes(second, b'two')
+        assert storage.read_text(first) == 'one'
+        assert storage.glob(tmp_path, '*.txt') == [first, second]
+        assert not first.exists()
+
+    assert first.read_text() == 'one'
+    assert second.read_bytes() == b'two'
+    
+    with pytest.raises(RuntimeError):
+        with storage.batch():
+            storage.write_text(first, 'changed')
+            raise RuntimeError
+    assert first.read_text() == 'one'
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['first.txt', 'second.txt']
+
+    with pytest.raises(RuntimeError):
+        with storage.batch():
+            storage.move(first, tmp_path / 'moved.txt')
+            storage.remove(second)
+            assert storage.glob(tmp_path, '*.txt') == [tmp_path / 'moved.txt']
+            assert first.exists() and second.exists()
+            raise RuntimeError
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['first.txt', 'second.txt']
+
+    with storage.batch():
+        storage.move(first, tmp_path / 'moved.txt')
+        storage.remove(second)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['moved.txt']
+
+@pytest.mark.smoke
+@pytest.mark.storage
+def test_file_storage_write(tmp_path):
+    """Test permissions and failed writes of the filesystem backend.
+
+    Assert:
+        - Storage is an abstract interface.
+        - Replaced files keep their permissions.
+        - New files get the umask default of the system.
+        - A failed flush changes no file and leaves no temporary file.
+    """
+    with pytest.raises(TypeError):
+        Storage(app) # pylint: disable=abstract-class-instantiated
+
+    storage = FileStorage(app)
+    target = tmp_path / 'target.txt'
+    target.write_text('old')
+    os.chmod(target, 0o640)
+    storage.write_text(target, 'new')
+    assert stat.S_IMODE(target.stat().st_mode) == 0o640
+    assert target.read_text() == 'new'
+
+    reference = tmp_path / 'reference.txt'
+    reference.write_text('default')
+    storage.write_text(tmp_path / 'new.txt', 'new')
+    assert (tmp_path / 'new.txt').stat().st_mode == reference.stat().st_mode
+    reference.unlink()
+    (tmp_path / 'new.txt').unlink()
+
+    # Missing folder, staging the second file fails
+    with pytest.raises(OSError):
+        with storage.batch():
+            storage.write_text(target, 'changed')
+            storage.write_text(tmp_path / 'missing' / 'second.txt', 'two')
+    assert target.read_text() == 'new'
+    assert [path.name for path in tmp_path.iterdir()] == ['target.txt']
+
+@pytest.mark.smoke
+@pytest.mark.storage
+def test_file_storage_threads(tmp_path):
+    """Test that a batch only buffers changes of its own thread.
+
+    Assert:
+        - Writes of another thread go to disk during the batch.
+        - Other threads do not see the buffered changes.
+    """
+    storage = FileStorage(app)
+    buffered = tmp_path / 'buffered.txt'
+    direct = tmp_path / 'direct.txt'
+    seen = list()
+
+    def other_thread():
+        storage.write_text(direct, 'direct')
+        seen.append(storage.exists(buffered))
+
+    with storage.batch():
+        storage.write_text(buffered, 'buffered')
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        assert direct.read_text() == 'direct'
+        assert not buffered.exists()
+
+    assert seen == [False]
+    assert buffered.read_text() == 'buffered'
+
+@pytest.mark.smoke
+@pytest.mark.storage
+def test_memory_storage(tmp_path):
+    """Test copy-on-write behaviour of the memory backend.
+    
+    Assert:
+        - Files on disk are readable.
+        - Moves and writes do not change the disk.
+    """
+    storage = MemoryStorage(app)
+    on_disk = tmp_path / 'fixture.csv'
+    on_disk.write_text('data')
+    moved = tmp_path / 'moved.csv'
+
+    storage.move(on_disk, moved)
+    storage.write_text(tmp_path / 'new.csv', 'new')
+
+    assert storage.glob(tmp_path, '*.csv') == [tmp_path / 'moved.csv', tmp_path / 'new.csv']
+    assert storage.read_text(moved) == 'data'
+    assert not storage.exists(on_disk)
+    assert [path.name for path in tmp_path.iterdir()] == ['fixture.csv']
+    with pytest.raises(FileNotFoundError):
+        storage.read_bytes(on_disk)
+
+@pytest.mark.smoke
+@pytest.mark.storage
+def test_memory_pipeline():
+    """Run move, ingest and persistence with the memory backend.
+    
+    Assert:
+        - Dataframe is created from moved files.
+        - Nothing is written to the dummy folders.
+    """
+    app.storage = MemoryStorage(app)
+    workdir = pl.Path(app.Folder['work_daysum'])
+    dates_file = pl.Path(app.Path['persist_dates'])
+    before = sorted(workdir.iterdir())
+    dates_before = dates_file.read_bytes() if dates_file.exists() else None
+    try:
+        app.os_tools.sng_scrape_and_move()
+        df = app.os_tools.create_dataframe(workdir, app.Meter['day_meter'])
+        app.persistence.initialize_dates_log()
+        dates = app.persistence.load_dates_log()
+        dates['last_scrape'] = 'in memory'
+        app.persistence.save_dates_log(dates)
+        
+        assert len(df) == 90
+        assert app.persistence.load_dates_log()['last_scrape'] == 'in memory'
+        assert sorted(workdir.iterdir()) == before
+        assert (dates_file.read_bytes() if dates_file.exists() else None) == dates_before
+    finally:
+        app.storage = FileStorage(app)
@@ -0,0 +1,61 @@
+"""Test the synthetic data generator.
+
+---
+
+Generated files must be readable by the
+application like real portal exports.
+"""
+# pylint: disable=no-member
+import datetime as dt
+import pandas as pd
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+from SMIT.synthetic import generate_exports
+
+app = Application(True)
+
+@pytest.mark.smoke
+@pytest.mark.synthetic
+def test_daily_exports(tmp_path):
+    """Test daily files with overlaps and gaps.
+    
+    Assert:
+        - Overlapping files hold identical values.
+        - Dataframe has one row per generated day.
+        - Meter reading increases monotonically.
+    """
+    meter = app.Meter['day_meter']
+    files = generate_exports({'day': tmp_path}, [meter],
+                             dt.date(2022, 1, 1), dt.date(2023, 12, 31),
+                             chunk_days=90, overlap_days=10, gap_rate=0.05, seed=1)
+    raw = pd.concat(pd.read_csv(file, sep=';', decimal=',') for file in files)
+    unique = raw.drop_duplicates()
+    
+    df = app.os_tools.create_dataframe(tmp_path, meter)
+
+    assert len(raw) > len(unique)
+    assert unique['Ablesezeitpunkt'].is_unique
+    assert 600 < len(df) < 730
+    assert df['zaehlerstand'].is_monotonic_increasing
+    assert df['date'].is_monotonic_increasing
+
+@pytest.mark.smoke
+@pytest.mark.synthetic
+def test_quarter_hour_exports(tmp_path):
+    """Test 15 minute files.
+    
+    Assert:
+        - Daylight saving time days have 92 or 100 intervals.
+        - Daily consumption equals the sum of 15 minute values.
+    """
+    folders = {'day': tmp_path / 'daysum', '15min': tmp_path / '15min'}
+    generate_exports(folders, ['199996'], dt.date(2023, 3, 25), dt.date(2023, 3, 27))
+    daily = pd.read_csv(next(folders['day'].glob('*.csv')), sep=';', decimal=',')
+    quarters = pd.read_csv(next(folders['15min'].glob('*.csv')), sep=';', decimal=',')
+    quarters['day'] = quarters['Ablesezeitpunkt'].str[:10]
+    per_day = quarters.groupby('day')['Verbrauch Einheitstarif']
+
+    assert per_day.size().tolist() == [96, 92, 96]
+    assert per_day.sum().tolist() == daily['Verbrauch Einheitstarif'].tolist()
+    assert quarters['Ablesezeitpunkt'].iloc[-1].endswith('+02:00')
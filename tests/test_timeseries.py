@@ -0,0 +1,68 @@
+"""Test date indexed range queries.
+
+---
+
+The day and night meter readings are stored as date sorted
+arrays. A materialized total holds the sum of both meters
+with rolling medians. Ranges are selected with binary search.
+"""
+# pylint: disable=no-member
+import pandas as pd
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+
+app = Application(True)
+
+@pytest.fixture
+def ts_tests_setup():
+    """Fixture for range query tests.
+
+    Move dummy files and ingest both meters.
+
+    Returns:
+        tuple: Day and night meter dataframe.
+    """
+    app.os_tools.sng_scrape_and_move()
+    df_day = app.os_tools.create_dataframe(app.Folder['work_daysum'], app.Meter['day_meter'])
+    df_night = app.os_tools.create_dataframe(app.Folder['work_daysum'], app.Meter['night_meter'])
+    
+    return df_day, df_night
+
+@pytest.mark.smoke
+@pytest.mark.timeseries
+def test_total_range(ts_tests_setup):
+    """Test slice of the total dataset.
+    
+    Assert:
+        Range equals merged, summed and filtered dataframes.
+    """
+    df_day, df_night = ts_tests_setup
+    df_sum = pd.merge(df_day[['date', 'verbrauch']], df_night[['date', 'verbrauch']],
+                      on='date', suffixes=('_day', '_night'))
+    df_sum['sum_verbrauch'] = (df_sum['verbrauch_day'] + df_sum['verbrauch_night']).round(0)
+    df_sum['median30'] = df_sum['sum_verbrauch'].rolling(30).median()
+    df_sum['median7'] = df_sum['sum_verbrauch'].rolling(7).median()
+    expected = df_sum[['date', 'sum_verbrauch', 'median30', 'median7']].iloc[82:90].reset_index(drop=True)
+    
+    dataframe = app.series.get_range(['total'], '2023-03-24', '2023-03-31')
+    
+    assert list(dataframe['date']) == list(expected['date'])
+    pd.testing.assert_frame_equal(dataframe.drop(columns='date'), expected.drop(columns='date'))
+
+@pytest.mark.smoke
+@pytest.mark.timeseries
+def test_meter_range_resolution(ts_tests_setup):
+    """Test monthly resolution for both meters.
+    
+    Assert:
+        Monthly sums equal sums of the daily readings.
+    """
+    df_day, df_night = ts_tests_setup
+    meters = [app.Meter['day_meter'], app.Meter['night_meter']]
+    
+    dataframe = app.series.get_range(meters, '2023-01-01', '2023-01-31', resolution='month')
+    
+    assert len(dataframe) == 1
+    assert dataframe[app.Meter['day_meter']].iloc[0] == df_day['verbrauch'].iloc[:31].sum()
+    assert dataframe[app.Meter['night_meter']].iloc[0] == df_night['verbrauch'].iloc[:31].sum()
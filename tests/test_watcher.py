@@ -0,0 +1,151 @@
+"""Test the download watcher.
+
+---
+
+Files written to the download folder are validated,
+moved to the work directory and ingested while the
+watcher runs.
+"""
+# pylint: disable=no-member
+import datetime as dt
+import os
+import pathlib as pl
+import threading
+import time
+import pytest # pylint: disable=import-error
+
+import SMIT.watcher
+from SMIT.application import Application
+from SMIT.synthetic import generate_exports
+
+def download(app: Application, meter: str, folder: pl.Path) -> pl.Path:
+    """Land a day export like the browser, written as `.part` and renamed.
+
+    Returns:
+        pathlib.Path: Path of the complete download.
+    """
+    today = dt.date.today()
+    export = generate_exports({'day': folder}, [meter], today - dt.timedelta(days=40), today)[0]
+    target = pl.Path(app.Folder['raw_daysum']).absolute() / export.name
+    os.replace(export, target.with_name(target.name + '.part'))
+    os.replace(target.with_name(target.name + '.part'), target)
+    return target
+
+def wait_for(condition, timeout: float = 10) -> bool:
+    """Poll condition until it is true or timeout."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+@pytest.fixture
+def app(tmp_path):
+    """Application with its own dummy folder and empty download folder."""
+    application = Application(True, dummy_root=tmp_path / 'dummy')
+    for path in pl.Path(application.Folder['raw_daysum']).glob('*.csv'):
+        path.unlink()
+    return application
+
+@pytest.mark.smoke
+@pytest.mark.watcher
+def test_ingest_while_running(app, tmp_path):
+    """Test move and ingest of a landed file.
+
+    Assert:
+        - File is moved and ingested before the watcher stops.
+        - Invalid files stay in the download folder.
+    """
+    meter = app.Meter['night_meter']
+    workdir = pl.Path(app.Folder['work_daysum']).absolute()
+    with app.watcher:
+        landed = download(app, meter, tmp_path / 'export')
+        assert wait_for(lambda: app.watcher.files)
+        assert not landed.exists()
+        assert list(workdir.glob(f'*_{meter}.csv'))
+        assert str(meter) in app.os_tools._dataframes # pylint: disable=protected-access
+
+        broken = landed.with_name(f'broken_{app.Meter["day_meter"]}.csv')
+        broken.write_text('no export\n', encoding='utf-8')
+        assert wait_for(lambda: app.watcher.rejected)
+
+    assert app.watcher.files == [landed]
+    assert broken.exists()
+
+@pytest.mark.smoke
+@pytest.mark.watcher
+def test_polling_fallback(app, tmp_path, monkeypatch):
+    """Test folder scans without inotify.
+
+    Assert:
+        - Watcher falls back to polling.
+        - Each file is handled once.
+    """
+    def unavailable(folders):
+        raise OSError('no inotify')
+    monkeypatch.setattr(SMIT.watcher, '_InotifySource', unavailable)
+
+    with app.watcher:
+        assert isinstance(app.watcher._source, SMIT.watcher._PollingSource) # pylint: disable=protected-access
+        landed = download(app, app.Meter['day_meter'], tmp_path / 'export')
+        assert wait_for(lambda: app.watcher.files)
+        assert not app.watcher.handle(landed)
+
+    assert app.watcher.files == [landed]
+
+@pytest.mark.smoke
+@pytest.mark.watcher
+def test_busy_stop(app, tmp_path, monkeypatch):
+    """Test stop while the consumer of a file runs.
+
+    Assert:
+        - The watcher lock is free while the consumer runs.
+        - Stop returns after the timeout, the busy thread keeps its source.
+        - The thread closes its source when the consumer returns.
+    """
+    monkeypatch.setattr(SMIT.watcher, 'STOP_TIMEOUT', 0.2)
+    running = threading.Event()
+    release = threading.Event()
+    locked = list()
+
+    def consumer(meter, kind):
+        locked.append(app.watcher._lock.locked()) # pylint: disable=protected-access
+        running.set()
+        release.wait(10)
+
+    app.watcher.start()
+    app.watcher.consumer = consumer
+    source = app.watcher._source # pylint: disable=protected-access
+    thread = app.watcher._thread # pylint: disable=protected-access
+    closed = list()
+    close = source.close
+    monkeypatch.setattr(source, 'close', lambda: (closed.append(thread.is_alive()), close()))
+    download(app, app.Meter['day_meter'], tmp_path / 'export')
+    assert running.wait(10)
+
+    app.watcher.stop()
+    assert thread.is_alive()
+    assert not closed
+
+    release.set()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert closed == [True]
+    assert locked == [False]
+
+@pytest.mark.smoke
+@pytest.mark.watcher
+def test_final_scan_error(app, tmp_path, monkeypatch):
+    """Test stop with a file which can not be handled.
+
+    Assert:
+        - The error of the final scan is logged, stop returns.
+    """
+    def broken(path):
+        raise OSError('disk full')
+
+    app.watcher.start()
+    monkeypatch.setattr(app.watcher, 'handle', broken)
+    landed = download(app, app.Meter['day_meter'], tmp_path / 'export')
+
+    assert app.watcher.stop() == []
+    assert landed.exists()
@@ -0,0 +1,130 @@
+"""Test the scraper worker process.
+
+---
+
+The worker is started with the dummy configuration,
+scrapes fail without Firefox and report the error.
+"""
+# pylint: disable=no-member
+import logging
+import multiprocessing
+import os
+import pathlib as pl
+import queue
+import signal
+import threading
+import pytest # pylint: disable=import-error
+
+from SMIT.application import Application
+from SMIT.worker import ScrapeWorker, ScrapeWorkerError, _read_commands
+
+app = Application(True)
+
+@pytest.mark.smoke
+@pytest.mark.worker
+def test_ping():
+    """Test start, round trip and stop.
+
+    Assert:
+        - Worker is started by the first ping and kept.
+        - Stop ends the worker.
+    """
+    worker = app.scrape_worker
+    assert worker.ping() < 5
+    pid = worker.process.pid
+    worker.ping()
+    assert worker.process.pid == pid
+
+    worker.stop()
+    assert not worker.alive
+
+@pytest.mark.smoke
+@pytest.mark.worker
+def test_failed_scrape():
+    """Test scrape error in the worker.
+
+    Assert:
+        Raises ScrapeWorkerError, the worker keeps running.
+    """
+    worker = app.scrape_worker
+    app.Login['username'] = 'nobody@example.com'
+    try:
+        with pytest.raises(ScrapeWorkerError):
+            worker.scrape(headless=True)
+        assert worker.ping() < 5
+    finally:
+        worker.stop()
+
+@pytest.mark.smoke
+@pytest.mark.worker
+@pytest.mark.skipif(not hasattr(signal, 'SIGSTOP'), reason='Needs POSIX signals')
+def test_hanging_worker():
+    """Test recovery from a hanging worker.
+
+    Assert:
+        - Raises TimeoutError and kills the worker.
+        - Next ping starts a new worker.
+    """
+    worker = app.scrape_worker
+    worker.start()
+    pid = worker.process.pid
+    os.kill(pid, signal.SIGSTOP)
+    with pytest.raises(TimeoutError):
+        worker.ping(timeout=0.5)
+    assert not worker.alive
+
+    worker.ping()
+    assert worker.process.pid != pid
+    worker.stop()
+
+@pytest.mark.smoke
+@pytest.mark.worker
+def test_worker_logging():
+    """Test log records of the worker.
+
+    Assert:
+        - Records of the worker are handled by the application logger.
+        - The worker builds no full application.
+    """
+    records = list()
+    handler = logging.Handler()
+    handler.emit = records.append
+    app.logger.addHandler(handler)
+    worker = app.scrape_worker
+    try:
+        worker.ping()
+        pid = worker.process.pid
+    finally:
+        worker.stop()
+        app.logger.removeHandler(handler)
+
+    messages = [record.getMessage() for record in records if record.process == pid]
+    assert any('_WorkerContext' in message for message in messages)
+    assert not any('Application' in message for message in messages)
+
+@pytest.mark.smoke
+@pytest.mark.worker
+def test_delivery_notices():
+    """Test notices of files moved by the download watcher.
+
+    Assert:
+        - Notices are collected while the main loop is busy.
+        - Other commands are queued for the main loop.
+    """
+    connection, child = multiprocessing.Pipe()
+    worker = ScrapeWorker(app)
+    worker._connection = connection # pylint: disable=protected-access
+    commands, delivered = queue.Queue(), list()
+    reader = threading.Thread(target=_read_commands, args=(child, commands, delivered))
+    reader.start()
+
+    moved = pl.Path('export_900010.csv').absolute()
+    worker._deliver(moved) # pylint: disable=protected-access
+    connection.send({'cmd': 'ping'})
+    connection.send({'cmd': 'stop'})
+    reader.join(5)
+
+    assert delivered == [moved]
+    assert [commands.get_nowait()['cmd'] for _ in range(2)] == ['ping', 'stop']
+    connection.close()
+    child.close()